@@ -1,61 +1,77 @@
 """
 Auditor Agent:
-- Loads versioned rules from rules/*.json
+- Loads versioned rules from rules/*.json through the compiled, hot-reloading
+  RuleEngine (see rule_engine.py)
 - Applies deterministic rules and returns APPROVE or ESCALATE with reasons
 - Writes audit decisions into audit/log_manager
+- Memoizes decisions by a hash of the normalized PO, invoice, three-way rows
+  and the rule set fingerprint; a repeat audit of unchanged inputs returns the
+  cached decision and its log entry carries cache_hit
 """
+import hashlib
 import json
+import os
 from pathlib import Path
 from typing import Dict, Any, List
 from ..audit.log_manager import AuditLogManager
+from .cache import DecisionCache
+from .rule_engine import RuleEngine, RuleSet
 
 RULES_PATH = Path(__file__).parent.parent / "rules"
 LOG_MANAGER = AuditLogManager()
+ENGINE = RuleEngine(RULES_PATH)
+DECISIONS = DecisionCache(
+    max_entries=int(os.getenv("ERP_DECISION_CACHE_MAX_ENTRIES", "100000")),
+    enabled=os.getenv("ERP_DECISION_CACHE", "1") != "0",
+    path=os.getenv("ERP_DECISION_CACHE_PATH") or None,
+)
 
 def load_json(fn: Path) -> Dict[str,Any]:
     return json.loads(fn.read_text())
 
+def normalize(value: Any) -> Any:
+    # 10 and 10.0 are the same quantity; tuple keys come back from JSON as lists
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+def decision_key(execution_result: Dict[str,Any], rules: RuleSet) -> str:
+    """Content address of a decision: same documents and rules -> same key."""
+    inputs = {
+        "po": execution_result["po"],
+        "invoice": execution_result["invoice"],
+        # GRN quantities enter through the three-way rows (None when the plan skipped it)
+        "three_way": execution_result.get("three_way"),
+        "rules": rules.fingerprint,
+        "policy_version": rules.policy_version,
+    }
+    raw = json.dumps(normalize(inputs), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
 def audit_decision(execution_result: Dict[str,Any]) -> Dict[str,Any]:
-    matching = load_json(RULES_PATH / "matching_rules.json")
-    policies = load_json(RULES_PATH / "audit_policies.json")
-    comparisons = execution_result["comparisons"]
+    # one RuleSet for the whole decision, even if the files are reloaded meanwhile
+    rules = ENGINE.current()
+    key = decision_key(execution_result, rules)
+    extra = {"execution_seed": execution_result.get("plan_seed"), "decision_key": key}
+    cached = DECISIONS.get(key)
+    if cached is not None:
+        LOG_MANAGER.append_log(cached, extra=dict(extra, cache_hit=True))
+        return cached
     po = execution_result["po"]
     inv = execution_result["invoice"]
-
-    reasons = []
-
-    # vendor check
-    if po["vendor_id"] != inv["vendor_id"]:
-        reasons.append("vendor_mismatch")
-
-    # total check (exact)
-    if abs(po["total_amount"] - inv["total_amount"]) > matching["rules"]["total_mismatch"].get("tolerance", 0.0):
-        reasons.append("total_mismatch")
-
-    # line-level checks
-    for comp in comparisons:
-        po_line = comp.get("po_line")
-        inv_line = comp.get("invoice_line")
-        if not po_line or not inv_line:
-            reasons.append("missing_po_lines")
-            continue
-        # quantity
-        if abs(po_line["quantity"] - inv_line["quantity"]) > matching["rules"]["quantity_mismatch"].get("tolerance", 0.0):
-            reasons.append("quantity_mismatch")
-        # price
-        if abs(po_line["unit_price"] - inv_line["unit_price"]) > (po_line["unit_price"] * matching["rules"]["price_mismatch"].get("tolerance_pct",0.0)/100.0):
-            reasons.append("price_mismatch")
-
-    # dedupe reasons and create final decision
-    unique_reasons = sorted(set(reasons))
-    decision = "APPROVE" if not unique_reasons else "ESCALATE"
+    decision, reasons = rules.evaluate(execution_result)
     detail = {
         "decision": decision,
-        "reasons": unique_reasons,
+        "reasons": reasons,
         "po_id": po["po_id"],
         "invoice_id": inv["invoice_id"],
-        "policy_version": policies.get("version","unknown")
+        "policy_version": rules.policy_version
     }
+    DECISIONS.put(key, detail)
     # Append to signed audit log
-    LOG_MANAGER.append_log(detail, extra={"execution_seed": execution_result.get("plan_seed")})
+    LOG_MANAGER.append_log(detail, extra=extra)
     return detail
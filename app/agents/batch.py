@@ -0,0 +1,351 @@
+"""
+Batch Reconciliation:
+- Runs deterministic_plan -> execute_plan -> audit_decision for many
+  invoice/PO pairs on a thread or process pool
+- Pairs are grouped by PO so shared tool calls (PO header, inventory, GRN) are
+  fetched once and reused by every invoice matched against the same PO; they
+  are dropped once no running chunk has pairs on that PO, and a call that
+  raised is not kept, so the next pair retries it
+- When the server has the multi-document endpoints, each chunk's POs and
+  invoices (and GRN summaries) are prefetched with one call per endpoint
+- Streams one JSONL result per pair while running; the output file doubles as
+  the checkpoint, so a crashed run resumes where it stopped
+- Reports throughput (pairs/sec) and per-stage timings at the end
+
+CLI:
+    python -m app.agents.batch pairs.csv --out results.jsonl --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from .planner import deterministic_plan
+from .executor import execute_plan, call_tool, prepare_call, RESPONSE_CACHE, REGISTRY
+from . import auditor
+from .auditor import audit_decision, DECISIONS
+
+STAGES = ("plan", "execute", "audit")
+# tools whose response depends only on the PO, so every pair on that PO can share it
+SHARED_TOOLS = ("get_purchase_order", "check_inventory", "check_inventory_batch", "get_grn_status")
+# single-document tool -> (multi-document tool, id arg, keep for other pairs?)
+PREFETCH_TOOLS = {
+    "get_purchase_order": ("get_purchase_orders", "po_id", True),
+    "get_invoice": ("get_invoices", "invoice_id", False),
+    "get_grn_status": ("get_grn_statuses", "po_id", True),
+}
+
+Pair = Tuple[str, str]  # (invoice_id, po_id)
+
+def single_entry(tool_name: str, args: dict, doc: Dict[str,Any], batch: Dict[str,Any]) -> Dict[str,Any]:
+    """
+    Trace entry for one document of a multi-document response, shaped as if
+    `tool_name` had been called with `args` (same tool, method and URL), so a
+    plan's trace does not depend on whether its documents were prefetched.
+    """
+    spec, path, _, _ = prepare_call(tool_name, args)
+    url = urlsplit(batch["request"]["url"])
+    batch_path = REGISTRY.lookup(batch["tool"]).path
+    prefix = url.path[:-len(batch_path)] if url.path.endswith(batch_path) else ""
+    return {"tool": tool_name,
+            "request": {"url": urlunsplit(url._replace(path=prefix + path, query="")), "method": spec.method},
+            "status_code": batch["status_code"], "response": doc, "cached": False, "prefetched": True}
+
+class SharedToolCalls:
+    """Single-flight memo for shared tool calls: concurrent callers wait for one request."""
+    def __init__(self, tools: Iterable[str] = SHARED_TOOLS, call=None):
+        self.tools = set(tools)
+        self.call = call or call_tool
+        self._lock = threading.Lock()
+        self._futures: Dict[Tuple[str,str], Future] = {}
+        self._once: Dict[Tuple[str,str], Dict[str,Any]] = {}
+        self._refs: Dict[str,int] = {}  # running chunks per PO
+        self._keys: Dict[str, Set[Tuple[str,str]]] = {}  # memo keys made for each PO
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+    def seed(self, tool_name: str, args: dict, entry: Dict[str,Any], once: bool = False,
+             po_id: Optional[str] = None):
+        key = (tool_name, json.dumps(args, sort_keys=True))
+        with self._lock:
+            if once:
+                self._once[key] = entry
+            elif key not in self._futures:
+                fut = self._futures[key] = Future()
+                fut.set_result(entry)
+                if po_id is not None:
+                    self._keys.setdefault(po_id, set()).add(key)
+
+    def acquire(self, chunk: List[Pair]):
+        with self._lock:
+            for po in {po for _, po in chunk}:
+                self._refs[po] = self._refs.get(po, 0) + 1
+
+    def release(self, chunk: List[Pair]):
+        """Forgets the chunk's documents and, for POs no other running chunk uses, their shared calls."""
+        with self._lock:
+            for inv, _ in chunk:
+                self._once.pop(("get_invoice", json.dumps({"invoice_id": inv})), None)
+            for po in {po for _, po in chunk}:
+                self._refs[po] -= 1
+                if self._refs[po] == 0:
+                    del self._refs[po]
+                    for key in self._keys.pop(po, ()):
+                        self._futures.pop(key, None)
+
+    def for_po(self, po_id: str):
+        return partial(self, po_id=po_id)
+
+    def prefetch(self, chunk: List[Pair]):
+        """Loads the chunk's documents with the multi-document endpoints, if the server has them."""
+        po_ids = [po for _, po in chunk]
+        for tool_name, ids in (("get_purchase_order", po_ids),
+                               ("get_invoice", [inv for inv, _ in chunk]),
+                               ("get_grn_status", po_ids)):
+            batch_tool, id_arg, keep = PREFETCH_TOOLS[tool_name]
+            if REGISTRY.lookup(batch_tool) is None:
+                continue
+            with self._lock:
+                ids = [i for i in dict.fromkeys(ids)
+                       if (tool_name, json.dumps({id_arg: i})) not in self._futures
+                       and (tool_name, json.dumps({id_arg: i})) not in self._once]
+            if not ids:
+                continue
+            try:
+                entry = self.call(batch_tool, {"ids": ids})
+            except Exception:
+                continue  # fall back to one call per document
+            for doc_id, doc in entry["response"]["documents"].items():
+                # documents of invoices are used by one pair only, so drop them after use
+                self.seed(tool_name, {id_arg: doc_id}, single_entry(tool_name, {id_arg: doc_id}, doc, entry),
+                          once=not keep, po_id=doc_id if keep else None)
+                self.prefetched += 1
+
+    def __call__(self, tool_name: str, args: dict, po_id: Optional[str] = None) -> Dict[str,Any]:
+        key = (tool_name, json.dumps(args, sort_keys=True))
+        with self._lock:
+            seeded = self._once.pop(key, None)
+        if seeded is not None:
+            return seeded
+        if tool_name not in self.tools:
+            return self.call(tool_name, args)
+        with self._lock:
+            fut = self._futures.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._futures[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+            if po_id is not None:
+                self._keys.setdefault(po_id, set()).add(key)
+        if owner:
+            try:
+                fut.set_result(self.call(tool_name, args))
+            except Exception as e:
+                with self._lock:
+                    # callers already waiting share the error; later ones retry
+                    if self._futures.get(key) is fut:
+                        del self._futures[key]
+                fut.set_exception(e)
+        return fut.result()
+
+    def stats(self) -> Dict[str,int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "prefetched": self.prefetched}
+
+def reconcile_pair(invoice_id: str, po_id: str, call=None) -> Dict[str,Any]:
+    timings = {}
+    row = {"invoice_id": invoice_id, "po_id": po_id}
+    try:
+        t0 = time.perf_counter()
+        plan = deterministic_plan(invoice_id, po_id)
+        t1 = time.perf_counter()
+        timings["plan"] = t1 - t0
+        result = execute_plan(plan, call=call)
+        t2 = time.perf_counter()
+        timings["execute"] = t2 - t1
+        decision = audit_decision(result)
+        timings["audit"] = time.perf_counter() - t2
+        row.update(decision=decision["decision"], reasons=decision["reasons"],
+                   policy_version=decision["policy_version"])
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["timings"] = timings
+    return row
+
+def run_chunk(chunk: List[Pair], shared: SharedToolCalls) -> List[Dict[str,Any]]:
+    shared.acquire(chunk)
+    try:
+        shared.prefetch(chunk)
+        rows = [reconcile_pair(inv_id, po_id, call=shared.for_po(po_id)) for inv_id, po_id in chunk]
+    finally:
+        shared.release(chunk)
+    # a buffered audit log is on disk before the rows are checkpointed (or a pool worker exits)
+    auditor.LOG_MANAGER.flush()
+    return rows
+
+_PROCESS_SHARED = None
+
+def run_chunk_in_process(chunk: List[Pair]) -> List[Dict[str,Any]]:
+    # one memo per worker process; chunks are PO-grouped so sharing still pays off
+    global _PROCESS_SHARED
+    if _PROCESS_SHARED is None:
+        _PROCESS_SHARED = SharedToolCalls()
+    return run_chunk(chunk, _PROCESS_SHARED)
+
+def chunk_by_po(pairs: List[Pair], chunk_size: int) -> List[List[Pair]]:
+    groups: Dict[str, List[Pair]] = OrderedDict()
+    for pair in pairs:
+        groups.setdefault(pair[1], []).append(pair)
+    chunks, current = [], []
+    for group in groups.values():
+        for pair in group:
+            current.append(pair)
+            if len(current) >= chunk_size:
+                chunks.append(current)
+                current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+def load_checkpoint(out_path: Path) -> Set[Pair]:
+    """
+    Pairs already reconciled successfully. A torn last line from a crash is
+    truncated and error rows are dropped, since those pairs run again.
+    """
+    done = set()
+    if not out_path.exists():
+        return done
+    good_end, errors = 0, 0
+    with open(out_path, "rb+") as f:
+        for raw in iter(f.readline, b""):
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                row = json.loads(raw)
+            except ValueError:
+                break
+            good_end += len(raw)
+            if "error" in row:
+                errors += 1
+            else:
+                done.add((row["invoice_id"], row["po_id"]))
+        f.truncate(good_end)
+    if errors:
+        tmp = out_path.with_name(out_path.name + ".tmp")
+        with open(out_path, "rb") as src, open(tmp, "wb") as dst:
+            for raw in src:
+                if "error" not in json.loads(raw):
+                    dst.write(raw)
+        os.replace(tmp, out_path)
+    return done
+
+def normalize_pairs(pairs: Iterable[Any]) -> List[Pair]:
+    out = []
+    seen = set()
+    for p in pairs:
+        pair = (p["invoice_id"], p["po_id"]) if isinstance(p, dict) else (p[0], p[1])
+        if pair not in seen:
+            seen.add(pair)
+            out.append(pair)
+    return out
+
+def iter_batch(pairs: List[Pair], workers: int = 8, use_processes: bool = False,
+               chunk_size: int = 50, shared: Optional[SharedToolCalls] = None) -> Iterator[Dict[str,Any]]:
+    """Yields result rows in completion order."""
+    chunks = chunk_by_po(pairs, chunk_size)
+    if use_processes:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        fn = run_chunk_in_process
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        fn = partial(run_chunk, shared=shared or SharedToolCalls())
+    with pool:
+        futures = [pool.submit(fn, chunk) for chunk in chunks]
+        for fut in as_completed(futures):
+            yield from fut.result()
+
+def run_batch(pairs: Iterable[Any], out_path: Optional[Path] = None, workers: int = 8,
+              use_processes: bool = False, chunk_size: int = 50, resume: bool = True) -> Dict[str,Any]:
+    pairs = normalize_pairs(pairs)
+    out_path = Path(out_path) if out_path else None
+    done = load_checkpoint(out_path) if (out_path and resume) else set()
+    todo = [p for p in pairs if p not in done]
+    shared = None if use_processes else SharedToolCalls()
+
+    counts = {"APPROVE": 0, "ESCALATE": 0, "error": 0}
+    stage_seconds = {s: 0.0 for s in STAGES}
+    results = [] if out_path is None else None
+    out = open(out_path, "a" if resume else "w", encoding="utf-8") if out_path else None
+    t0 = time.perf_counter()
+    try:
+        for row in iter_batch(todo, workers=workers, use_processes=use_processes,
+                              chunk_size=chunk_size, shared=shared):
+            counts["error" if "error" in row else row["decision"]] += 1
+            for stage, secs in row["timings"].items():
+                stage_seconds[stage] += secs
+            if out:
+                out.write(json.dumps(row) + "\n")
+                out.flush()
+            else:
+                results.append(row)
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - t0
+
+    processed = len(todo)
+    summary = {
+        "pairs": len(pairs),
+        "resumed": len(pairs) - processed,
+        "processed": processed,
+        "approved": counts["APPROVE"],
+        "escalated": counts["ESCALATE"],
+        "errors": counts["error"],
+        "elapsed_sec": round(elapsed, 3),
+        "pairs_per_sec": round(processed / elapsed, 2) if elapsed > 0 else None,
+        "stage_seconds": {s: round(v, 4) for s, v in stage_seconds.items()},
+        "stage_avg_ms": {s: round(v * 1000.0 / processed, 3) if processed else None
+                         for s, v in stage_seconds.items()},
+    }
+    if shared:
+        summary["shared_calls"] = shared.stats()
+        summary["response_cache"] = RESPONSE_CACHE.stats()
+        summary["decision_cache"] = DECISIONS.stats()
+    if results is not None:
+        summary["results"] = results
+    return summary
+
+def read_pairs(path: Path) -> List[Pair]:
+    # CSV with invoice_id,po_id header, or JSONL of {"invoice_id":..., "po_id":...}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            return normalize_pairs(csv.DictReader(f))
+        return normalize_pairs(json.loads(line) for line in f if line.strip())
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Reconcile many invoice/PO pairs")
+    ap.add_argument("pairs", type=Path, help="CSV (invoice_id,po_id) or JSONL input")
+    ap.add_argument("--out", type=Path, required=True, help="JSONL results / checkpoint file")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--chunk-size", type=int, default=50)
+    ap.add_argument("--processes", action="store_true", help="use a process pool instead of threads")
+    ap.add_argument("--no-resume", action="store_true", help="overwrite --out instead of resuming")
+    args = ap.parse_args(argv)
+    summary = run_batch(read_pairs(args.pairs), out_path=args.out, workers=args.workers,
+                        use_processes=args.processes, chunk_size=args.chunk_size,
+                        resume=not args.no_resume)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Vectorized batch auditor:
+- Audits many invoice/PO pairs at once from columnar line data (pandas), with
+  the same compiled rules as audit_decision (see rule_engine.py)
+- (pair, line_id, item_id) is encoded once into an int64 key; header, line
+  (join on that key) and three-way checks (bincount per key) then run as numpy
+  array operations
+- The per-pair reason set is packed into a bit mask, and each distinct mask is
+  decided once through the policies
+- Returns the same decision / reasons per pair as audit_decision
+- Frames come from execution results (frames_from_results) or straight from
+  SQLite for large batches (frames_from_db)
+
+CLI:
+    python -m app.agents.batch_auditor pairs.csv --out decisions.jsonl
+"""
+import argparse
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .auditor import ENGINE, LOG_MANAGER
+from .rule_engine import RuleSet
+from ..tools.db import DB_PATH
+
+CHUNK_PAIRS = 50000
+
+class AuditFrames(NamedTuple):
+    po_headers: pd.DataFrame  # index pair: po_id + header fields
+    inv_headers: pd.DataFrame  # index pair: invoice_id + header fields
+    po_lines: pd.DataFrame  # pair, line_id, item_id + line fields
+    inv_lines: pd.DataFrame
+    received: Optional[pd.DataFrame] = None  # pair, line_id, item_id, received_qty (GRN lines)
+    received_pairs: Optional[pd.Index] = None  # pairs that ran the three-way match (default: all)
+
+def vector_test(check, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if check.kind == "equals":
+        return a != b
+    diff = np.abs(a - b)
+    if check.kind == "percentage":
+        return diff > a * check.tolerance
+    return diff > check.tolerance
+
+def encode_keys(pairs: pd.Index, *frames: pd.DataFrame) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(pair position, int64 key) per line frame; equal (pair, line_id, item_id) -> equal key.
+
+    item_id strings are hashed once for all frames together; every later join,
+    dedupe and group-by runs on the integer key.
+    """
+    column = lambda name: np.concatenate([f[name].to_numpy() for f in frames]) if frames else np.array([])
+    pos = pd.Index(pairs.to_numpy()).get_indexer(column("pair"))
+    if (pos < 0).any():
+        raise ValueError("line data for a pair without headers")
+    line_codes, line_ids = pd.factorize(column("line_id"), use_na_sentinel=False)
+    item_codes, item_ids = pd.factorize(column("item_id"), use_na_sentinel=False)
+    key = pos.astype(np.int64) * max(len(line_ids), 1) + line_codes
+    # re-code before the second step so the key stays below rows * items
+    key = pd.factorize(key)[0].astype(np.int64) * max(len(item_ids), 1) + item_codes
+    bounds = np.cumsum([len(f) for f in frames])[:-1]
+    return list(zip(np.split(pos, bounds), np.split(key, bounds)))
+
+def last_rows(keys: np.ndarray) -> np.ndarray:
+    """Row numbers of the last row per key (a dict built from the lines keeps the last)."""
+    return np.flatnonzero(~pd.Index(keys).duplicated(keep="last"))
+
+def audit_frames(frames: AuditFrames, rules: Optional[RuleSet] = None) -> pd.DataFrame:
+    """decision / reasons per pair (index), plus po_id, invoice_id and policy_version."""
+    rules = rules or ENGINE.current()
+    pairs = frames.po_headers.index
+    names = rules.rule_names
+    bits = np.zeros((len(pairs), len(names)), dtype=bool)
+    col = {name: i for i, name in enumerate(names)}
+
+    def mark(reason, positions):
+        bits[positions, col[reason]] = True
+
+    inv_headers = frames.inv_headers.reindex(pairs)
+    for c in rules.header_checks:
+        mark(c.reason, vector_test(c, frames.po_headers[c.field].to_numpy(), inv_headers[c.field].to_numpy()))
+
+    three_way = frames.received is not None and bool(rules.three_way_checks)
+    line_frames = [frames.po_lines, frames.inv_lines] + ([frames.received] if three_way else [])
+    (po_pos, po_key), (inv_pos, inv_key), *rec = encode_keys(pairs, *line_frames)
+    po_rows, inv_rows = last_rows(po_key), last_rows(inv_key)
+    at = pd.Index(inv_key[inv_rows]).get_indexer(po_key[po_rows])
+    if rules.presence:
+        back = pd.Index(po_key[po_rows]).get_indexer(inv_key[inv_rows])
+        unmatched = np.concatenate([po_pos[po_rows[at < 0]], inv_pos[inv_rows[back < 0]]])
+        for reason in rules.presence:
+            mark(reason, unmatched)
+    po_match, inv_match = po_rows[at >= 0], inv_rows[at[at >= 0]]
+    for c in rules.line_checks:
+        a = frames.po_lines[c.field].to_numpy()[po_match]
+        b = frames.inv_lines[c.field].to_numpy()[inv_match]
+        mark(c.reason, po_pos[po_match][vector_test(c, a, b)])
+
+    if three_way:
+        # columnar three_way_match: one slot per (pair, line_id, item_id)
+        (rec_pos, rec_key), = rec
+        codes, keys = pd.factorize(np.concatenate([po_key[po_rows], inv_key, rec_key]))
+        n_po, n_inv = len(po_rows), len(inv_key)
+        slot_pair = np.empty(len(keys), dtype=np.int64)
+        slot_pair[codes] = np.concatenate([po_pos[po_rows], inv_pos, rec_pos])
+        ordered = np.full(len(keys), np.nan)
+        ordered[codes[:n_po]] = frames.po_lines["quantity"].to_numpy(dtype=float)[po_rows]
+        invoiced = np.bincount(codes[n_po:n_po + n_inv], minlength=len(keys),
+                               weights=frames.inv_lines["quantity"].to_numpy(dtype=float))
+        received = np.bincount(codes[n_po + n_inv:], minlength=len(keys),
+                               weights=frames.received["received_qty"].to_numpy(dtype=float))
+        fields = {"ordered_qty": ordered, "invoiced_qty": invoiced, "received_qty": received,
+                  "over_billed_qty": np.clip(invoiced - received, 0.0, None)}
+        checked = np.ones(len(pairs), dtype=bool)
+        if frames.received_pairs is not None:
+            checked[:] = False
+            checked[pairs.get_indexer(frames.received_pairs)] = True
+        for c in rules.three_way_checks:
+            hit = slot_pair[fields[c.field] > c.tolerance]
+            mark(c.reason, hit[checked[hit]])
+
+    # one policy evaluation per distinct reason set instead of per pair
+    codes = bits.astype(np.int64) @ (np.int64(1) << np.arange(len(names), dtype=np.int64))
+    decided = {}
+    for code in np.unique(codes):
+        reasons = sorted(n for i, n in enumerate(names) if code >> i & 1)
+        decided[code] = (rules.decide(reasons)[0], reasons)
+    out = pd.DataFrame({
+        "po_id": frames.po_headers["po_id"].to_numpy(),
+        "invoice_id": inv_headers["invoice_id"].to_numpy(),
+        "decision": [decided[c][0] for c in codes],
+        "reasons": [decided[c][1] for c in codes],
+    }, index=pairs)
+    out["policy_version"] = rules.policy_version
+    return out
+
+def frames_from_results(results: Sequence[Dict[str,Any]], rules: Optional[RuleSet] = None) -> AuditFrames:
+    """Columnar frames from execute_plan results (comparisons are recomputed from the lines).
+
+    Only the fields the rules read are copied, column by column.
+    """
+    rules = rules or ENGINE.current()
+    header_fields = sorted({c.field for c in rules.header_checks})
+    line_fields = sorted({"quantity"} | {c.field for c in rules.line_checks})
+
+    def headers(doc_key, id_col):
+        docs = [r[doc_key] for r in results]
+        cols = {f: [d.get(f) for d in docs] for f in [id_col] + header_fields}
+        return pd.DataFrame(cols, index=pd.RangeIndex(len(docs), name="pair"))
+
+    def lines(doc_key, fields):
+        docs = [r[doc_key]["lines"] for r in results]
+        cols = {"pair": np.repeat(np.arange(len(docs)), [len(ls) for ls in docs])}
+        for f in ["line_id", "item_id"] + fields:
+            cols[f] = [l.get(f) for ls in docs for l in ls]
+        return pd.DataFrame(cols)
+
+    received_pairs = [pair for pair, r in enumerate(results) if r.get("three_way") is not None]
+    tw = [results[pair]["three_way"] for pair in received_pairs]
+    received = pd.DataFrame({
+        "pair": np.repeat(np.array(received_pairs, dtype=np.int64), [len(rows) for rows in tw]),
+        "line_id": [row["key"][0] for rows in tw for row in rows],
+        "item_id": [row["key"][1] for rows in tw for row in rows],
+        "received_qty": np.array([row["received_qty"] for rows in tw for row in rows], dtype=float),
+    })
+    return AuditFrames(headers("po", "po_id"), headers("invoice", "invoice_id"),
+                       lines("po", line_fields), lines("invoice", line_fields),
+                       received, pd.Index(received_pairs))
+
+def frames_from_db(pairs: Sequence[Tuple[str,str]], db_path: Path = DB_PATH) -> Tuple[AuditFrames, List[int]]:
+    """Frames for (invoice_id, po_id) pairs read set-wise from SQLite; also returns pairs with a missing document."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("CREATE TEMP TABLE batch_pairs (pair INTEGER PRIMARY KEY, invoice_id TEXT, po_id TEXT)")
+        conn.executemany("INSERT INTO batch_pairs VALUES (?,?,?)",
+                         [(i, inv, po) for i, (inv, po) in enumerate(pairs)])
+        read = lambda sql: pd.read_sql_query(sql, conn)
+        header = "h.vendor_id, h.vendor_name, h.currency, h.total_amount"
+        line = "l.line_id, l.item_id, l.quantity, l.unit_price"
+        po_headers = read(f"SELECT p.pair, h.po_id, {header} FROM batch_pairs p "
+                          "JOIN purchase_orders h ON h.po_id = p.po_id").set_index("pair")
+        inv_headers = read(f"SELECT p.pair, h.invoice_id, {header} FROM batch_pairs p "
+                           "JOIN invoices h ON h.invoice_id = p.invoice_id").set_index("pair")
+        po_lines = read(f"SELECT p.pair, {line} FROM batch_pairs p JOIN po_lines l ON l.po_id = p.po_id "
+                        "ORDER BY p.pair, l.line_id, l.id")
+        inv_lines = read(f"SELECT p.pair, {line} FROM batch_pairs p JOIN invoice_lines l ON l.invoice_id = p.invoice_id "
+                         "ORDER BY p.pair, l.line_id, l.id")
+        received = read("SELECT p.pair, g.line_id, g.item_id, g.received_qty FROM batch_pairs p "
+                        "JOIN grn_lines g ON g.po_id = p.po_id")
+    finally:
+        conn.close()
+    complete = po_headers.index.intersection(inv_headers.index).sort_values()
+    missing = sorted(set(range(len(pairs))) - set(complete))
+    return AuditFrames(po_headers.loc[complete], inv_headers.loc[complete],
+                       po_lines[po_lines["pair"].isin(complete)], inv_lines[inv_lines["pair"].isin(complete)],
+                       received[received["pair"].isin(complete)]), missing
+
+def decisions(table: pd.DataFrame) -> List[Dict[str,Any]]:
+    """audit_decision-shaped dicts from an audit_frames result."""
+    return [{"decision": d, "reasons": list(r), "po_id": po, "invoice_id": inv, "policy_version": v}
+            for po, inv, d, r, v in zip(table["po_id"], table["invoice_id"], table["decision"],
+                                        table["reasons"], table["policy_version"])]
+
+def audit_batch(results: Sequence[Dict[str,Any]], log: bool = True) -> List[Dict[str,Any]]:
+    """Batch twin of audit_decision for a list of execution results (same order)."""
+    out = decisions(audit_frames(frames_from_results(results)))
+    if log:
+        for detail, r in zip(out, results):
+            LOG_MANAGER.append_log(detail, extra={"execution_seed": r.get("plan_seed")})
+    return out
+
+def main(argv=None):
+    from .batch import read_pairs
+    ap = argparse.ArgumentParser(description="Vectorized audit of invoice/PO pairs straight from the database")
+    ap.add_argument("pairs", type=Path, help="CSV (invoice_id,po_id) or JSONL input")
+    ap.add_argument("--out", type=Path, required=True, help="JSONL decisions")
+    ap.add_argument("--db", type=Path, default=DB_PATH)
+    ap.add_argument("--chunk-pairs", type=int, default=CHUNK_PAIRS)
+    ap.add_argument("--no-log", action="store_true", help="do not append decisions to the audit log")
+    args = ap.parse_args(argv)
+    pairs = read_pairs(args.pairs)
+    counts = {"APPROVE": 0, "ESCALATE": 0, "error": 0}
+    with open(args.out, "w", encoding="utf-8") as out:
+        for start in range(0, len(pairs), args.chunk_pairs):
+            chunk = pairs[start:start + args.chunk_pairs]
+            frames, missing = frames_from_db(chunk, args.db)
+            for i in missing:
+                counts["error"] += 1
+                out.write(json.dumps({"invoice_id": chunk[i][0], "po_id": chunk[i][1],
+                                      "error": "document not found"}) + "\n")
+            for detail in decisions(audit_frames(frames)):
+                counts[detail["decision"]] += 1
+                if not args.no_log:
+                    LOG_MANAGER.append_log(detail, extra={"execution_seed": None})
+                out.write(json.dumps(detail) + "\n")
+    print(json.dumps({"pairs": len(pairs), "approved": counts["APPROVE"],
+                      "escalated": counts["ESCALATE"], "errors": counts["error"]}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Response Cache:
+- Caches successful tool responses keyed by (tool, args)
+- Per-tool TTLs (document headers long, inventory short); tools without a TTL
+  are never cached
+- Bounded LRU by entry count and approximate memory (serialized response size)
+- Invalidation by tool and/or document reference, e.g. invalidate(po_id="PO-1001")
+  or invalidate(item_id="ITEM-01"); batch args such as item_ids=[...] are indexed
+  per id so a single changed row drops every entry that includes it
+- ValidatorCache keeps the last copy of each ETagged document (no TTL) so an
+  expired entry is revalidated with If-None-Match instead of re-downloaded
+- DecisionCache memoizes audit decisions by content hash (no TTL: a changed
+  document or rule set is a different key); optionally backed by SQLite so
+  reruns in new processes (nightly sweeps) hit too
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+DEFAULT_TTLS = {
+    "get_purchase_order": 300.0,
+    "get_invoice": 300.0,
+    "check_inventory": 5.0,
+    "check_inventory_batch": 5.0,
+    "get_grn_status": 30.0,
+}
+
+Key = Tuple[str, str]
+
+def cache_key(tool: str, args: Dict[str,Any]) -> Key:
+    return tool, json.dumps(args, sort_keys=True, default=str)
+
+def arg_refs(args: Dict[str,Any]) -> Set[Tuple[str,str]]:
+    # {"po_id": "PO-1"} -> {("po_id","PO-1")}; {"item_ids": [a, b]} -> {("item_id",a), ("item_id",b)}
+    refs = set()
+    for name, value in args.items():
+        if isinstance(value, (list, tuple)):
+            singular = name[:-1] if name.endswith("s") else name
+            refs.update((singular, str(v)) for v in value)
+        elif value is not None:
+            refs.add((name, str(value)))
+    return refs
+
+class ResponseCache:
+    def __init__(self, ttls: Optional[Dict[str,float]] = None, max_entries: int = 10000,
+                 max_bytes: int = 64 * 1024 * 1024, enabled: bool = True):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # key -> (expires_at, size, refs, entry)
+        self._entries: "OrderedDict[Key, Tuple[float,int,Set,Dict[str,Any]]]" = OrderedDict()
+        self._by_ref: Dict[Tuple[str,str], Set[Key]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def cacheable(self, tool: str) -> bool:
+        return self.enabled and self.ttls.get(tool, 0) > 0
+
+    def get(self, tool: str, args: Dict[str,Any]) -> Optional[Dict[str,Any]]:
+        if not self.cacheable(tool):
+            return None
+        key = cache_key(tool, args)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] <= time.monotonic():
+                self._drop(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[3]
+
+    def put(self, tool: str, args: Dict[str,Any], entry: Dict[str,Any]):
+        if not self.cacheable(tool):
+            return
+        key = cache_key(tool, args)
+        size = len(json.dumps(entry.get("response"), default=str))
+        if size > self.max_bytes:
+            return
+        refs = arg_refs(args)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttls[tool], size, refs, entry)
+            self._bytes += size
+            for ref in refs:
+                self._by_ref.setdefault(ref, set()).add(key)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: Key):
+        _, size, refs, _ = self._entries.pop(key)
+        self._bytes -= size
+        for ref in refs:
+            keys = self._by_ref.get(ref)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_ref[ref]
+
+    def invalidate(self, tool: Optional[str] = None, **refs) -> int:
+        """Drop entries for `tool` and/or any of the given document refs; returns count."""
+        with self._lock:
+            if refs:
+                keys = set()
+                for name, value in refs.items():
+                    values = value if isinstance(value, (list, tuple, set)) else [value]
+                    for v in values:
+                        keys |= self._by_ref.get((name, str(v)), set())
+                if tool is not None:
+                    keys = {k for k in keys if k[0] == tool}
+            elif tool is not None:
+                keys = {k for k in self._entries if k[0] == tool}
+            else:
+                keys = set(self._entries)
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> Dict[str,Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "ttls": dict(self.ttls),
+            }
+
+class ValidatorCache:
+    """(tool, args) -> (etag, response), LRU-bounded; freshness is the server's call."""
+    def __init__(self, max_entries: int = 10000, enabled: bool = True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Key, Tuple[str,Any]]" = OrderedDict()
+        self.revalidated = 0
+        self.changed = 0
+
+    def get(self, tool: str, args: Dict[str,Any]) -> Optional[Tuple[str,Any]]:
+        if not self.enabled:
+            return None
+        key = cache_key(tool, args)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                self._entries.move_to_end(key)
+            return item
+
+    def put(self, tool: str, args: Dict[str,Any], etag: Optional[str], response: Any):
+        if not self.enabled or not etag:
+            return
+        key = cache_key(tool, args)
+        with self._lock:
+            self._entries[key] = (etag, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, not_modified: bool):
+        with self._lock:
+            if not_modified:
+                self.revalidated += 1
+            else:
+                self.changed += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str,Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "not_modified": self.revalidated, "changed": self.changed}
+
+class DecisionCache:
+    """content key -> audit decision detail, LRU-bounded in memory, optionally persisted."""
+    def __init__(self, max_entries: int = 100000, enabled: bool = True, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str,Any]]" = OrderedDict()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def _db(self):
+        if self._conn is None and self.path:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS decision_cache (key TEXT PRIMARY KEY, detail TEXT NOT NULL)")
+        return self._conn
+
+    def _remember(self, key: str, detail: Dict[str,Any]):
+        self._entries[key] = detail
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str,Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            detail = self._entries.get(key)
+            if detail is None and self._db() is not None:
+                row = self._conn.execute("SELECT detail FROM decision_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    detail = json.loads(row[0])
+                    self._remember(key, detail)
+            elif detail is not None:
+                self._entries.move_to_end(key)
+            if detail is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(detail)
+
+    def put(self, key: str, detail: Dict[str,Any]):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remember(key, dict(detail))
+            if self._db() is not None:
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO decision_cache (key, detail) VALUES (?, ?)",
+                                       (key, json.dumps(detail)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db() is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM decision_cache")
+
+    def stats(self) -> Dict[str,Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "persistent": bool(self.path), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else None}
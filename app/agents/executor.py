@@ -2,25 +2,87 @@
 Executor Agent:
 - Accepts the planner output and executes ONLY tool calls defined in the OpenAPI
   of the ERP FastAPI server (app.main).
-- Validates requested tool names / paths against the server's openapi.json.
+- Follows the plan's steps as a dependency graph (see scheduler.py).
+- Validates requested tool names / paths against the server's openapi.json,
+  compiled once into a shared ToolRegistry (see tool_registry.py).
 - Logs each tool request/response for full traceability.
+- Caches responses per tool with TTLs; each trace entry records "cached".
+- Keeps the last copy of ETagged documents and revalidates it with
+  If-None-Match; a 304 reuses that copy (trace entry status_code 304).
+- Talks to the server over pooled HTTP, or in-process when ERP_TRANSPORT=inprocess
+  (see transport.py); the allowlist and trace format are the same either way.
+- ERP_WIRE_FORMAT=msgpack asks the tool routers for msgpack instead of JSON;
+  ERP_TRUSTED_CALLER=1 lets them skip response-model validation (see tools/responses.py).
 """
-import requests
+import asyncio
 import os
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
+from .tool_registry import ToolRegistry
+from .scheduler import run_graph, run_graph_async, assemble_trace
+from .three_way import three_way_match
+from .transport import transport_from_env, parse_tool_timeouts, InProcessResponse
+from .cache import ResponseCache, ValidatorCache, DEFAULT_TTLS
+from ..tools import changes
+from ..tools.responses import MSGPACK, decode_body, msgpack
 
 ERP_BASE = os.getenv("ERP_BASE_URL", "http://localhost:8000")
+OPENAPI_TTL = float(os.getenv("ERP_OPENAPI_TTL", "300"))
+TRANSPORT = transport_from_env(ERP_BASE)
+ASYNC_CONCURRENCY = int(os.getenv("ERP_ASYNC_CONCURRENCY", "16"))
+STEP_WORKERS = int(os.getenv("ERP_STEP_WORKERS", "8"))
+_STEP_POOL = None
+_STEP_POOL_PID = None
+_STEP_POOL_LOCK = threading.Lock()
+RESPONSE_CACHE = ResponseCache(
+    ttls={**DEFAULT_TTLS, **parse_tool_timeouts(os.getenv("ERP_CACHE_TTLS", ""))},
+    max_entries=int(os.getenv("ERP_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("ERP_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    enabled=os.getenv("ERP_CACHE", "1") != "0",
+)
+# tool services publish row changes; drop the matching cached responses
+changes.subscribe(RESPONSE_CACHE.invalidate)
+# last ETagged copy per document; not invalidated, the server decides freshness
+VALIDATORS = ValidatorCache(
+    max_entries=int(os.getenv("ERP_CACHE_MAX_ENTRIES", "10000")),
+    enabled=os.getenv("ERP_CONDITIONAL_GET", "1") != "0",
+)
+WIRE_FORMAT = os.getenv("ERP_WIRE_FORMAT", "json").lower()
+TRUSTED_CALLER = os.getenv("ERP_TRUSTED_CALLER", "0") == "1"
+
+def tool_headers() -> Dict[str,str]:
+    headers = {}
+    if WIRE_FORMAT == "msgpack" and msgpack is not None:
+        headers["Accept"] = f"{MSGPACK}, application/json;q=0.5"
+    if TRUSTED_CALLER:
+        headers["X-ERP-Trusted"] = "1"
+    return headers
 
 class ExecutorError(Exception):
     pass
 
 def fetch_openapi():
-    url = f"{ERP_BASE}/openapi.json"
-    r = requests.get(url, timeout=5)
+    r = TRANSPORT.get("/openapi.json", timeout=5)
     r.raise_for_status()
     return r.json()
 
+def load_openapi(etag: str = None):
+    # conditional fetch used by the registry; (None, etag) means "not modified"
+    headers = {"If-None-Match": etag} if etag else {}
+    r = TRANSPORT.get("/openapi.json", headers=headers, timeout=5)
+    if r.status_code == 304:
+        return None, etag
+    r.raise_for_status()
+    return r.json(), r.headers.get("ETag")
+
+REGISTRY = ToolRegistry(load_openapi, ttl=OPENAPI_TTL)
+
+def shutdown():
+    # drain pooled connections; also runs automatically at interpreter exit
+    TRANSPORT.close()
+
 def is_tool_allowed(openapi: Dict[str,Any], tool_name: str) -> bool:
     # find any operationId or path that contains the tool name
     for path, methods in openapi.get("paths", {}).items():
@@ -31,57 +93,101 @@ def is_tool_allowed(openapi: Dict[str,Any], tool_name: str) -> bool:
                 return True
     return False
 
-def call_tool(tool_name: str, args: dict) -> Dict[str,Any]:
-    # Map known tool names to endpoints.
-    # Strict: always validate against openapi.json
-    openapi = fetch_openapi()
-    if not is_tool_allowed(openapi, tool_name):
+def prepare_call(tool_name: str, args: dict):
+    # Strict: only tools present in the (cached) openapi.json may be called
+    spec = REGISTRY.lookup(tool_name)
+    if spec is None:
         raise ExecutorError(f"Tool {tool_name} is not in OpenAPI schema")
-    # call endpoints deterministically
-    if tool_name == "get_purchase_order":
-        path = f"{ERP_BASE}/get_purchase_order/{args['po_id']}"
-        r = requests.get(path, timeout=10)
-    elif tool_name == "get_invoice":
-        path = f"{ERP_BASE}/get_invoice/{args['invoice_id']}"
-        r = requests.get(path, timeout=10)
-    elif tool_name == "check_inventory":
-        # args may contain 'item_id' single or list
-        item_id = args.get("item_id")
-        if item_id is None:
-            raise ExecutorError("check_inventory requires item_id")
-        path = f"{ERP_BASE}/check_inventory/{item_id}"
-        r = requests.get(path, timeout=10)
-    elif tool_name == "get_grn_status":
-        path = f"{ERP_BASE}/get_grn_status/{args['po_id']}"
-        r = requests.get(path, timeout=10)
-    else:
-        raise ExecutorError(f"Unknown/unauthorized tool {tool_name}")
+    missing = [p for p in spec.path_params if args.get(p) is None]
+    if missing:
+        raise ExecutorError(f"{tool_name} requires {', '.join(missing)}")
+    path = spec.path.format(**{p: args[p] for p in spec.path_params})
+    query = {k: v for k, v in args.items() if k in spec.query_params and v is not None}
+    body = {k: v for k, v in args.items() if k not in spec.path_params and k not in spec.query_params}
+    return spec, path, query or None, (body if spec.has_body else None)
 
+def make_log_entry(tool_name: str, r) -> Dict[str,Any]:
+    # works for both requests.Response and httpx.Response
     log_entry = {
         "tool": tool_name,
-        "request": {"url": r.request.url, "method": r.request.method},
+        "request": {"url": str(r.request.url), "method": r.request.method},
         "status_code": r.status_code
     }
     try:
-        json_resp = r.json()
-        log_entry["response"] = json_resp
+        if isinstance(r, InProcessResponse):
+            log_entry["response"] = r.json()  # already a Python object
+        else:
+            log_entry["response"] = decode_body(r.headers.get("content-type", ""), r.content)
     except Exception as e:
         log_entry["response"] = {"error": "non-json response", "text": r.text}
     if r.status_code >= 400:
         raise ExecutorError(f"Tool {tool_name} call failed: {r.status_code} {log_entry['response']}")
     return log_entry
 
-def execute_plan(plan: Dict[str,Any]) -> Dict[str,Any]:
-    trace = []
-    # Step 1: fetch PO
-    po_call = call_tool("get_purchase_order", {"po_id": plan["po_id"]})
-    trace.append(po_call)
-    # Step 2: fetch Invoice
-    inv_call = call_tool("get_invoice", {"invoice_id": plan["invoice_id"]})
-    trace.append(inv_call)
-    # Step 3: line level match is internal: create comparison structure
-    po = po_call["response"]
-    inv = inv_call["response"]
+def request_headers(spec, tool_name: str, args: dict):
+    """Headers for a tool call plus the last ETagged copy to revalidate, if any."""
+    headers = tool_headers()
+    last = VALIDATORS.get(tool_name, args) if spec.method == "GET" else None
+    if last is not None:
+        headers["If-None-Match"] = last[0]
+    return headers, last
+
+def response_entry(tool_name: str, args: dict, r, last) -> Dict[str,Any]:
+    if r.status_code == 304 and last is not None:
+        VALIDATORS.record(not_modified=True)
+        entry = {"tool": tool_name,
+                 "request": {"url": str(r.request.url), "method": r.request.method},
+                 "status_code": 304, "response": last[1]}
+        return store_entry(tool_name, args, entry)
+    entry = make_log_entry(tool_name, r)
+    if last is not None:
+        VALIDATORS.record(not_modified=False)
+    VALIDATORS.put(tool_name, args, r.headers.get("etag"), entry["response"])
+    return store_entry(tool_name, args, entry)
+
+def cached_entry(tool_name: str, args: dict):
+    hit = RESPONSE_CACHE.get(tool_name, args)
+    return dict(hit, cached=True) if hit is not None else None
+
+def store_entry(tool_name: str, args: dict, entry: Dict[str,Any]) -> Dict[str,Any]:
+    entry["cached"] = False
+    RESPONSE_CACHE.put(tool_name, args, entry)
+    return entry
+
+def call_tool(tool_name: str, args: dict) -> Dict[str,Any]:
+    # allowlist is checked even for cache hits
+    spec, path, query, body = prepare_call(tool_name, args)
+    hit = cached_entry(tool_name, args)
+    if hit is not None:
+        return hit
+    headers, last = request_headers(spec, tool_name, args)
+    r = TRANSPORT.request(spec.method, path, tool=tool_name, params=query, json=body, headers=headers)
+    return response_entry(tool_name, args, r, last)
+
+def stream_tool(tool_name: str, args: dict):
+    """Yields NDJSON rows of a streaming tool call (e.g. stream=true) as they arrive; not cached."""
+    spec, path, query, body = prepare_call(tool_name, args)
+    r = TRANSPORT.request(spec.method, path, tool=tool_name, params=query, json=body, stream=True)
+    try:
+        if r.status_code >= 400:
+            make_log_entry(tool_name, r)
+        for line in r.iter_lines():
+            if line:
+                yield json.loads(line)
+    finally:
+        r.close()
+
+def iter_pages(tool_name: str, args: dict = None):
+    """Follows next_cursor through a keyset-paginated listing tool, one page in memory at a time."""
+    args = dict(args or {})
+    while True:
+        page = call_tool(tool_name, args)["response"]
+        yield from page["items"]
+        if not page.get("next_cursor"):
+            return
+        args["cursor"] = page["next_cursor"]
+
+def compare_lines(plan: Dict[str,Any], po: Dict[str,Any], inv: Dict[str,Any]) -> List[Dict[str,Any]]:
     comparisons = []
     # create map by item or line_id
     po_map = {(l["line_id"], l["item_id"]): l for l in po["lines"]}
@@ -99,18 +205,142 @@ def execute_plan(plan: Dict[str,Any]) -> Dict[str,Any]:
             "unit_price_match": (po_line and inv_line and abs(po_line["unit_price"] - inv_line["unit_price"])<= (po_line["unit_price"]*plan["validation_rules"]["price_tolerance_pct"]/100.0 if po_line else 0))
         }
         comparisons.append(comp)
-    # Step 4: inventory checks
-    inventory_trace = []
-    for l in po["lines"]:
-        item_id = l["item_id"]
-        inv_call = call_tool("check_inventory", {"item_id": item_id})
-        inventory_trace.append(inv_call)
-    trace.extend(inventory_trace)
-    result = {
+    return comparisons
+
+def inventory_requests(item_ids: List[str]):
+    # one batch call when the server exposes it, else one call per PO line
+    if not item_ids:
+        return []
+    if REGISTRY.lookup("check_inventory_batch") is not None:
+        return [("check_inventory_batch", {"item_ids": list(dict.fromkeys(item_ids))})]
+    return [("check_inventory", {"item_id": item_id}) for item_id in item_ids]
+
+# symbolic step args produced by the planner -> values taken from earlier step outputs
+ARG_SOURCES = {
+    "from_po_lines": lambda ctx: [l["item_id"] for l in ctx["po"]["lines"]],
+}
+# where a tool step's response is stored for dependent steps
+TOOL_OUTPUTS = {"get_purchase_order": "po", "get_invoice": "invoice", "get_grn_status": "grn"}
+# tool-less steps computed inside the executor: name -> (fn(plan, ctx), output key)
+INTERNAL_STEPS = {
+    "line_level_match": (lambda plan, ctx: compare_lines(plan, ctx["po"], ctx["invoice"]), "comparisons"),
+    "three_way_match": (lambda plan, ctx: three_way_match(ctx["po"], ctx["invoice"], ctx["grn"]), "three_way"),
+}
+# tool-less steps owned by a later agent (the auditor)
+DEFERRED_STEPS = {"audit_decision"}
+
+def resolve_args(args: Dict[str,Any], context: Dict[str,Any]) -> Dict[str,Any]:
+    return {k: ARG_SOURCES[v](context) if isinstance(v, str) and v in ARG_SOURCES else v
+            for k, v in args.items()}
+
+def step_calls(step: Dict[str,Any], context: Dict[str,Any]):
+    args = resolve_args(step.get("args") or {}, context)
+    if step["tool"] == "check_inventory" and "item_ids" in args:
+        return inventory_requests(args["item_ids"])
+    return [(step["tool"], args)]
+
+def run_internal_step(plan: Dict[str,Any], step: Dict[str,Any], context: Dict[str,Any]):
+    handler = INTERNAL_STEPS.get(step["name"])
+    if handler is None:
+        raise ExecutorError(f"No executor handler for step {step['name']}")
+    fn, key = handler
+    context[key] = fn(plan, context)
+    return []
+
+def store_outputs(step: Dict[str,Any], entries: List[Dict[str,Any]], context: Dict[str,Any]):
+    key = TOOL_OUTPUTS.get(step["tool"])
+    if key and entries:
+        context[key] = entries[0]["response"]
+    return entries
+
+def executable_steps(plan: Dict[str,Any]) -> List[Dict[str,Any]]:
+    return [s for s in plan["steps"] if s.get("tool") or s["name"] not in DEFERRED_STEPS]
+
+def build_result(plan: Dict[str,Any], results, context: Dict[str,Any]) -> Dict[str,Any]:
+    trace = assemble_trace(results)
+    failed = [r for _, r in sorted(results.items()) if r.status == "failed"]
+    if failed or "po" not in context or "invoice" not in context:
+        err = ExecutorError(failed[0].error if failed else "plan did not fetch both PO and invoice")
+        err.trace = trace
+        raise err
+    comparisons = context.get("comparisons")
+    if comparisons is None:
+        comparisons = compare_lines(plan, context["po"], context["invoice"])
+    return {
         "trace": trace,
         "comparisons": comparisons,
-        "po": po,
-        "invoice": inv,
+        "po": context["po"],
+        "invoice": context["invoice"],
+        "three_way": context.get("three_way"),
         "plan_seed": plan.get("seed")
     }
-    return result
+
+def step_pool() -> ThreadPoolExecutor:
+    # lazily created (and re-created after fork in batch worker processes)
+    global _STEP_POOL, _STEP_POOL_PID
+    if _STEP_POOL is None or _STEP_POOL_PID != os.getpid():
+        with _STEP_POOL_LOCK:
+            if _STEP_POOL is None or _STEP_POOL_PID != os.getpid():
+                _STEP_POOL = ThreadPoolExecutor(max_workers=STEP_WORKERS, thread_name_prefix="plan-step")
+                _STEP_POOL_PID = os.getpid()
+    return _STEP_POOL
+
+def execute_plan(plan: Dict[str,Any], call=None) -> Dict[str,Any]:
+    """
+    Runs the plan's steps as a dependency graph: ready steps go to a worker pool,
+    steps whose inputs failed are skipped, and each trace entry carries its step id
+    and start/end timestamps. `call` lets batch runs share tool responses across
+    plans (defaults to call_tool).
+    """
+    call = call or call_tool
+    context: Dict[str,Any] = {}
+
+    def run_step(step):
+        if not step.get("tool"):
+            return run_internal_step(plan, step, context)
+        entries = [call(tool_name, args) for tool_name, args in step_calls(step, context)]
+        return store_outputs(step, entries, context)
+
+    results = run_graph(executable_steps(plan), run_step, step_pool())
+    return build_result(plan, results, context)
+
+async def call_tool_async(client, tool_name: str, args: dict, limiter: asyncio.Semaphore) -> Dict[str,Any]:
+    spec, path, query, body = prepare_call(tool_name, args)
+    hit = cached_entry(tool_name, args)
+    if hit is not None:
+        return hit
+    headers, last = request_headers(spec, tool_name, args)
+    async with limiter:
+        r = await client.request(spec.method, path, params=query, json=body, headers=headers,
+                                 timeout=TRANSPORT.timeout_for(tool_name))
+    return response_entry(tool_name, args, r, last)
+
+async def execute_plan_async(plan: Dict[str,Any], client=None, max_concurrency: int = None) -> Dict[str,Any]:
+    """
+    Same result as execute_plan (apart from timestamps), with steps as asyncio tasks:
+    independent steps and the calls within a step run concurrently, bounded by
+    max_concurrency. The trace keeps step order regardless of completion order.
+    """
+    # warm the registry off the event loop so lookups below never block on HTTP
+    await asyncio.to_thread(REGISTRY.openapi)
+    limiter = asyncio.Semaphore(max_concurrency or ASYNC_CONCURRENCY)
+    own_client = client is None
+    if own_client:
+        client = TRANSPORT.async_client()
+    context: Dict[str,Any] = {}
+
+    async def run_step(step):
+        if not step.get("tool"):
+            return run_internal_step(plan, step, context)
+        entries = await asyncio.gather(*[
+            call_tool_async(client, tool_name, args, limiter)
+            for tool_name, args in step_calls(step, context)
+        ])
+        return store_outputs(step, list(entries), context)
+
+    try:
+        results = await run_graph_async(executable_steps(plan), run_step)
+    finally:
+        if own_client:
+            await client.aclose()
+    return build_result(plan, results, context)
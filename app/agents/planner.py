@@ -11,19 +11,23 @@ def deterministic_plan(invoice_id: str, po_id: str) -> Dict[str,Any]:
     # deterministic: base plan on sorted input and fixed sequence
     key = f"{invoice_id}:{po_id}"
     seed = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16)
-    # fixed step list
+    # fixed step list; depends_on edges let the executor run independent steps in parallel
     steps = [
-        {"id": 1, "name": "fetch_po", "tool": "get_purchase_order", "args": {"po_id": po_id}, "description": "Retrieve PO header and lines"},
-        {"id": 2, "name": "fetch_invoice", "tool": "get_invoice", "args": {"invoice_id": invoice_id}, "description": "Retrieve Invoice header and lines"},
-        {"id": 3, "name": "line_level_match", "tool": None, "args": {}, "description": "Compare PO and invoice lines for qty/price/item"},
-        {"id": 4, "name": "inventory_check", "tool": "check_inventory", "args": {"item_ids": "from_po_lines"}, "description": "Check on-hand inventory for each item"},
-        {"id": 5, "name": "audit_decision", "tool": None, "args": {}, "description": "Apply audit rules to produce decision"}
+        {"id": 1, "name": "fetch_po", "tool": "get_purchase_order", "args": {"po_id": po_id}, "depends_on": [], "description": "Retrieve PO header and lines"},
+        {"id": 2, "name": "fetch_invoice", "tool": "get_invoice", "args": {"invoice_id": invoice_id}, "depends_on": [], "description": "Retrieve Invoice header and lines"},
+        {"id": 3, "name": "line_level_match", "tool": None, "args": {}, "depends_on": [1, 2], "description": "Compare PO and invoice lines for qty/price/item"},
+        {"id": 4, "name": "inventory_check", "tool": "check_inventory", "args": {"item_ids": "from_po_lines"}, "depends_on": [1], "description": "Check on-hand inventory for each item"},
+        {"id": 5, "name": "audit_decision", "tool": None, "args": {}, "depends_on": [3, 4, 7], "description": "Apply audit rules to produce decision"},
+        {"id": 6, "name": "fetch_grn", "tool": "get_grn_status", "args": {"po_id": po_id}, "depends_on": [], "description": "Retrieve received quantities (all GRNs) for the PO"},
+        {"id": 7, "name": "three_way_match", "tool": None, "args": {}, "depends_on": [1, 2, 6], "description": "Compare invoiced vs received quantities per line"}
     ]
     # Required tool calls in order (only names and expected response fields)
     required_tool_calls = [
         {"tool_name": "get_purchase_order", "path": "/get_purchase_order/{po_id}", "method":"GET", "expected_response":"POHeader"},
         {"tool_name": "get_invoice", "path": "/get_invoice/{invoice_id}", "method":"GET", "expected_response":"InvoiceHeader"},
-        {"tool_name": "check_inventory", "path": "/check_inventory/{item_id}", "method":"GET", "expected_response":"inventory"}
+        {"tool_name": "check_inventory", "path": "/check_inventory/{item_id}", "method":"GET", "expected_response":"inventory"},
+        {"tool_name": "check_inventory_batch", "path": "/check_inventory_batch", "method":"POST", "expected_response":"inventory_batch", "optional": True},
+        {"tool_name": "get_grn_status", "path": "/get_grn_status/{po_id}", "method":"GET", "expected_response":"grn_summary"}
     ]
     validation_rules = {
         "currency_match": True,
@@ -44,7 +48,7 @@ def deterministic_plan(invoice_id: str, po_id: str) -> Dict[str,Any]:
         "validation_rules": validation_rules,
         "expected_fields": expected_fields,
         "deterministic": True,
-        "version": "1.0"
+        "version": "1.2"
     }
     return plan
 
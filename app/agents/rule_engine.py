@@ -0,0 +1,220 @@
+"""
+Audit Rule Engine:
+- Compiles rules/matching_rules.json into ordered checks (header, then line,
+  then three-way) with the tolerances bound into closures once
+- Compiles rules/audit_policies.json conditions ("no_price_mismatch",
+  "vendor_match", "any_mismatch", ...) into predicates over the reasons found;
+  policies are tried in file order, and no matching policy means ESCALATE
+- Hot reload: the files are stat'ed at most every check_interval seconds and
+  recompiled when their mtime/size changes; decisions already running keep the
+  RuleSet they started with, and a file that fails to compile leaves the
+  previous RuleSet in place (see last_error)
+
+Rule fields: scope (header | line | three_way), field, type (absolute |
+threshold | percentage | equals | presence), tolerance / tolerance_pct.
+Rules without scope/field fall back to LEGACY_RULES by name.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+RULES_PATH = Path(__file__).parent.parent / "rules"
+MATCHING_FILE = "matching_rules.json"
+POLICIES_FILE = "audit_policies.json"
+CHECK_INTERVAL = float(os.getenv("ERP_RULES_CHECK_INTERVAL", "1.0"))
+SCOPES = ("header", "line", "three_way")
+
+# scope / field / type for rule files written before rules carried them
+LEGACY_RULES = {
+    "vendor_mismatch": {"scope": "header", "field": "vendor_id", "type": "equals"},
+    "total_mismatch": {"scope": "header", "field": "total_amount"},
+    "quantity_mismatch": {"scope": "line", "field": "quantity"},
+    "price_mismatch": {"scope": "line", "field": "unit_price"},
+    "missing_po_lines": {"scope": "line", "type": "presence"},
+    "over_billed": {"scope": "three_way", "field": "over_billed_qty"},
+}
+
+class RuleError(Exception):
+    pass
+
+class Check(NamedTuple):
+    reason: str
+    scope: str
+    test: Callable  # header: (po, inv); line: (po_line, inv_line); three_way: (row,) -> True if violated
+    field: Optional[str] = None
+    kind: str = "absolute"
+    tolerance: float = 0.0  # a fraction for percentage rules
+
+def compile_check(name: str, rule: Dict[str,Any]) -> Check:
+    rule = dict(LEGACY_RULES.get(name, {}), **rule)
+    scope, field, kind = rule.get("scope"), rule.get("field"), rule.get("type", "absolute")
+    if scope not in SCOPES:
+        raise RuleError(f"rule {name}: scope must be one of {SCOPES}")
+    if kind == "presence":
+        if scope != "line":
+            raise RuleError(f"rule {name}: presence rules are line-scoped")
+        return Check(name, scope, None, kind=kind)
+    if not field:
+        raise RuleError(f"rule {name}: field is required")
+    tol = float(rule.get("tolerance", 0.0))
+    if scope == "three_way":
+        if kind not in ("absolute", "threshold"):
+            raise RuleError(f"rule {name}: three_way rules compare one field against tolerance")
+        return Check(name, scope, lambda row: row[field] > tol, field, kind, tol)
+    if kind in ("absolute", "threshold"):
+        test = lambda a, b: abs(a[field] - b[field]) > tol
+    elif kind == "percentage":
+        tol = float(rule.get("tolerance_pct", 0.0)) / 100.0
+        test = lambda a, b: abs(a[field] - b[field]) > a[field] * tol
+    elif kind == "equals":
+        test = lambda a, b: a[field] != b[field]
+    else:
+        raise RuleError(f"rule {name}: unknown type {kind!r}")
+    return Check(name, scope, test, field, kind, tol)
+
+def compile_condition(cond: str) -> Callable[[frozenset], bool]:
+    if cond == "any_mismatch":
+        return lambda reasons: bool(reasons)
+    if cond == "all_match":
+        return lambda reasons: not reasons
+    if cond.startswith("no_"):
+        reason = cond[3:]
+        return lambda reasons: reason not in reasons
+    if cond.endswith("_match"):
+        reason = cond[:-len("_match")] + "_mismatch"
+        return lambda reasons: reason not in reasons
+    return lambda reasons: cond in reasons
+
+def condition_covers(cond: str) -> Optional[str]:
+    """The reason a passing condition rules out, if any."""
+    if cond.startswith("no_"):
+        return cond[3:]
+    if cond.endswith("_match") and cond != "all_match":
+        return cond[:-len("_match")] + "_mismatch"
+    return None
+
+class RuleSet:
+    """Immutable compiled rules; safe to share between threads."""
+    def __init__(self, matching: Dict[str,Any], policies: Dict[str,Any], fingerprint: str = ""):
+        self.matching_version = matching.get("version", "unknown")
+        self.policy_version = policies.get("version", "unknown")
+        self.fingerprint = fingerprint
+        checks = [compile_check(name, rule) for name, rule in matching.get("rules", {}).items()]
+        self.rule_names = [c.reason for c in checks]
+        self.header_checks = [c for c in checks if c.scope == "header"]
+        self.line_checks = [c for c in checks if c.scope == "line" and c.test is not None]
+        self.presence = [c.reason for c in checks if c.scope == "line" and c.test is None]
+        self.three_way_checks = [c for c in checks if c.scope == "three_way"]
+        self.policies: List[Tuple[str, List[Callable], str]] = []
+        for pname, policy in policies.get("policies", {}).items():
+            decision = policy.get("decision")
+            if decision not in ("APPROVE", "ESCALATE"):
+                raise RuleError(f"policy {pname}: decision must be APPROVE or ESCALATE")
+            conds = policy.get("conditions", [])
+            if decision == "APPROVE" and "all_match" not in conds:
+                # an approval that ignores a declared rule would approve its mismatches
+                unchecked = set(self.rule_names) - {condition_covers(c) for c in conds}
+                if unchecked:
+                    raise RuleError(f"policy {pname} approves without checking {sorted(unchecked)}")
+            self.policies.append((pname, [compile_condition(c) for c in conds], decision))
+        self.reason_text = {}
+        for policy in policies.get("policies", {}).values():
+            self.reason_text.update(policy.get("escalation_reasons_map", {}))
+
+    def reasons(self, execution_result: Dict[str,Any]) -> List[str]:
+        po, inv = execution_result["po"], execution_result["invoice"]
+        found = set()
+        for c in self.header_checks:
+            if c.test(po, inv):
+                found.add(c.reason)
+        for comp in execution_result["comparisons"]:
+            po_line, inv_line = comp.get("po_line"), comp.get("invoice_line")
+            if not po_line or not inv_line:
+                found.update(self.presence)
+                continue
+            for c in self.line_checks:
+                if c.reason not in found and c.test(po_line, inv_line):
+                    found.add(c.reason)
+        for c in self.three_way_checks:
+            if any(c.test(row) for row in execution_result.get("three_way") or []):
+                found.add(c.reason)
+        return sorted(found)
+
+    def decide(self, reasons: List[str]) -> Tuple[str, Optional[str]]:
+        """(decision, policy name); ESCALATE with no policy when nothing matches."""
+        found = frozenset(reasons)
+        for name, conds, decision in self.policies:
+            if all(cond(found) for cond in conds):
+                return decision, name
+        return "ESCALATE", None
+
+    def evaluate(self, execution_result: Dict[str,Any]) -> Tuple[str, List[str]]:
+        reasons = self.reasons(execution_result)
+        return self.decide(reasons)[0], reasons
+
+def load_ruleset(rules_dir: Path = RULES_PATH) -> RuleSet:
+    raw_matching = (rules_dir / MATCHING_FILE).read_bytes()
+    raw_policies = (rules_dir / POLICIES_FILE).read_bytes()
+    fingerprint = hashlib.sha256(raw_matching + b"\0" + raw_policies).hexdigest()
+    try:
+        return RuleSet(json.loads(raw_matching), json.loads(raw_policies), fingerprint)
+    except ValueError as e:
+        raise RuleError(f"cannot parse rule files in {rules_dir}: {e}") from e
+
+class RuleEngine:
+    def __init__(self, rules_dir: Path = RULES_PATH, check_interval: float = CHECK_INTERVAL):
+        self.rules_dir = Path(rules_dir)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._ruleset: Optional[RuleSet] = None
+        self._stamp = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+    def _file_stamp(self):
+        out = []
+        for name in (MATCHING_FILE, POLICIES_FILE):
+            st = os.stat(self.rules_dir / name)
+            out.append((st.st_mtime_ns, st.st_size))
+        return tuple(out)
+
+    def current(self) -> RuleSet:
+        now = time.monotonic()
+        ruleset = self._ruleset
+        if ruleset is not None and now < self._next_check:
+            return ruleset
+        with self._lock:
+            if self._ruleset is not None and now < self._next_check:
+                return self._ruleset
+            self._next_check = now + self.check_interval
+            try:
+                stamp = self._file_stamp()
+                if stamp != self._stamp or self._ruleset is None:
+                    self._ruleset = load_ruleset(self.rules_dir)
+                    self._stamp = stamp
+                    self.reloads += 1
+                    self.last_error = None
+            except (OSError, RuleError) as e:
+                if self._ruleset is None:
+                    raise
+                # keep deciding with the last good rules
+                self.last_error = str(e)
+            return self._ruleset
+
+    def reload(self) -> RuleSet:
+        with self._lock:
+            self._next_check = 0.0
+            self._stamp = None
+        return self.current()
+
+    def stats(self) -> Dict[str,Any]:
+        rs = self._ruleset
+        return {"reloads": self.reloads, "last_error": self.last_error,
+                "matching_version": rs.matching_version if rs else None,
+                "policy_version": rs.policy_version if rs else None,
+                "fingerprint": rs.fingerprint if rs else None}
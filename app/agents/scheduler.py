@@ -0,0 +1,159 @@
+"""
+Plan Scheduler:
+- Treats the planner's steps as a dependency graph (explicit `depends_on` edges;
+  plans without them keep the old strictly sequential order)
+- Runs every ready step on a worker pool (or as asyncio tasks), skips steps
+  whose inputs failed, and records start/end timestamps per step
+- The trace is assembled in step-id order, never in completion order
+"""
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+class SchedulerError(Exception):
+    pass
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+def step_dependencies(steps: List[Dict[str,Any]]) -> Dict[int, List[int]]:
+    ids = [s["id"] for s in steps]
+    if len(set(ids)) != len(ids):
+        raise SchedulerError("duplicate step ids in plan")
+    deps = {}
+    for pos, step in enumerate(steps):
+        if "depends_on" in step:
+            deps[step["id"]] = list(step["depends_on"] or [])
+        else:
+            # legacy plans: each step waits for the one before it
+            deps[step["id"]] = [steps[pos - 1]["id"]] if pos else []
+    for sid, ds in deps.items():
+        unknown = [d for d in ds if d not in deps]
+        if unknown:
+            raise SchedulerError(f"step {sid} depends on unknown step(s) {unknown}")
+    return deps
+
+def topological_order(deps: Dict[int, List[int]]) -> List[int]:
+    order, state = [], {}
+    def visit(sid, path):
+        if state.get(sid) == "done":
+            return
+        if state.get(sid) == "visiting":
+            raise SchedulerError(f"dependency cycle through steps {path + [sid]}")
+        state[sid] = "visiting"
+        for d in sorted(deps[sid]):
+            visit(d, path + [sid])
+        state[sid] = "done"
+        order.append(sid)
+    for sid in sorted(deps):
+        visit(sid, [])
+    return order
+
+class StepResult:
+    __slots__ = ("step", "status", "entries", "error", "started_at", "ended_at", "duration_ms")
+
+    def __init__(self, step: Dict[str,Any], status: str, entries: Optional[List[Dict[str,Any]]] = None,
+                 error: Optional[str] = None, started_at: Optional[str] = None,
+                 ended_at: Optional[str] = None, duration_ms: Optional[float] = None):
+        self.step = step
+        self.status = status
+        self.entries = entries or []
+        self.error = error
+        self.started_at = started_at
+        self.ended_at = ended_at
+        self.duration_ms = duration_ms
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+    def trace_entries(self) -> List[Dict[str,Any]]:
+        meta = {
+            "step": self.step["id"],
+            "step_name": self.step.get("name"),
+            "status": self.status,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "duration_ms": self.duration_ms,
+        }
+        if self.error:
+            meta["error"] = self.error
+        if not self.entries:
+            return [dict({"tool": self.step.get("tool")}, **meta)]
+        # copy: tool entries may be shared with the response cache
+        return [dict(e, **meta) for e in self.entries]
+
+def _skip(step, results, deps) -> Optional[StepResult]:
+    failed = [d for d in deps if not results[d].ok]
+    if failed:
+        return StepResult(step, "skipped", error=f"dependency failed: {failed}")
+    return None
+
+def _timed(run_step: Callable, step: Dict[str,Any]) -> StepResult:
+    started, t0 = utc_now(), time.perf_counter()
+    try:
+        entries, status, error = run_step(step), "ok", None
+    except Exception as e:
+        entries, status, error = None, "failed", str(e)
+    return StepResult(step, status, entries, error, started, utc_now(),
+                      round((time.perf_counter() - t0) * 1000.0, 3))
+
+async def _timed_async(run_step: Callable, step: Dict[str,Any]) -> StepResult:
+    started, t0 = utc_now(), time.perf_counter()
+    try:
+        entries, status, error = await run_step(step), "ok", None
+    except Exception as e:
+        entries, status, error = None, "failed", str(e)
+    return StepResult(step, status, entries, error, started, utc_now(),
+                      round((time.perf_counter() - t0) * 1000.0, 3))
+
+def run_graph(steps: List[Dict[str,Any]], run_step: Callable, pool) -> Dict[int, StepResult]:
+    """run_step(step) -> list of trace entries; raising marks the step failed."""
+    deps = step_dependencies(steps)
+    topological_order(deps)
+    by_id = {s["id"]: s for s in steps}
+    results: Dict[int, StepResult] = {}
+    pending = sorted(by_id)
+    running = {}
+    while pending or running:
+        progressed = True
+        while progressed:
+            progressed = False
+            for sid in list(pending):
+                if all(d in results for d in deps[sid]):
+                    pending.remove(sid)
+                    progressed = True
+                    skipped = _skip(by_id[sid], results, deps[sid])
+                    if skipped:
+                        results[sid] = skipped
+                    else:
+                        running[pool.submit(_timed, run_step, by_id[sid])] = sid
+        if not running:
+            break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for fut in done:
+            results[running.pop(fut)] = fut.result()
+    return results
+
+async def run_graph_async(steps: List[Dict[str,Any]], run_step: Callable) -> Dict[int, StepResult]:
+    """Async twin of run_graph; run_step(step) is a coroutine function."""
+    deps = step_dependencies(steps)
+    by_id = {s["id"]: s for s in steps}
+    tasks: Dict[int, asyncio.Task] = {}
+
+    async def run(sid):
+        dep_results = {d: await tasks[d] for d in deps[sid]}
+        skipped = _skip(by_id[sid], dep_results, deps[sid])
+        return skipped or await _timed_async(run_step, by_id[sid])
+
+    for sid in topological_order(deps):
+        tasks[sid] = asyncio.ensure_future(run(sid))
+    return {sid: await task for sid, task in tasks.items()}
+
+def assemble_trace(results: Dict[int, StepResult]) -> List[Dict[str,Any]]:
+    trace = []
+    for sid in sorted(results):
+        trace.extend(results[sid].trace_entries())
+    return trace
@@ -0,0 +1,35 @@
+"""
+Three-way match:
+- Joins PO lines, invoice lines and received (GRN) quantities per (line_id, item_id)
+- Hash joins only, so a PO with thousands of lines and many partial receipts is
+  matched in one linear pass
+- Flags over-billed lines (invoiced quantity > received quantity)
+"""
+from typing import Any, Dict, List
+
+def received_by_line(grn_summary: Dict[str,Any]) -> Dict[tuple, float]:
+    received = {}
+    for l in grn_summary.get("lines", []):
+        key = (l["line_id"], l["item_id"])
+        received[key] = received.get(key, 0.0) + l["received_qty"]
+    return received
+
+def three_way_match(po: Dict[str,Any], inv: Dict[str,Any], grn: Dict[str,Any]) -> List[Dict[str,Any]]:
+    received = received_by_line(grn.get("grn_summary", grn))
+    ordered = {(l["line_id"], l["item_id"]): l["quantity"] for l in po["lines"]}
+    invoiced = {}
+    for l in inv["lines"]:
+        key = (l["line_id"], l["item_id"])
+        invoiced[key] = invoiced.get(key, 0.0) + l["quantity"]
+    rows = []
+    for key in sorted(set(ordered) | set(invoiced) | set(received)):
+        inv_qty = invoiced.get(key, 0.0)
+        rec_qty = received.get(key, 0.0)
+        rows.append({
+            "key": key,
+            "ordered_qty": ordered.get(key),
+            "invoiced_qty": inv_qty,
+            "received_qty": rec_qty,
+            "over_billed_qty": max(inv_qty - rec_qty, 0.0),
+        })
+    return rows
@@ -0,0 +1,137 @@
+"""
+Tool Registry:
+- Compiles the ERP server's openapi.json into an O(1) index of
+  tool name -> (method, path template, params)
+- Fetches the schema once and shares it across plans and threads
+- Revalidates after a TTL; rebuilds only when the ETag or schema version changes
+- Exposes hit/miss counters for tuning
+"""
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+PATH_PARAM_RE = re.compile(r"{([^}]+)}")
+
+class ToolSpec(NamedTuple):
+    name: str
+    method: str
+    path: str
+    path_params: Tuple[str, ...]
+    query_params: Tuple[str, ...]
+    has_body: bool
+
+def tool_name_for_path(path: str) -> str:
+    # "/get_purchase_order/{po_id}" -> "get_purchase_order"
+    return path.strip("/").split("/", 1)[0]
+
+def compile_openapi(openapi: Dict[str,Any]) -> Dict[str,ToolSpec]:
+    index = {}
+    for path, methods in openapi.get("paths", {}).items():
+        name = tool_name_for_path(path)
+        if not name or name.startswith("{"):
+            continue
+        for method, meta in methods.items():
+            params = meta.get("parameters", [])
+            spec = ToolSpec(
+                name=name,
+                method=method.upper(),
+                path=path,
+                path_params=tuple(PATH_PARAM_RE.findall(path)),
+                query_params=tuple(p["name"] for p in params if p.get("in") == "query"),
+                has_body="requestBody" in meta,
+            )
+            # first declared method wins, mirroring FastAPI's route order
+            index.setdefault(name, spec)
+    return index
+
+# loader(etag) -> (schema or None when not modified, etag)
+Loader = Callable[[Optional[str]], Tuple[Optional[Dict[str,Any]], Optional[str]]]
+
+class ToolRegistry:
+    def __init__(self, loader: Loader, ttl: float = 300.0):
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index: Dict[str,ToolSpec] = {}
+        self._openapi: Optional[Dict[str,Any]] = None
+        self._etag: Optional[str] = None
+        self._version: Optional[str] = None
+        self._expires_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.rebuilds = 0
+
+    def _refresh_locked(self):
+        schema, etag = self.loader(self._etag if self._openapi is not None else None)
+        self.refreshes += 1
+        self._expires_at = time.monotonic() + self.ttl
+        if schema is None:
+            # 304 Not Modified: keep the compiled index
+            return
+        version = schema.get("info", {}).get("version")
+        unchanged = (
+            self._openapi is not None
+            and etag is not None and etag == self._etag
+            and version == self._version
+        )
+        self._etag = etag
+        if unchanged:
+            return
+        self._openapi = schema
+        self._version = version
+        self._index = compile_openapi(schema)
+        self.rebuilds += 1
+
+    def _ensure_fresh(self) -> bool:
+        """Returns True when the index had to be (re)loaded."""
+        if self._openapi is not None and time.monotonic() < self._expires_at:
+            return False
+        with self._lock:
+            if self._openapi is not None and time.monotonic() < self._expires_at:
+                return False
+            self._refresh_locked()
+            return True
+
+    def lookup(self, tool_name: str) -> Optional[ToolSpec]:
+        reloaded = self._ensure_fresh()
+        spec = self._index.get(tool_name)
+        with self._lock:
+            if reloaded:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return spec
+
+    def openapi(self) -> Dict[str,Any]:
+        self._ensure_fresh()
+        return self._openapi
+
+    def tools(self) -> List[str]:
+        self._ensure_fresh()
+        return sorted(self._index)
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._index = {}
+            self._openapi = None
+            self._etag = None
+            self._version = None
+            self._expires_at = 0.0
+
+    def stats(self) -> Dict[str,Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "rebuilds": self.rebuilds,
+                "tools": len(self._index),
+                "version": self._version,
+                "etag": self._etag,
+            }
@@ -0,0 +1,349 @@
+"""
+Executor transport:
+- One pooled, keep-alive HTTP connection pool per ERP base URL
+- Thread-local requests.Session objects sharing a single HTTPAdapter, so the
+  urllib3 pool (which is thread-safe) is reused across worker threads
+- Per-tool timeouts and a close() shutdown hook (also registered with atexit)
+- ERP_TRANSPORT=inprocess dispatches straight into the tool routers of
+  app.main (no socket, no JSON round-trip) for co-located batch jobs and tests
+"""
+import asyncio
+import atexit
+import inspect
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+def parse_tool_timeouts(spec: str) -> Dict[str,float]:
+    # "check_inventory=2,get_purchase_order=10" -> {"check_inventory": 2.0, ...}
+    out = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        out[name.strip()] = float(value)
+    return out
+
+class HttpTransport:
+    def __init__(self, base_url: str, pool_size: int = 10, timeout: float = 10.0,
+                 tool_timeouts: Optional[Dict[str,float]] = None, pool_block: bool = False):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                   pool_block=pool_block, max_retries=0)
+        self._local = threading.local()
+        self._sessions_created = 0
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def session(self) -> requests.Session:
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = requests.Session()
+            s.headers["Connection"] = "keep-alive"
+            s.mount("http://", self.adapter)
+            s.mount("https://", self.adapter)
+            self._local.session = s
+            with self._lock:
+                self._sessions_created += 1
+        return s
+
+    def timeout_for(self, tool: Optional[str]) -> float:
+        return self.tool_timeouts.get(tool, self.timeout)
+
+    def request(self, method: str, path: str, tool: Optional[str] = None, **kwargs) -> requests.Response:
+        if self.closed:
+            raise RuntimeError("transport is closed")
+        kwargs.setdefault("timeout", self.timeout_for(tool))
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        return self.session().request(method, url, **kwargs)
+
+    def get(self, path: str, tool: Optional[str] = None, **kwargs) -> requests.Response:
+        return self.request("GET", path, tool=tool, **kwargs)
+
+    def stats(self) -> Dict[str,Any]:
+        connections = requests_served = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requests_served += pool.num_requests
+        return {"pool_size": self.pool_size, "connections_opened": connections,
+                "requests": requests_served, "sessions": self._sessions_created}
+
+    def async_client(self):
+        import httpx
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.AsyncClient(base_url=self.base_url, limits=limits)
+
+    def close(self):
+        # sessions only hold the shared adapter, so closing it drains every pool
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.adapter.close()
+
+_NO_PAYLOAD = object()
+_REQUIRED = object()
+
+class InProcessResponse:
+    """The subset of requests.Response / httpx.Response the executor relies on."""
+    def __init__(self, method: str, url: str, status_code: int, payload: Any = _NO_PAYLOAD,
+                 body: bytes = None, headers: Dict[str,str] = None):
+        self.request = SimpleNamespace(url=url, method=method)
+        self.status_code = status_code
+        self.headers = headers or {"content-type": "application/json"}
+        self._payload = payload
+        self._body = body
+
+    @property
+    def content(self) -> bytes:
+        if self._body is None:
+            self._body = json.dumps(self._payload).encode()
+        return self._body
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for url: {self.request.url}", response=self)
+
+    def iter_lines(self, **kwargs):
+        yield from self.content.splitlines()
+
+    def close(self):
+        pass
+
+    def json(self):
+        if self._payload is not _NO_PAYLOAD:
+            return self._payload
+        return json.loads(self.content)
+
+class InProcessTransport:
+    """
+    Calls the FastAPI tool routes of app.main directly. Python objects returned by
+    the endpoints are handed to the executor as-is, so there is no network hop and
+    no JSON encode/decode. Arguments are validated as FastAPI would (422 with the
+    same error list), response_model applies to returned objects, and
+    HTTPExceptions become the same status codes as over HTTP.
+    """
+    def __init__(self, base_url: str, timeout: float = 10.0,
+                 tool_timeouts: Optional[Dict[str,float]] = None, routers=None):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = 1
+        self.timeout = timeout
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self._routers = routers
+        self._app = None
+        self._bindings: Dict[int, List[Tuple[str, str, Any, Any]]] = {}
+        self._response_adapters: Dict[int, Any] = {}
+        self.closed = False
+
+    def _load(self):
+        if self._app is None:
+            from ..main import app, TOOL_ROUTERS
+            self._routers = self._routers or TOOL_ROUTERS
+            self._app = app
+        return self._app
+
+    def timeout_for(self, tool: Optional[str]) -> float:
+        return self.tool_timeouts.get(tool, self.timeout)
+
+    def _match(self, method: str, path: str):
+        from starlette.routing import Match
+        scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+        for router in self._routers:
+            for route in router.routes:
+                match, child = route.matches(scope)
+                if match == Match.FULL:
+                    return route, child.get("path_params", {})
+        return None, None
+
+    def _binding(self, route) -> List[Tuple[str, str, Any, Any]]:
+        """(name, source, validator, default) per endpoint parameter, built once per route."""
+        binding = self._bindings.get(id(route))
+        if binding is None:
+            from pydantic import BaseModel, TypeAdapter
+            from pydantic_core import PydanticUndefined
+            from starlette.requests import Request
+            binding = []
+            for name, p in inspect.signature(route.endpoint).parameters.items():
+                ann = Any if p.annotation is inspect.Parameter.empty else p.annotation
+                # unwrap Query(...)/Header(...) defaults
+                default = getattr(p.default, "default", p.default)
+                if default in (inspect.Parameter.empty, Ellipsis, PydanticUndefined):
+                    default = _REQUIRED
+                if inspect.isclass(ann) and issubclass(ann, Request):
+                    binding.append((name, "request", None, None))
+                elif inspect.isclass(ann) and issubclass(ann, BaseModel):
+                    binding.append((name, "body", TypeAdapter(ann), default))
+                else:
+                    source = "path" if name in route.param_convertors else "query"
+                    binding.append((name, source, TypeAdapter(ann), default))
+            self._bindings[id(route)] = binding
+        return binding
+
+    def _call_endpoint(self, route, method, path, path_params, params, body, headers, scope):
+        """
+        Binds and validates arguments the way FastAPI does for the same HTTP
+        request: path and query values are validated from their string form,
+        the body against its model; failures raise RequestValidationError.
+        """
+        from fastapi.exceptions import RequestValidationError
+        from pydantic import ValidationError
+        from starlette.requests import Request
+        kwargs, errors = {}, []
+        for name, source, adapter, default in self._binding(route):
+            if source == "request":
+                scope.update({
+                    "type": "http", "method": method, "path": path, "root_path": "",
+                    "query_string": urlencode(params or {}, doseq=True).encode(),
+                    "headers": [(k.lower().encode(), str(v).encode()) for k, v in (headers or {}).items()],
+                    # lets app.tools.responses hand back the Python object unencoded
+                    "erp.inprocess": True,
+                })
+                kwargs[name] = Request(scope)
+                continue
+            if source == "path":
+                value = path_params.get(name, _REQUIRED)
+            elif source == "query":
+                value = (params or {}).get(name, _REQUIRED)
+                if value is not _REQUIRED and not isinstance(value, (list, tuple)):
+                    value = str(value)  # what the query string would carry
+            else:
+                value = _REQUIRED if body is None else body
+            loc = ("body",) if source == "body" else (source, name)
+            if value is _REQUIRED:
+                if default is _REQUIRED:
+                    errors.append({"type": "missing", "loc": loc, "msg": "Field required", "input": None})
+                else:
+                    kwargs[name] = default
+                continue
+            try:
+                kwargs[name] = adapter.validate_python(value)
+            except ValidationError as e:
+                errors.extend(dict(err, loc=loc + tuple(err["loc"])) for err in e.errors(include_url=False))
+        if errors:
+            raise RequestValidationError(errors)
+        result = route.endpoint(**kwargs)
+        if inspect.iscoroutine(result):
+            result = _run(result)
+        return result
+
+    def _response_content(self, route, result, scope):
+        """Applies response_model as FastAPI does for returned objects; render() output is left as is."""
+        if route.response_model is None or scope.get("erp.rendered"):
+            return result
+        from pydantic import TypeAdapter
+        adapter = self._response_adapters.get(id(route))
+        if adapter is None:
+            adapter = self._response_adapters[id(route)] = TypeAdapter(route.response_model)
+        return adapter.dump_python(adapter.validate_python(result), mode="json")
+
+    def request(self, method: str, path: str, tool: Optional[str] = None, params=None,
+                json=None, headers=None, timeout=None, **kwargs) -> InProcessResponse:
+        from fastapi import HTTPException
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.exceptions import RequestValidationError
+        from pydantic import ValidationError
+        from starlette.responses import Response, StreamingResponse
+        app = self._load()
+        method = method.upper()
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urlencode(params, doseq=True)
+        if path == app.openapi_url:
+            return InProcessResponse(method, url, 200, payload=app.openapi())
+        route, path_params = self._match(method, path)
+        if route is None:
+            return InProcessResponse(method, url, 404, payload={"detail": "Not Found"})
+        scope = {}
+        try:
+            result = self._call_endpoint(route, method, path, path_params, params, json, headers, scope)
+        except HTTPException as e:
+            return InProcessResponse(method, url, e.status_code, payload={"detail": e.detail},
+                                     headers=dict(getattr(e, "headers", None) or {}))
+        except RequestValidationError as e:
+            return InProcessResponse(method, url, 422, payload={"detail": jsonable_encoder(e.errors())})
+        if isinstance(result, StreamingResponse):
+            body = _run(_drain(result.body_iterator))
+            return InProcessResponse(method, url, result.status_code, body=body,
+                                     headers={k.decode(): v.decode() for k, v in result.raw_headers})
+        if isinstance(result, Response):
+            return InProcessResponse(method, url, result.status_code, body=result.body,
+                                     headers={k.decode().lower(): v.decode() for k, v in result.raw_headers})
+        try:
+            result = self._response_content(route, result, scope)
+        except ValidationError:
+            return InProcessResponse(method, url, 500, payload={"detail": "Internal Server Error"})
+        # headers set by the endpoint (e.g. ETag) travel back through the request scope
+        return InProcessResponse(method, url, 200, payload=result,
+                                 headers=dict({"content-type": "application/json"},
+                                              **scope.get("erp.response_headers", {})))
+
+    def get(self, path: str, tool: Optional[str] = None, **kwargs) -> InProcessResponse:
+        return self.request("GET", path, tool=tool, **kwargs)
+
+    def async_client(self):
+        return InProcessAsyncClient(self)
+
+    def stats(self) -> Dict[str,Any]:
+        return {"mode": "inprocess"}
+
+    def close(self):
+        self.closed = True
+
+def _run(coro):
+    """asyncio.run, or on a helper thread when this thread already runs an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+async def _drain(body_iterator) -> bytes:
+    chunks = []
+    async for chunk in body_iterator:
+        chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode())
+    return b"".join(chunks)
+
+class InProcessAsyncClient:
+    """Async facade for execute_plan_async; endpoints are sync, so they run in worker threads."""
+    def __init__(self, transport: InProcessTransport):
+        self.transport = transport
+
+    async def request(self, method, path, params=None, json=None, headers=None, timeout=None):
+        return await asyncio.to_thread(self.transport.request, method, path,
+                                       params=params, json=json, headers=headers)
+
+    async def aclose(self):
+        pass
+
+def transport_from_env(base_url: str):
+    if os.getenv("ERP_TRANSPORT", "http").lower() == "inprocess":
+        return InProcessTransport(
+            base_url,
+            timeout=float(os.getenv("ERP_TIMEOUT", "10")),
+            tool_timeouts=parse_tool_timeouts(os.getenv("ERP_TOOL_TIMEOUTS", "")),
+        )
+    transport = HttpTransport(
+        base_url,
+        pool_size=int(os.getenv("ERP_POOL_SIZE", "10")),
+        timeout=float(os.getenv("ERP_TIMEOUT", "10")),
+        tool_timeouts=parse_tool_timeouts(os.getenv("ERP_TOOL_TIMEOUTS", "")),
+    )
+    atexit.register(transport.close)
+    return transport
@@ -0,0 +1,108 @@
+"""
+Audit log exports:
+- json_chunks / csv_chunks: streaming generators over an entry iterator, one
+  entry in memory at a time; json_chunks produces the same text as
+  json.dumps(entries, indent=2)
+- write_columnar: typed Parquet or Arrow IPC file (pyarrow, optional) written in
+  record batches of EXPORT_BATCH entries, so memory is bounded by the batch
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+EXPORT_BATCH = int(os.getenv("AUDIT_EXPORT_BATCH", "10000"))
+CSV_COLUMNS = ["timestamp", "decision", "reasons", "po_id", "invoice_id", "hmac"]
+COLUMNS = ["timestamp", "decision", "reasons", "po_id", "invoice_id", "policy_version", "hmac"]
+
+def json_chunks(entries: Iterable[Dict[str,Any]]) -> Iterator[str]:
+    first = True
+    for e in entries:
+        # escaped strings never contain a raw newline, so this indents every line
+        yield ("[\n  " if first else ",\n  ") + json.dumps(e, indent=2).replace("\n", "\n  ")
+        first = False
+    yield "[]" if first else "\n]"
+
+def csv_chunks(entries: Iterable[Dict[str,Any]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    for e in entries:
+        rec = e["record"]
+        payload = rec["payload"]
+        writer.writerow([
+            rec["timestamp"],
+            payload.get("decision"),
+            "|".join(payload.get("reasons",[])),
+            payload.get("po_id"),
+            payload.get("invoice_id"),
+            e.get("hmac")
+        ])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+def schema():
+    return pa.schema([
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("decision", pa.string()),
+        ("reasons", pa.list_(pa.string())),
+        ("po_id", pa.string()),
+        ("invoice_id", pa.string()),
+        ("policy_version", pa.string()),
+        ("hmac", pa.string()),
+    ])
+
+def _timestamp(value: str) -> datetime:
+    ts = datetime.fromisoformat(value[:-1] if value.endswith("Z") else value)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+def _batch(entries: List[Dict[str,Any]]):
+    columns: Dict[str, List[Any]] = {c: [] for c in COLUMNS}
+    for e in entries:
+        rec = e["record"]
+        payload = rec.get("payload") or {}
+        columns["timestamp"].append(_timestamp(rec["timestamp"]))
+        columns["decision"].append(payload.get("decision"))
+        columns["reasons"].append([str(r) for r in payload.get("reasons") or []])
+        columns["po_id"].append(payload.get("po_id"))
+        columns["invoice_id"].append(payload.get("invoice_id"))
+        version = payload.get("policy_version")
+        columns["policy_version"].append(None if version is None else str(version))
+        columns["hmac"].append(e.get("hmac"))
+    return pa.RecordBatch.from_pydict(columns, schema=schema())
+
+def write_columnar(entries: Iterable[Dict[str,Any]], dst: Path, fmt: str = "parquet",
+                   batch_size: int = EXPORT_BATCH) -> int:
+    """Writes entries as a Parquet ("parquet") or Arrow IPC ("arrow") file; returns the row count."""
+    if pa is None:
+        raise RuntimeError("Parquet/Arrow export needs pyarrow (pip install pyarrow)")
+    if fmt not in ("parquet", "arrow"):
+        raise ValueError(f"unknown columnar format {fmt!r}")
+    rows = 0
+    writer = pq.ParquetWriter(str(dst), schema()) if fmt == "parquet" else pa.ipc.new_file(str(dst), schema())
+    try:
+        batch: List[Dict[str,Any]] = []
+        for e in entries:
+            batch.append(e)
+            if len(batch) >= batch_size:
+                writer.write_batch(_batch(batch))
+                rows += len(batch)
+                batch = []
+        if batch or not rows:
+            writer.write_batch(_batch(batch))
+            rows += len(batch)
+    finally:
+        writer.close()
+    return rows
@@ -0,0 +1,154 @@
+"""
+Audit log index:
+- SQLite sidecar (<log>.index.db) mapping po_id, invoice_id, decision, reason
+  codes and timestamp to the byte offset of each entry in the log
+- Written by AuditLogManager's buffered writer thread after each group, and
+  caught up before each query; indexed_offset() records how far the log has
+  been indexed, so anything the writer did not index (unbuffered appends, a
+  crash, another process) is picked up from that offset, and the index can
+  always be rebuilt from the log alone
+- Queries return offsets in log order; the manager reads entries lazily by seek
+- The index holds no audit data of its own; synchronous=OFF is enough
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+  offset INTEGER PRIMARY KEY,
+  seq INTEGER NOT NULL,
+  ts REAL,
+  po_id TEXT,
+  invoice_id TEXT,
+  decision TEXT
+);
+CREATE TABLE IF NOT EXISTS entry_reasons (
+  offset INTEGER NOT NULL,
+  reason TEXT NOT NULL,
+  PRIMARY KEY (reason, offset)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+CREATE INDEX IF NOT EXISTS idx_entries_po ON entries (po_id, offset);
+CREATE INDEX IF NOT EXISTS idx_entries_invoice ON entries (invoice_id, offset);
+CREATE INDEX IF NOT EXISTS idx_entries_decision ON entries (decision, offset);
+CREATE INDEX IF NOT EXISTS idx_entries_ts ON entries (ts);
+"""
+
+# (ts, po_id, invoice_id, decision, reasons) of one entry
+Fields = Tuple[Optional[float], Optional[str], Optional[str], Optional[str], List[str]]
+# (seq, offset) + Fields
+Row = Tuple[int, int, Optional[float], Optional[str], Optional[str], Optional[str], List[str]]
+TimeBound = Union[None, str, float, datetime]
+
+def epoch(value: TimeBound) -> Optional[float]:
+    """Seconds since the epoch for a log timestamp ("...Z", naive UTC), a datetime or a number."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value[:-1] if value.endswith("Z") else value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def entry_fields(record: Dict[str,Any]) -> Fields:
+    payload = record.get("payload") or {}
+    try:
+        ts = epoch(record.get("timestamp"))
+    except (TypeError, ValueError):
+        ts = None
+    return (ts, payload.get("po_id"), payload.get("invoice_id"), payload.get("decision"),
+            list(payload.get("reasons") or []))
+
+class LogIndex:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            # isolation_level=None: add() opens its own BEGIN IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript(SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def indexed_offset(self) -> Tuple[int, int]:
+        """(log bytes indexed, entries indexed)."""
+        with self._lock:
+            rows = dict(self._db().execute("SELECT key, value FROM meta WHERE key IN ('offset', 'entries')"))
+        return rows.get("offset", 0), rows.get("entries", 0)
+
+    def add(self, rows: Iterable[Row], start: int, end: int, entries: int) -> bool:
+        """Indexes rows for log bytes [start, end); False (nothing written) if the index is not at `start`."""
+        with self._lock:
+            conn = self._db()
+            # the write lock is taken before reading the offset, so two writers cannot both extend it
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = dict(conn.execute("SELECT key, value FROM meta WHERE key = 'offset'")).get("offset", 0)
+                if done != start:
+                    conn.execute("ROLLBACK")
+                    return False
+                rows = list(rows)
+                conn.executemany("INSERT OR REPLACE INTO entries (seq, offset, ts, po_id, invoice_id, decision) "
+                                 "VALUES (?,?,?,?,?,?)", [r[:6] for r in rows])
+                conn.executemany("INSERT OR IGNORE INTO entry_reasons (offset, reason) VALUES (?,?)",
+                                 [(r[1], reason) for r in rows for reason in r[6]])
+                conn.executemany("INSERT OR REPLACE INTO meta VALUES (?,?)", [("offset", end), ("entries", entries)])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return True
+
+    def clear(self):
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM entry_reasons")
+            conn.execute("DELETE FROM meta")
+            conn.execute("COMMIT")
+
+    def offsets(self, po_id: Optional[str] = None, invoice_id: Optional[str] = None,
+                decision: Optional[str] = None, reason: Optional[str] = None,
+                since: TimeBound = None, until: TimeBound = None,
+                limit: Optional[int] = None) -> Iterator[int]:
+        """Offsets of matching entries in log order; `until` is exclusive."""
+        where, args = [], []
+        for column, value in (("e.po_id", po_id), ("e.invoice_id", invoice_id), ("e.decision", decision)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if since is not None:
+            where.append("e.ts >= ?")
+            args.append(epoch(since))
+        if until is not None:
+            where.append("e.ts < ?")
+            args.append(epoch(until))
+        source = "entries e"
+        if reason is not None:
+            source = "entry_reasons r JOIN entries e ON e.offset = r.offset"
+            where.append("r.reason = ?")
+            args.append(reason)
+        sql = f"SELECT e.offset FROM {source}" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY e.offset"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            cur = self._db().execute(sql, args)
+        while True:
+            with self._lock:
+                batch = cur.fetchmany(1000)
+            if not batch:
+                return
+            for (offset,) in batch:
+                yield offset
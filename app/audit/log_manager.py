@@ -2,30 +2,221 @@
 Audit Log Manager:
 - Append-only JSONL audit log
 - HMAC signing per entry
-- Export JSON / CSV
+- Export JSON / CSV (streamed) and Parquet / Arrow (exports.py), filtered by
+  time range and fields
+- Buffered mode (the default; AUDIT_LOG_BUFFERED=0 turns it off): entries are
+  signed and serialized by the caller, then a background thread appends them
+  in groups (one write and one fsync per group, at most batch_size entries or
+  flush_interval seconds); the queue is bounded, so a stalled disk slows
+  callers down instead of growing memory. flush() blocks until everything
+  appended so far is on disk; the writer is flushed and stopped at interpreter
+  exit, and at the exit of a multiprocessing worker. Unbuffered appends take
+  the flock and re-check the chain per entry and are about twice as slow, but
+  are in the file when append_log returns
+- Hash chain: every entry also carries "chain" = HMAC(prev chain + entry hmac),
+  so a deleted, inserted or reordered line breaks every later link; "record"
+  and "hmac" are unchanged. Appends take an exclusive flock, so batch worker
+  processes sharing the file still extend one chain
+- Checkpoints: every checkpoint_every entries (AUDIT_CHECKPOINT_EVERY) the lines
+  since the previous checkpoint become leaves of a Merkle tree (merkle.py,
+  stored next to the log) and a signed {size, offset, chain, root} record is
+  appended to <log>.checkpoints. verify() re-checks only the tail after a
+  trusted checkpoint; prove() returns an O(log n) inclusion proof
+- Index (AUDIT_LOG_INDEX, on by default): po_id, invoice_id, decision,
+  reasons and timestamp -> byte offset in a SQLite sidecar (log_index.py).
+  The buffered writer thread indexes each group after writing it, off the
+  caller's path; query() first catches up on anything not indexed yet
+  (unbuffered appends, other processes, index=False writers) in INDEX_BATCH
+  transactions, then returns a lazy iterator of matching entries read by seek.
+  rebuild_index() recreates it from the log
+- Segments: once the active file reaches segment_bytes (AUDIT_LOG_SEGMENT_BYTES)
+  or its first entry is segment_seconds old (AUDIT_LOG_SEGMENT_SECONDS) it is
+  sealed into <log>.segments/ as gzip blocks of about block_bytes
+  (AUDIT_LOG_BLOCK_BYTES) with a block index (segments.py) and listed in the
+  manifest with its time and entry ranges. Offsets used by the chain,
+  checkpoints and the index are logical (sealed bytes + active file offset),
+  so all of them, and verify(), span segments unchanged; iter_entries() skips
+  segments outside a time range
 """
 import os
 import json
 import hmac
 import hashlib
+import atexit
+import multiprocessing.util
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Dict
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import exports
+from .log_index import LogIndex, TimeBound, entry_fields, epoch
+from .merkle import Frontier, MerkleStore, leaf_hash, verify_inclusion
+from .segments import SegmentStore, seal
+
+try:
+    import fcntl
+except ImportError:  # no cross-process append lock on this platform
+    fcntl = None
 
 LOG_DIR = Path(__file__).parent
 LOG_FILE = LOG_DIR / "audit_log.jsonl"
 SECRET = os.getenv("AUDIT_HMAC_SECRET", "dev-secret-key")
+BUFFERED = os.getenv("AUDIT_LOG_BUFFERED", "1") != "0"
+FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "0.05"))
+BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "512"))
+QUEUE_SIZE = int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000"))
+CHECKPOINT_EVERY = int(os.getenv("AUDIT_CHECKPOINT_EVERY", "10000"))
+INDEX = os.getenv("AUDIT_LOG_INDEX", "1") != "0"
+INDEX_BATCH = 10000
+SEGMENT_BYTES = int(os.getenv("AUDIT_LOG_SEGMENT_BYTES", str(256 << 20)))
+SEGMENT_SECONDS = float(os.getenv("AUDIT_LOG_SEGMENT_SECONDS", "0"))
+BLOCK_BYTES = int(os.getenv("AUDIT_LOG_BLOCK_BYTES", str(1 << 20)))
+GENESIS = "0" * 64
+# every line starts with the record timestamp; lets sealing skip a full parse
+LINE_TIMESTAMP = re.compile(rb'\{"record": \{"timestamp": "([^"]*)"')
+
+_STOP = object()
+
+class GroupCommitWriter:
+    """Hands queued items to `write` in groups from a background thread."""
+    def __init__(self, write: Callable[[List[Any]], None], flush_interval: float = FLUSH_INTERVAL,
+                 batch_size: int = BATCH_SIZE, queue_size: int = QUEUE_SIZE):
+        self.write = write
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self.groups = 0
+        self.entries = 0
+        self.error: Optional[Exception] = None
+
+    def _running(self) -> bool:
+        # a forked batch worker inherits the object but not the thread
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def _start(self):
+        with self._lock:
+            if self._running():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                atexit.register(self.close)
+                # multiprocessing workers leave through os._exit, which skips atexit
+                multiprocessing.util.Finalize(None, self.close, exitpriority=10)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    def put(self, item: Any):
+        if self.error is not None:
+            raise self.error
+        if not self._running():
+            self._start()
+        self._queue.put(item)
+
+    def flush(self):
+        """Blocks until every item put before this call is written and fsync'ed."""
+        # on the writer thread itself (e.g. from inside `write`) there is nothing queued ahead to wait for
+        if self._running() and threading.current_thread() is not self._thread:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        if self._running():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            group, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                group.append(item)
+                remaining = deadline - time.monotonic()
+                if len(group) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if group and self.error is None:
+                try:
+                    self.write(group)
+                    self.groups += 1
+                    self.entries += len(group)
+                except Exception as e:  # kept for the next put/flush; waiters must still be released
+                    self.error = e
+            for done in waiters:
+                done.set()
+            if stop:
+                return
+
+    def stats(self) -> Dict[str,int]:
+        return {"groups": self.groups, "entries": self.entries, "queued": self._queue.qsize()}
+
+def line_epoch(line: bytes) -> Optional[float]:
+    m = LINE_TIMESTAMP.match(line)
+    try:
+        return epoch(m.group(1).decode() if m else json.loads(line)["record"]["timestamp"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+class ChainState(NamedTuple):
+    offset: int  # logical bytes of complete lines
+    size: int  # entries
+    chain: str  # chain value of the last entry
 
 class AuditLogManager:
-    def __init__(self, log_file: Path = LOG_FILE, secret: str = SECRET):
-        self.log_file = log_file
+    def __init__(self, log_file: Path = LOG_FILE, secret: str = SECRET, buffered: bool = BUFFERED,
+                 flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE,
+                 queue_size: int = QUEUE_SIZE, checkpoint_every: int = CHECKPOINT_EVERY,
+                 index: bool = INDEX, segment_bytes: int = SEGMENT_BYTES,
+                 segment_seconds: float = SEGMENT_SECONDS, block_bytes: int = BLOCK_BYTES):
+        self.log_file = Path(log_file)
         self.secret = secret
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_file = self.log_file.with_name(self.log_file.name + ".checkpoints")
+        self.merkle = MerkleStore(self.log_file.with_name(self.log_file.name + ".merkle"))
+        self.checkpoint_every = checkpoint_every
+        self.index = LogIndex(self.log_file.with_name(self.log_file.name + ".index.db")) if index else None
+        self.segments = SegmentStore(self.log_file.with_name(self.log_file.name + ".segments"))
+        # flock target that survives rotation renaming the active file
+        self.lock_file = self.log_file.with_name(self.log_file.name + ".lock")
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.block_bytes = block_bytes
+        self._lock = threading.Lock()
+        self._state: Optional[ChainState] = None
+        self._checkpointed = 0  # entries covered by the last checkpoint, as of the last _sync
+        self._active_since: Optional[Tuple[int, float]] = None  # (sealed segments, first entry time)
+        self.writer = (GroupCommitWriter(lambda group: self._write(group, durable=True, index=True),
+                                         flush_interval, batch_size, queue_size)
+                       if buffered else None)
 
     def sign(self, payload: bytes) -> str:
         hm = hmac.new(self.secret.encode(), payload, hashlib.sha256)
         return hm.hexdigest()
 
+    def link(self, prev: str, signature: str) -> str:
+        return self.sign((prev + signature).encode())
+
     def append_log(self, decision_payload: Dict, extra: Dict = None):
         record = {
             "timestamp": datetime.utcnow().isoformat() + "Z",
@@ -35,39 +226,426 @@ class AuditLogManager:
         payload_bytes = json.dumps(record, sort_keys=True).encode()
         signature = self.sign(payload_bytes)
         entry = {"record": record, "hmac": signature}
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
+        # serialized now (the caller may reuse the payload); the chain link is closed in at write time
+        item = (json.dumps(entry)[:-1], signature)
+        if self.writer is not None:
+            self.writer.put(item)
+        else:
+            entry["chain"] = self._write([item], durable=False)
         return entry
 
-    def read_logs(self):
+    @contextmanager
+    def _exclusive(self) -> Iterator[int]:
+        """Holds the thread lock and the cross-process flock; yields an O_APPEND fd on the active file."""
+        with self._lock:
+            lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                fd = os.open(self.log_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    yield fd
+                finally:
+                    os.close(fd)
+            finally:
+                os.close(lock_fd)  # releases the flock
+
+    def _write(self, items: List[Tuple[str,str]], durable: bool, index: bool = False) -> str:
+        with self._exclusive() as fd:
+            state = self._sync(fd)
+            base = self.segments.end()[0]
+            if state.offset == base:
+                self._active_since = (len(self.segments.load()), time.time())
+            chain, lines, offset = state.chain, [], state.offset
+            for head, signature in items:
+                chain = self.link(chain, signature)
+                line = f'{head}, "chain": "{chain}"}}\n'.encode("utf-8")
+                lines.append(line)
+                offset += len(line)
+            data = b"".join(lines)
+            view = data
+            while view:
+                view = view[os.write(fd, view):]
+            if durable:
+                os.fsync(fd)
+            self._state = ChainState(offset, state.size + len(items), chain)
+            if self.checkpoint_every and self._state.size - self._checkpointed >= self.checkpoint_every:
+                self._checkpoint_locked()
+            if self._rotation_due(offset - base):
+                self._rotate_locked()
+        if index and self.index is not None:
+            # after the flock is released; the index only accepts rows that continue it
+            self._index_group(lines, state)
+        return chain
+
+    def _index_group(self, lines: List[bytes], state: ChainState):
+        """Indexes a group just written after `state`; falls back to a catch-up if the index is behind."""
+        rows, offset = [], state.offset
+        for seq, line in enumerate(lines, state.size):
+            rows.append((seq, offset) + entry_fields(json.loads(line)["record"]))
+            offset += len(line)
+        if not self.index.add(rows, state.offset, offset, state.size + len(lines)):
+            self._catch_up_index()
+
+    def _sync(self, fd: int) -> ChainState:
+        """
+        Chain state at the logical end of the log, re-read if another process
+        appended; a torn last line is cut off (the caller holds the flock).
+        """
+        end = self.segments.end()[0] + os.fstat(fd).st_size
+        if self._state is not None and self._state.offset == end:
+            return self._state
+        for pending in self.segments.pending():
+            self._seal(pending)  # a rotation interrupted by a crash
+        cps = self.checkpoints()
+        state = ChainState(cps[-1]["offset"], cps[-1]["size"], cps[-1]["chain"]) if cps else ChainState(0, 0, GENESIS)
+        self._checkpointed = state.size
+        for line, _ in self._iter_lines(state.offset):
+            try:
+                entry = json.loads(line)
+                chain = entry.get("chain") or self.link(state.chain, entry["hmac"])
+            except (ValueError, KeyError, TypeError, AttributeError):
+                # a corrupt complete line: counted and left for verify() to report; appends
+                # keep chaining from the last readable entry instead of failing under the flock
+                chain = state.chain
+            state = ChainState(state.offset + len(line) + 1, state.size + 1, chain)
+        if state.offset < end:
+            # a torn last line from a crashed writer; appending after it would glue the next entry onto it
+            os.ftruncate(fd, state.offset - self.segments.end()[0])
+        self._state = state
+        return state
+
+    def _end(self) -> int:
+        """Logical size of the log (sealed segments + active file)."""
+        return self.segments.end()[0] + (self.log_file.stat().st_size if self.log_file.exists() else 0)
+
+    def _iter_lines(self, offset: int, end: Optional[int] = None) -> Iterator[Tuple[bytes, int]]:
+        """(line without newline, logical offset) from `offset` across segments; a torn last line is skipped."""
+        for seg in self.segments.load():
+            if seg["base_offset"] + seg["bytes"] <= offset:
+                continue
+            for line, pos in self.segments.iter_lines(seg, max(0, offset - seg["base_offset"])):
+                if end is not None and pos >= end:
+                    return
+                yield line, pos
+        base = self.segments.end()[0]
         if not self.log_file.exists():
+            return
+        with open(self.log_file, "rb") as f:
+            pos = max(offset, base)
+            f.seek(pos - base)
+            for raw in f:
+                if not raw.endswith(b"\n") or (end is not None and pos >= end):
+                    return
+                yield raw[:-1], pos
+                pos += len(raw)
+
+    def _rotation_due(self, active_bytes: int) -> bool:
+        if active_bytes <= 0:
+            return False
+        if self.segment_bytes and active_bytes >= self.segment_bytes:
+            return True
+        if not self.segment_seconds:
+            return False
+        sealed = len(self.segments.load())
+        if self._active_since is None or self._active_since[0] != sealed:
+            # another process started this file; its first line says when
+            with open(self.log_file, "rb") as f:
+                started = line_epoch(f.readline())
+            self._active_since = (sealed, started if started is not None else time.time())
+        return time.time() - self._active_since[1] >= self.segment_seconds
+
+    def _rotate_locked(self):
+        """Moves the active file aside (a fresh one is created by the next append) and seals it."""
+        self.segments.directory.mkdir(parents=True, exist_ok=True)
+        pending = self.segments.directory / f"segment-{len(self.segments.load()) + 1:06d}.jsonl.pending"
+        os.replace(self.log_file, pending)
+        self._seal(pending)
+        self._active_since = None
+
+    def _seal(self, pending: Path):
+        """Compresses a pending segment and adds it to the manifest; safe to repeat after a crash."""
+        name = pending.name[:-len(".pending")] + ".gz"
+        segs = self.segments.load()
+        if not any(seg["file"] == name for seg in segs):
+            times: List[float] = []
+
+            def observe(line: bytes):
+                ts = line_epoch(line)
+                if ts is not None:
+                    times.append(ts)
+
+            stats = seal(pending, self.segments.directory / name, self.block_bytes, observe)
+            base, first_seq = self.segments.end()
+            prev = segs[-1]["chain"] if segs else GENESIS
+            chain = prev
+            if stats["entries"]:
+                last = json.loads(stats["last_line"])
+                chain = last.get("chain")
+                if chain is None:  # entries written before the chain existed
+                    chain = prev
+                    for line, _ in self.segments.iter_lines({"file": name, "base_offset": base}):
+                        chain = self.link(chain, json.loads(line)["hmac"])
+            self.segments.append({
+                "file": name, "base_offset": base, "bytes": stats["bytes"],
+                "compressed_bytes": stats["compressed_bytes"], "first_seq": first_seq,
+                "entries": stats["entries"], "min_ts": min(times, default=None),
+                "max_ts": max(times, default=None), "prev_chain": prev, "chain": chain,
+                "sealed_at": datetime.utcnow().isoformat() + "Z"})
+        pending.unlink()
+
+    def _catch_up_index(self):
+        """Indexes whatever complete lines the index has not seen yet."""
+        while True:
+            start, seq = self.index.indexed_offset()
+            if start > self._end():
+                # the log was replaced by a shorter one; the index is for another file
+                self.index.clear()
+                continue
+            rows, end = [], start
+            for line, pos in self._iter_lines(start):
+                try:
+                    record = json.loads(line).get("record") or {}
+                except (ValueError, AttributeError):
+                    record = {}  # a corrupt line keeps its seq but matches no field filter
+                rows.append((seq + len(rows), pos) + entry_fields(record))
+                end = pos + len(line) + 1
+                if len(rows) >= INDEX_BATCH:
+                    break
+            if not rows:
+                return
+            # False: another writer indexed this range first; re-read where it stopped
+            self.index.add(rows, start, end, seq + len(rows))
+
+    def rebuild_index(self):
+        """Recreates the index from the log alone."""
+        if self.index is None:
+            raise RuntimeError("index is disabled for this log")
+        self.flush()
+        self.index.clear()
+        self._catch_up_index()
+
+    def query(self, po_id: Optional[str] = None, invoice_id: Optional[str] = None,
+              decision: Optional[str] = None, reason: Optional[str] = None,
+              since: TimeBound = None, until: TimeBound = None,
+              limit: Optional[int] = None) -> Iterator[Dict[str,Any]]:
+        """
+        Lazily yields matching log entries in log order, read by seek through the
+        index. Filters combine with AND; since/until (until exclusive) take log
+        timestamps, datetimes (naive = UTC) or epoch seconds.
+        """
+        if self.index is None:
+            raise RuntimeError("index is disabled for this log")
+        self.flush()
+        self._catch_up_index()
+        offsets = self.index.offsets(po_id=po_id, invoice_id=invoice_id, decision=decision, reason=reason,
+                                     since=since, until=until, limit=limit)
+        base, f = None, None
+        try:
+            for offset in offsets:
+                seg = self.segments.locate(offset)
+                if seg is not None:
+                    yield json.loads(self.segments.read_line(seg, offset - seg["base_offset"]))
+                    continue
+                if self.segments.end()[0] != base:  # (re)open after a rotation
+                    if f is not None:
+                        f.close()
+                    base, f = self.segments.end()[0], open(self.log_file, "rb")
+                f.seek(offset - base)
+                yield json.loads(f.readline())
+        finally:
+            if f is not None:
+                f.close()
+
+    def iter_entries(self, since: TimeBound = None, until: TimeBound = None) -> Iterator[Dict[str,Any]]:
+        """
+        Lazily yields entries in log order, optionally limited to record
+        timestamps in [since, until); sealed segments whose manifest time range
+        falls outside are skipped without being read.
+        """
+        self.flush()
+        lo, hi = epoch(since), epoch(until)
+        for seg in self.segments.load():
+            if (lo is not None and seg["max_ts"] is not None and seg["max_ts"] < lo) or \
+                    (hi is not None and seg["min_ts"] is not None and seg["min_ts"] >= hi):
+                continue
+            yield from self._entries(self.segments.iter_lines(seg), lo, hi)
+        yield from self._entries(self._iter_lines(self.segments.end()[0]), lo, hi)
+
+    @staticmethod
+    def _entries(lines: Iterator[Tuple[bytes, int]], lo: Optional[float], hi: Optional[float]) -> Iterator[Dict[str,Any]]:
+        for line, _ in lines:
+            entry = json.loads(line)
+            if lo is not None or hi is not None:
+                ts = epoch(entry["record"]["timestamp"])
+                if (lo is not None and ts < lo) or (hi is not None and ts >= hi):
+                    continue
+            yield entry
+
+    def checkpoints(self) -> List[Dict[str,Any]]:
+        if not self.checkpoint_file.exists():
             return []
-        out=[]
-        with open(self.log_file,"r",encoding="utf-8") as f:
-            for line in f:
-                out.append(json.loads(line))
-        return out
-
-    def export_json(self, dst: Path):
-        logs = self.read_logs()
-        dst.write_text(json.dumps(logs, indent=2))
+        with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.endswith("\n")]
+
+    def checkpoint(self) -> Optional[Dict[str,Any]]:
+        """Writes a checkpoint for everything appended so far (None if nothing new)."""
+        self.flush()
+        with self._exclusive() as fd:
+            self._sync(fd)
+            return self._checkpoint_locked()
+
+    def _checkpoint_locked(self) -> Optional[Dict[str,Any]]:
+        cps = self.checkpoints()
+        start, size = (cps[-1]["offset"], cps[-1]["size"]) if cps else (0, 0)
+        state = self._state
+        if state.size == size:
+            return None
+        # nodes past the last checkpoint come from an interrupted checkpoint; redo them
+        self.merkle.truncate(size)
+        frontier = self.merkle.extend([leaf_hash(line) for line, _ in self._iter_lines(start, state.offset)])
+        cp = {"size": state.size, "offset": state.offset, "chain": state.chain,
+              "root": frontier.root().hex(), "timestamp": datetime.utcnow().isoformat() + "Z"}
+        cp["hmac"] = self.sign(json.dumps(cp, sort_keys=True).encode())
+        with open(self.checkpoint_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(cp) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._checkpointed = cp["size"]
+        return cp
+
+    def _checkpoint_ok(self, cp: Dict[str,Any]) -> bool:
+        body = {k: v for k, v in cp.items() if k != "hmac"}
+        return hmac.compare_digest(self.sign(json.dumps(body, sort_keys=True).encode()), cp.get("hmac", ""))
+
+    def verify(self, since_checkpoint: Optional[int] = -1) -> Dict[str,Any]:
+        """
+        Checks entry HMACs, chain links and later checkpoints for the lines after
+        checkpoint `since_checkpoint` (an index into checkpoints(); -1 = latest,
+        None = the whole log). Lines before that checkpoint are trusted.
+        """
+        self.flush()
+        cps = self.checkpoints()
+        errors = [f"checkpoint {i}: bad signature" for i, cp in enumerate(cps) if not self._checkpoint_ok(cp)]
+        segs = self.segments.load()
+        seg_ends, expect = {}, (0, 0, GENESIS)
+        for seg in segs:
+            if (seg["base_offset"], seg["first_seq"], seg["prev_chain"]) != expect:
+                errors.append(f"segment {seg['file']}: does not follow the previous segment")
+            if not (self.segments.directory / seg["file"]).exists():
+                errors.append(f"segment {seg['file']}: missing")
+                return {"ok": False, "checked": 0, "size": 0, "root": None, "errors": errors}
+            expect = (seg["base_offset"] + seg["bytes"], seg["first_seq"] + seg["entries"], seg["chain"])
+            seg_ends[expect[0]] = seg
+        offset, size, chain, frontier = 0, 0, GENESIS, Frontier()
+        if since_checkpoint is not None and cps:
+            base = cps[since_checkpoint]
+            offset, size, chain = base["offset"], base["size"], base["chain"]
+            try:
+                frontier = self.merkle.frontier(size)
+            except (OSError, IndexError):
+                frontier = None
+            if frontier is None or frontier.root().hex() != base["root"]:
+                errors.append(f"merkle nodes do not match checkpoint at {size} entries")
+                return {"ok": False, "checked": 0, "size": size, "root": None, "errors": errors}
+            if self._end() < offset:
+                errors.append(f"log is shorter than checkpoint offset {offset}")
+        later = [cp for cp in cps if cp["size"] > size]
+        checked, chained = 0, False
+        for line, pos in self._iter_lines(offset):
+            n = size + checked
+            checked += 1
+            try:
+                entry = json.loads(line)
+                record_ok = hmac.compare_digest(
+                    self.sign(json.dumps(entry["record"], sort_keys=True).encode()), entry["hmac"])
+            except (ValueError, KeyError, TypeError):
+                errors.append(f"entry {n}: unreadable")
+                frontier.push(leaf_hash(line))
+                continue
+            if not record_ok:
+                errors.append(f"entry {n}: bad hmac")
+            expected = self.link(chain, entry["hmac"])
+            if "chain" in entry:
+                chained = True
+                if entry["chain"] != expected:
+                    errors.append(f"entry {n}: chain broken (line deleted, inserted or reordered before it)")
+                chain = entry["chain"]
+            else:
+                if chained:
+                    errors.append(f"entry {n}: missing chain link")
+                chain = expected
+            frontier.push(leaf_hash(line))
+            seg = seg_ends.get(pos + len(line) + 1)
+            if seg is not None and (seg["chain"], seg["first_seq"] + seg["entries"]) != (chain, n + 1):
+                errors.append(f"segment {seg['file']}: manifest does not match its entries")
+            while later and later[0]["size"] == n + 1:
+                cp = later.pop(0)
+                if (cp["root"], cp["chain"], cp["offset"]) != (frontier.root().hex(), chain, pos + len(line) + 1):
+                    errors.append(f"checkpoint at {cp['size']} entries does not match the log")
+        for cp in later:
+            errors.append(f"checkpoint at {cp['size']} entries is past the end of the log (truncated?)")
+        return {"ok": not errors, "checked": checked, "size": size + checked,
+                "root": frontier.root().hex(), "errors": errors[:100]}
+
+    def prove(self, index: int, checkpoint: int = -1) -> Dict[str,Any]:
+        """Inclusion proof of entry `index` against a checkpoint's Merkle root."""
+        cps = self.checkpoints()
+        if not cps:
+            raise ValueError("no checkpoint yet")
+        cp = cps[checkpoint]
+        path = self.merkle.inclusion_proof(index, cp["size"])
+        return {"index": index, "size": cp["size"], "root": cp["root"], "path": [p.hex() for p in path]}
+
+    @staticmethod
+    def verify_proof(line: bytes, proof: Dict[str,Any]) -> bool:
+        """True when `line` (one log line, without its newline) is entry proof["index"] under proof["root"]."""
+        return verify_inclusion(leaf_hash(line), proof["index"], proof["size"],
+                                [bytes.fromhex(p) for p in proof["path"]], bytes.fromhex(proof["root"]))
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def read_logs(self):
+        return list(self.iter_entries())
+
+    def select(self, since: TimeBound = None, until: TimeBound = None, po_id: Optional[str] = None,
+               invoice_id: Optional[str] = None, decision: Optional[str] = None,
+               reason: Optional[str] = None) -> Iterator[Dict[str,Any]]:
+        """
+        Lazily yields entries matching all filters in log order: through the
+        index when a field filter is given, else a scan that skips segments
+        outside [since, until).
+        """
+        filters = {"po_id": po_id, "invoice_id": invoice_id, "decision": decision}
+        if not any(v is not None for v in filters.values()) and reason is None:
+            return self.iter_entries(since, until)
+        if self.index is not None:
+            return self.query(since=since, until=until, reason=reason, **filters)
+        wanted = [(i, v) for i, v in enumerate(filters.values(), 1) if v is not None]
+        return (e for e in self.iter_entries(since, until)
+                if all(entry_fields(e["record"])[i] == v for i, v in wanted)
+                and (reason is None or reason in entry_fields(e["record"])[4]))
+
+    def export_json(self, dst: Path, **filters):
+        """Streams the entries selected by `filters` (see select()) to dst as a JSON array."""
+        with open(dst, "w", encoding="utf-8") as f:
+            for chunk in exports.json_chunks(self.select(**filters)):
+                f.write(chunk)
+        return dst
+
+    def export_csv(self, dst: Path, **filters):
+        with open(dst, "w", newline="", encoding="utf-8") as f:
+            for chunk in exports.csv_chunks(self.select(**filters)):
+                f.write(chunk)
         return dst
 
-    def export_csv(self, dst: Path):
-        import csv
-        logs = self.read_logs()
-        with open(dst,"w",newline="",encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["timestamp","decision","reasons","po_id","invoice_id","hmac"])
-            for e in logs:
-                rec = e["record"]
-                payload = rec["payload"]
-                writer.writerow([
-                    rec["timestamp"],
-                    payload.get("decision"),
-                    "|".join(payload.get("reasons",[])),
-                    payload.get("po_id"),
-                    payload.get("invoice_id"),
-                    e.get("hmac")
-                ])
+    def export_parquet(self, dst: Path, fmt: str = "parquet", **filters):
+        """Typed columnar export (fmt "parquet" or "arrow" IPC); needs pyarrow."""
+        exports.write_columnar(self.select(**filters), dst, fmt)
         return dst
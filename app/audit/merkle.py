@@ -0,0 +1,147 @@
+"""
+Merkle tree over audit log lines (RFC 6962 hashing):
+- leaf = sha256(0x00 || line), node = sha256(0x01 || left || right); the root of
+  a tree whose size is not a power of two splits at the largest power of two
+- MerkleStore keeps every perfect subtree on disk, one append-only file per
+  level (node j of level L covers leaves [j*2^L, (j+1)*2^L), 32 bytes each), so
+  the root of any prefix and an inclusion proof both take O(log n) reads
+- Frontier is the in-memory compact form of a growing tree (one node per set
+  bit of its size), used to extend the store and to verify a log tail
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+HASH_SIZE = 32
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+def leaf_hash(line: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + line).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+def split_point(size: int) -> int:
+    """Largest power of two below size (size >= 2)."""
+    return 1 << ((size - 1).bit_length() - 1)
+
+class Frontier:
+    """Pending left subtree roots of a tree of `size` leaves, keyed by level."""
+    def __init__(self, size: int = 0, nodes: Optional[Dict[int,bytes]] = None):
+        self.size = size
+        self.nodes = dict(nodes or {})
+
+    def push(self, leaf: bytes, emit: Optional[Callable[[int, bytes], None]] = None):
+        h, level = leaf, 0
+        if emit:
+            emit(0, h)
+        while level in self.nodes:
+            h = node_hash(self.nodes.pop(level), h)
+            level += 1
+            if emit:
+                emit(level, h)
+        self.nodes[level] = h
+        self.size += 1
+
+    def root(self) -> bytes:
+        r = None
+        for level in sorted(self.nodes):
+            r = self.nodes[level] if r is None else node_hash(self.nodes[level], r)
+        return EMPTY_ROOT if r is None else r
+
+class MerkleStore:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _level_path(self, level: int) -> Path:
+        return self.directory / f"level-{level:02d}"
+
+    def size(self) -> int:
+        p = self._level_path(0)
+        return p.stat().st_size // HASH_SIZE if p.exists() else 0
+
+    def node(self, level: int, index: int) -> bytes:
+        with open(self._level_path(level), "rb") as f:
+            f.seek(index * HASH_SIZE)
+            h = f.read(HASH_SIZE)
+        if len(h) != HASH_SIZE:
+            raise IndexError(f"no node {index} at level {level}")
+        return h
+
+    def frontier(self, size: int) -> Frontier:
+        return Frontier(size, {level: self.node(level, (size >> level) - 1)
+                               for level in range(size.bit_length()) if size >> level & 1})
+
+    def subtree(self, start: int, end: int) -> bytes:
+        """Root of leaves [start, end); start is always aligned to the split."""
+        size = end - start
+        if size == 0:
+            return EMPTY_ROOT
+        if size & (size - 1) == 0:
+            level = size.bit_length() - 1
+            return self.node(level, start >> level)
+        k = split_point(size)
+        return node_hash(self.subtree(start, start + k), self.subtree(start + k, end))
+
+    def root(self, size: int) -> bytes:
+        return self.subtree(0, size)
+
+    def inclusion_proof(self, index: int, size: int) -> List[bytes]:
+        """Audit path (leaf to root) for leaf `index` in the tree of the first `size` leaves."""
+        if not 0 <= index < size <= self.size():
+            raise IndexError(f"leaf {index} is not in a tree of {size} (stored {self.size()})")
+        path = []
+        start, end = 0, size
+        while end - start > 1:
+            k = split_point(end - start)
+            if index < start + k:
+                path.append(self.subtree(start + k, end))
+                end = start + k
+            else:
+                path.append(self.subtree(start, start + k))
+                start += k
+        return path[::-1]
+
+    def truncate(self, size: int):
+        """Drops nodes beyond a tree of `size` leaves (left over by an interrupted extend)."""
+        level = 0
+        while self._level_path(level).exists():
+            p = self._level_path(level)
+            keep = (size >> level) * HASH_SIZE
+            if p.stat().st_size > keep:
+                os.truncate(p, keep)
+            level += 1
+
+    def extend(self, leaves: List[bytes]) -> Frontier:
+        """Appends leaves and every completed subtree above them; returns the new frontier."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        frontier = self.frontier(self.size())
+        new: Dict[int, List[bytes]] = {}
+        for leaf in leaves:
+            frontier.push(leaf, lambda level, h: new.setdefault(level, []).append(h))
+        for level, hashes in sorted(new.items()):
+            with open(self._level_path(level), "ab") as f:
+                f.write(b"".join(hashes))
+                f.flush()
+                os.fsync(f.fileno())
+        return frontier
+
+def verify_inclusion(leaf: bytes, index: int, size: int, path: List[bytes], root: bytes) -> bool:
+    """RFC 9162 section 2.1.3.2."""
+    if index >= size:
+        return False
+    fn, sn, r = index, size - 1, leaf
+    for p in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = node_hash(p, r)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            r = node_hash(r, p)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and r == root
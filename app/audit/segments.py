@@ -0,0 +1,145 @@
+"""
+Audit log segments:
+- A sealed segment is a former active log file compressed as a run of
+  independent gzip members of about block_bytes each (plain gzip tools still
+  read the whole file); <segment>.idx maps the uncompressed offset where each
+  member starts to its compressed offset, so one entry costs one block to inflate
+- manifest.json lists the sealed segments in order with their logical byte
+  range (base_offset, bytes), entry range (first_seq, entries), time range and
+  the chain values they start from and end with; it is replaced atomically
+"""
+import bisect
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+MANIFEST = "manifest.json"
+
+def seal(src: Path, dst: Path, block_bytes: int,
+         observe: Optional[Callable[[bytes], None]] = None) -> Dict[str,Any]:
+    """Compresses src into dst block by block (split at line ends); returns sizes and line stats."""
+    blocks, first, last, lines, raw_bytes = [], None, None, 0, 0
+    tmp = dst.with_name(dst.name + ".tmp")
+    with open(src, "rb") as f, open(tmp, "wb") as out:
+        block: List[bytes] = []
+        size = 0
+
+        def flush_block():
+            blocks.append([raw_bytes - size, out.tell()])
+            out.write(gzip.compress(b"".join(block), mtime=0))
+
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # torn tail from a crash: not part of the log
+            if first is None:
+                first = line
+            last = line
+            lines += 1
+            if observe is not None:
+                observe(line)
+            block.append(line)
+            size += len(line)
+            raw_bytes += len(line)
+            if size >= block_bytes:
+                flush_block()
+                block, size = [], 0
+        if block:
+            flush_block()
+        out.flush()
+        os.fsync(out.fileno())
+        compressed = out.tell()
+    os.replace(tmp, dst)
+    Path(str(dst) + ".idx").write_text(json.dumps(blocks))
+    return {"bytes": raw_bytes, "compressed_bytes": compressed, "entries": lines,
+            "first_line": first, "last_line": last}
+
+class SegmentStore:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._manifest: List[Dict[str,Any]] = []
+        self._stamp = None
+        self._blocks: Dict[str, List[List[int]]] = {}
+        self._cached_block: Tuple[Optional[str], int, bytes] = (None, -1, b"")
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST
+
+    def stamp(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self) -> List[Dict[str,Any]]:
+        stamp = self.stamp()
+        if stamp != self._stamp:
+            self._manifest = json.loads(self.manifest_path.read_text()) if stamp else []
+            self._stamp = stamp
+        return self._manifest
+
+    def end(self) -> Tuple[int, int]:
+        """(logical bytes, entries) covered by sealed segments."""
+        segs = self.load()
+        return (segs[-1]["base_offset"] + segs[-1]["bytes"], segs[-1]["first_seq"] + segs[-1]["entries"]) if segs else (0, 0)
+
+    def append(self, segment: Dict[str,Any]):
+        segs = self.load() + [segment]
+        tmp = self.manifest_path.with_name(MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(segs, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
+        self.load()
+
+    def pending(self) -> List[Path]:
+        return sorted(self.directory.glob("segment-*.jsonl.pending")) if self.directory.exists() else []
+
+    def locate(self, offset: int) -> Optional[Dict[str,Any]]:
+        """The sealed segment holding logical `offset`, or None (active file)."""
+        segs = self.load()
+        i = bisect.bisect_right([s["base_offset"] for s in segs], offset) - 1
+        if i >= 0 and offset < segs[i]["base_offset"] + segs[i]["bytes"]:
+            return segs[i]
+        return None
+
+    def _block_index(self, segment: Dict[str,Any]) -> List[List[int]]:
+        name = segment["file"]
+        if name not in self._blocks:
+            self._blocks[name] = json.loads((self.directory / (name + ".idx")).read_text())
+        return self._blocks[name]
+
+    def _read_block(self, segment: Dict[str,Any], i: int) -> bytes:
+        name = segment["file"]
+        if self._cached_block[:2] == (name, i):
+            return self._cached_block[2]
+        blocks = self._block_index(segment)
+        with open(self.directory / name, "rb") as f:
+            f.seek(blocks[i][1])
+            end = blocks[i + 1][1] if i + 1 < len(blocks) else None
+            data = gzip.decompress(f.read(end - blocks[i][1]) if end is not None else f.read())
+        self._cached_block = (name, i, data)
+        return data
+
+    def iter_lines(self, segment: Dict[str,Any], rel_start: int = 0) -> Iterator[Tuple[bytes, int]]:
+        """(line without newline, logical offset) from rel_start within a sealed segment."""
+        blocks = self._block_index(segment)
+        i = max(0, bisect.bisect_right([b[0] for b in blocks], rel_start) - 1)
+        for j in range(i, len(blocks)):
+            data = self._read_block(segment, j)
+            pos = blocks[j][0]
+            for raw in data.splitlines(keepends=True):
+                if pos >= rel_start:
+                    yield raw[:-1], segment["base_offset"] + pos
+                pos += len(raw)
+
+    def read_line(self, segment: Dict[str,Any], rel: int) -> bytes:
+        blocks = self._block_index(segment)
+        i = bisect.bisect_right([b[0] for b in blocks], rel) - 1
+        data = self._read_block(segment, i)
+        start = rel - blocks[i][0]
+        return data[start:data.index(b"\n", start)]
@@ -1,5 +1,9 @@
 import sqlite3
 from pathlib import Path
+try:
+    from .migrate import migrate
+except ImportError:  # run as a script: python app/db/init_db.py
+    from migrate import migrate
 
 DB_PATH = Path(__file__).parent / "erp.db"
 SEED_SQL = Path(__file__).parent / "seed_data.sql"
@@ -11,7 +15,8 @@ def init_db():
     cur.executescript(sql)
     conn.commit()
     conn.close()
-    print(f"Database initialized at {DB_PATH}")
+    applied = migrate(DB_PATH)
+    print(f"Database initialized at {DB_PATH} (migrations applied: {applied or 'none'})")
 
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,403 @@
+"""
+Bulk loader for nightly ERP extracts (POs, invoices, inventory, GRNs):
+- Streams CSV or JSONL input in chunks and writes each chunk with executemany;
+  the whole file is one transaction, so a failed load leaves the database as it was
+- Secondary indexes and the row-version triggers of the target tables are
+  dropped for the load and rebuilt once at the end (--keep-indexes to skip)
+- Rows are validated in batches against the pydantic schemas (POLine,
+  InvoiceLine, ...); malformed rows go to a JSONL reject file, the load goes on.
+  A document with a bad header or line is rejected whole: later rows of it are
+  rejected too, and rows of it already loaded from earlier chunks are taken out
+  again at the end (one document-level reject), leaving its previous header,
+  lines and version as they were
+- Documents in the extract replace their previous lines, and their row version
+  is bumped once per document rather than once per line (from above the last
+  version of a deleted document with the same id, migration 0005)
+- After the commit, tool-service subscribers (the executor's response cache)
+  are told which documents changed via app.tools.changes.notify
+- Reports rows/sec
+
+Input is one row per line, with the header columns repeated on every row
+(header-only rows leave line_id empty); JSONL may also carry whole documents
+with a "lines" array. A line's currency defaults to the header currency
+(CSV: optional line_currency column).
+
+CLI:
+    python -m app.db.loader po po_extract.csv --rejects po_rejects.jsonl
+    python -m app.db.loader invoice invoices.jsonl --chunk-size 20000
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from ..schemas.po_models import POHeader, POLine
+from ..schemas.invoice_models import InvoiceHeader, InvoiceLine
+from ..schemas.inventory_models import InventoryItem
+from ..schemas.grn_models import GRNHeader, GRNLine
+from ..tools import changes
+
+# same override as the tool services (app/tools/db.py)
+DB_PATH = Path(os.getenv("ERP_DB_PATH", str(Path(__file__).parent / "erp.db")))
+CHUNK_SIZE = 10000
+
+class LoadSpec(NamedTuple):
+    header_table: str
+    id_col: str
+    header_cols: Tuple[str, ...]
+    header_model: Any
+    line_table: Optional[str] = None
+    line_cols: Tuple[str, ...] = ()  # line columns other than the copied header keys
+    line_keys: Tuple[str, ...] = ()  # header columns repeated on every line row
+    line_model: Any = None
+    versioned: bool = False
+
+SPECS = {
+    "po": LoadSpec("purchase_orders", "po_id",
+                   ("po_id", "vendor_id", "vendor_name", "currency", "total_amount"), POHeader,
+                   "po_lines", ("line_id", "item_id", "description", "quantity", "unit_price", "currency"),
+                   ("po_id",), POLine, versioned=True),
+    "invoice": LoadSpec("invoices", "invoice_id",
+                        ("invoice_id", "vendor_id", "vendor_name", "currency", "total_amount"), InvoiceHeader,
+                        "invoice_lines", ("line_id", "item_id", "description", "quantity", "unit_price", "currency"),
+                        ("invoice_id",), InvoiceLine, versioned=True),
+    "grn": LoadSpec("grn_headers", "grn_id", ("grn_id", "po_id", "received_at"), GRNHeader,
+                    "grn_lines", ("line_id", "item_id", "received_qty"), ("grn_id", "po_id"), GRNLine),
+    "inventory": LoadSpec("inventory", "item_id", ("item_id", "on_hand"), InventoryItem),
+}
+
+# kind -> (changes.notify ref, query for its values when the loaded ids are not them)
+CHANGE_REFS = {
+    "po": ("po_id", None),
+    "invoice": ("invoice_id", None),
+    "grn": ("po_id", "SELECT DISTINCT po_id FROM grn_headers WHERE grn_id IN (SELECT id FROM temp.load_ids)"),
+    "inventory": ("item_id", None),
+}
+
+class LoadError(Exception):
+    pass
+
+def _blank(value) -> bool:
+    return value is None or value == ""
+
+def iter_records(path: Path, fmt: Optional[str] = None) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """(record number, row dict or raw text, parse error) for every input record."""
+    fmt = fmt or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            for n, row in enumerate(csv.DictReader(f), 1):
+                yield n, row, None
+            return
+        for n, raw in enumerate(f, 1):
+            if not raw.strip():
+                continue
+            try:
+                row = json.loads(raw)
+            except ValueError as e:
+                yield n, raw.rstrip("\n"), f"invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield n, row, "record is not an object"
+            else:
+                yield n, row, None
+
+def split_record(spec: LoadSpec, row: Dict[str,Any]):
+    """Flat or nested record -> (header dict, [line dicts])."""
+    # blank CSV cells are missing values, not empty strings
+    row = {k: (None if v == "" else v) for k, v in row.items()}
+    header = {c: row.get(c) for c in spec.header_cols}
+    if spec.line_table is None:
+        return header, []
+    if isinstance(row.get("lines"), list):
+        raw_lines = row["lines"]
+    elif not _blank(row.get("line_id")):
+        raw_lines = [dict(row, currency=row.get("line_currency") or row.get("currency"))]
+    else:
+        raw_lines = []
+    lines = []
+    for raw in raw_lines:
+        line = {c: raw.get(c) for c in spec.line_cols}
+        if "currency" in line and _blank(line["currency"]):
+            line["currency"] = header.get("currency")
+        lines.append(line)
+    return header, lines
+
+_ADAPTERS: Dict[Any, TypeAdapter] = {}
+
+def validate_batch(model, rows: List[Dict[str,Any]]) -> Tuple[List[Any], Dict[int,str]]:
+    """Validates a whole batch in one call; returns (models for good rows, {index: error})."""
+    if not rows:
+        return [], {}
+    adapter = _ADAPTERS.get(model)
+    if adapter is None:
+        adapter = _ADAPTERS[model] = TypeAdapter(List[model])
+    try:
+        return adapter.validate_python(rows), {}
+    except ValidationError as e:
+        errors: Dict[int,str] = {}
+        for err in e.errors():
+            idx = err["loc"][0]
+            field = ".".join(str(p) for p in err["loc"][1:])
+            errors.setdefault(idx, f"{field}: {err['msg']}" if field else err["msg"])
+    good = [r for i, r in enumerate(rows) if i not in errors]
+    # second pass only over the rows that passed, so it cannot fail again
+    models = adapter.validate_python(good) if good else []
+    return models, errors
+
+def header_model_input(spec: LoadSpec, header: Dict[str,Any]) -> Dict[str,Any]:
+    # document header models also require the lines list
+    return dict(header, lines=[]) if spec.line_model is not None else header
+
+def deferred_schema(conn, tables: List[str]) -> List[Tuple[str,str,str]]:
+    """(type, name, sql) of the explicit indexes and triggers on `tables`."""
+    marks = ",".join("?" * len(tables))
+    return conn.execute(
+        f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('index','trigger') "
+        f"AND tbl_name IN ({marks}) AND sql IS NOT NULL ORDER BY type, name", tables).fetchall()
+
+class Rejects:
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.count = 0
+        self._f = None
+
+    def add(self, record: int, row: Any, error: str):
+        self.count += 1
+        if self.path is None:
+            return
+        if self._f is None:
+            self._f = open(self.path, "w", encoding="utf-8")
+        self._f.write(json.dumps({"record": record, "error": error, "row": row}, default=str) + "\n")
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+
+def iter_chunks(records: Iterator, size: int) -> Iterator[List]:
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def reject_loaded_documents(conn, spec: LoadSpec, bad_docs: Dict[str,str], accepted: set,
+                            max_line_id: int, rejects: Rejects) -> int:
+    """
+    Takes out documents rejected after their header was written: drops their new
+    lines and puts the previous header back (none for a new document). Returns
+    the lines removed. `accepted` holds documents with rows that were not
+    rejected one by one; those get a document-level reject.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS reject_ids (id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.reject_ids")
+    conn.executemany("INSERT INTO temp.reject_ids SELECT id FROM temp.load_ids WHERE id = ?",
+                     [(d,) for d in bad_docs])
+    removed = 0
+    doc_ids = [r[0] for r in conn.execute("SELECT id FROM temp.reject_ids ORDER BY id")]
+    for doc_id in doc_ids:
+        if doc_id in accepted:
+            rejects.add(None, {spec.id_col: doc_id}, f"{bad_docs[doc_id]}; rows loaded from earlier chunks withdrawn")
+    if doc_ids:
+        removed = conn.execute(f"DELETE FROM {spec.line_table} WHERE id > ? AND {spec.line_keys[0]} IN "
+                               f"(SELECT id FROM temp.reject_ids)", (max_line_id,)).rowcount
+        conn.execute(f"DELETE FROM {spec.header_table} WHERE {spec.id_col} IN (SELECT id FROM temp.reject_ids)")
+        conn.execute(f"INSERT INTO {spec.header_table} SELECT * FROM temp.prev_headers "
+                     f"WHERE {spec.id_col} IN (SELECT id FROM temp.reject_ids)")
+        conn.execute("DELETE FROM temp.load_ids WHERE id IN (SELECT id FROM temp.reject_ids)")
+    conn.execute("DROP TABLE temp.reject_ids")
+    return removed
+
+def load_file(kind: str, path: Path, db_path: Path = DB_PATH, fmt: Optional[str] = None,
+              rejects_path: Optional[Path] = None, chunk_size: int = CHUNK_SIZE,
+              defer_indexes: bool = True) -> Dict[str,Any]:
+    if kind not in SPECS:
+        raise LoadError(f"unknown kind {kind!r}; expected one of {sorted(SPECS)}")
+    spec = SPECS[kind]
+    path = Path(path)
+    rejects = Rejects(Path(rejects_path) if rejects_path else None)
+    tables = [spec.header_table] + ([spec.line_table] if spec.line_table else [])
+    updates = ",".join(f"{c}=excluded.{c}" for c in spec.header_cols if c != spec.id_col)
+    header_sql = (f"INSERT INTO {spec.header_table} ({','.join(spec.header_cols)}) "
+                  f"VALUES ({','.join('?' * len(spec.header_cols))}) "
+                  f"ON CONFLICT({spec.id_col}) DO UPDATE SET {updates}")
+    line_cols = spec.line_keys + spec.line_cols
+    line_sql = (f"INSERT INTO {spec.line_table} ({','.join(line_cols)}) "
+                f"VALUES ({','.join('?' * len(line_cols))})") if spec.line_table else None
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    rows = loaded_lines = 0
+    headers_seen: Dict[str, Tuple] = {}  # doc id -> validated header key columns
+    bad_docs: Dict[str, str] = {}  # doc id -> why the whole document is rejected
+    accepted = set()  # doc ids with rows loaded (not rejected on their own)
+    t0 = time.perf_counter()
+    index_sec = 0.0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        saved = deferred_schema(conn, tables) if defer_indexes else []
+        for obj_type, name, _ in saved:
+            conn.execute(f"DROP {obj_type.upper()} {name}")
+        max_line_id = (conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {spec.line_table}").fetchone()[0]
+                       if spec.line_table else 0)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS load_ids (id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.load_ids")
+        if spec.line_table:
+            # headers as they were before the load, to put back if a document is rejected later
+            conn.execute("DROP TABLE IF EXISTS temp.prev_headers")
+            conn.execute(f"CREATE TEMP TABLE prev_headers AS SELECT * FROM {spec.header_table} WHERE 0")
+
+        for chunk in iter_chunks(iter_records(path, fmt), chunk_size):
+            new_headers, new_header_recs, lines, line_recs = [], [], [], []
+            for record, row, error in chunk:
+                rows += 1
+                if error:
+                    rejects.add(record, row, error)
+                    continue
+                header, row_lines = split_record(spec, row)
+                doc_id = header.get(spec.id_col)
+                if _blank(doc_id):
+                    rejects.add(record, row, f"{spec.id_col}: missing")
+                    continue
+                doc_id = str(doc_id)
+                header[spec.id_col] = doc_id
+                if doc_id in bad_docs:
+                    rejects.add(record, row, bad_docs[doc_id])
+                    continue
+                if doc_id not in headers_seen:
+                    headers_seen[doc_id] = None  # validated below with the rest of the chunk
+                    new_headers.append(header_model_input(spec, header))
+                    new_header_recs.append((record, row))
+                if not row_lines:
+                    accepted.add(doc_id)
+                for line in row_lines:
+                    lines.append(line)
+                    line_recs.append((record, row, doc_id))
+
+            models, errors = validate_batch(spec.header_model, new_headers)
+            rejected = set()
+            for idx, error in errors.items():
+                record, row = new_header_recs[idx]
+                bad_docs[new_headers[idx][spec.id_col]] = "invalid document header"
+                rejects.add(record, row, error)
+                rejected.add(record)
+            header_rows = []
+            for m in models:
+                values = tuple(getattr(m, c) for c in spec.header_cols)
+                headers_seen[values[0]] = tuple(getattr(m, c) for c in spec.line_keys)
+                header_rows.append(values)
+            if spec.line_table:
+                conn.executemany(f"INSERT INTO temp.prev_headers SELECT * FROM {spec.header_table} "
+                                 f"WHERE {spec.id_col} = ?", [(r[0],) for r in header_rows])
+            conn.executemany(header_sql, header_rows)
+            conn.executemany("INSERT OR IGNORE INTO temp.load_ids (id) VALUES (?)",
+                             [(r[0],) for r in header_rows])
+
+            if spec.line_table:
+                keep = []
+                for i, (record, row, doc_id) in enumerate(line_recs):
+                    if doc_id not in bad_docs:
+                        keep.append(i)
+                    elif record not in rejected:
+                        rejects.add(record, row, bad_docs[doc_id])
+                        rejected.add(record)
+                models, errors = validate_batch(spec.line_model, [lines[i] for i in keep])
+                for idx, error in errors.items():
+                    record, row, doc_id = line_recs[keep[idx]]
+                    bad_docs[doc_id] = "invalid document line"
+                    rejects.add(record, row, error)
+                    rejected.add(record)
+                good, good_models = [], []
+                for n, i in enumerate(keep):
+                    if n in errors:
+                        continue
+                    m = models[len(good)]
+                    good.append(i)
+                    record, row, doc_id = line_recs[i]
+                    if doc_id in bad_docs:  # a sibling line of this document failed
+                        if record not in rejected:
+                            rejects.add(record, row, bad_docs[doc_id])
+                            rejected.add(record)
+                    else:
+                        good_models.append((i, m))
+                        accepted.add(doc_id)
+                line_rows = [headers_seen[line_recs[i][2]] + tuple(getattr(m, c) for c in spec.line_cols)
+                             for i, m in good_models]
+                conn.executemany(line_sql, line_rows)
+                loaded_lines += len(line_rows)
+
+        if spec.line_table:
+            loaded_lines -= reject_loaded_documents(conn, spec, bad_docs, accepted, max_line_id, rejects)
+            # the extract is authoritative for its documents: drop their older lines
+            conn.execute(f"DELETE FROM {spec.line_table} WHERE id <= ? AND {spec.line_keys[0]} IN "
+                         f"(SELECT id FROM temp.load_ids)", (max_line_id,))
+        if spec.versioned:
+            # the insert trigger is dropped during a deferred load, so apply the floor left by a delete here
+            conn.execute(f"UPDATE {spec.header_table} SET version = MAX(version, COALESCE("
+                         f"(SELECT f.version FROM document_version_floor f WHERE f.table_name = ? "
+                         f"AND f.doc_id = {spec.header_table}.{spec.id_col}), 0)) + 1 "
+                         f"WHERE {spec.id_col} IN (SELECT id FROM temp.load_ids)", (spec.header_table,))
+            conn.execute("DELETE FROM document_version_floor WHERE table_name = ? "
+                         "AND doc_id IN (SELECT id FROM temp.load_ids)", (spec.header_table,))
+        documents = conn.execute("SELECT COUNT(*) FROM temp.load_ids").fetchone()[0]
+        t1 = time.perf_counter()
+        for _, _, sql in sorted(saved, key=lambda s: s[0] != "index"):
+            conn.execute(sql)
+        index_sec = time.perf_counter() - t1
+        ref, refs_sql = CHANGE_REFS[kind]
+        changed = [r[0] for r in conn.execute(refs_sql or "SELECT id FROM temp.load_ids")]
+        conn.execute("DROP TABLE temp.load_ids")
+        conn.execute("DROP TABLE IF EXISTS temp.prev_headers")
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+        rejects.close()
+    if changed:
+        changes.notify(**{ref: changed})
+    elapsed = time.perf_counter() - t0
+    return {
+        "kind": kind,
+        "source": str(path),
+        "rows": rows,
+        "documents": documents,
+        "lines": loaded_lines,
+        "rejected": rejects.count,
+        "rejects_path": str(rejects.path) if rejects.path and rejects.count else None,
+        "elapsed_sec": round(elapsed, 3),
+        "index_rebuild_sec": round(index_sec, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk-load ERP extracts (CSV or JSONL)")
+    ap.add_argument("kind", choices=sorted(SPECS))
+    ap.add_argument("files", type=Path, nargs="+")
+    ap.add_argument("--db", type=Path, default=DB_PATH)
+    ap.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: by file suffix")
+    ap.add_argument("--rejects", type=Path, default=None, help="reject file (default: <input>.rejects.jsonl)")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    ap.add_argument("--keep-indexes", action="store_true", help="maintain indexes row by row instead of rebuilding")
+    args = ap.parse_args(argv)
+    for path in args.files:
+        summary = load_file(args.kind, path, db_path=args.db, fmt=args.format,
+                            rejects_path=args.rejects or path.with_name(path.name + ".rejects.jsonl"),
+                            chunk_size=args.chunk_size, defer_indexes=not args.keep_indexes)
+        print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
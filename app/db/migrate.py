@@ -0,0 +1,103 @@
+"""
+Schema migrations:
+- Numbered SQL files in app/db/migrations (NNNN_description.sql), applied in order
+- Applied versions are recorded in schema_migrations; each migration runs in
+  its own transaction, so a failing file leaves the database unchanged
+- Applying any migration notifies app.tools.changes subscribers (no refs, so
+  cached tool responses are dropped wholesale)
+- Run after init_db's base schema:  python -m app.db.migrate [--status]
+"""
+import argparse
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    from ..tools import changes
+except ImportError:  # run as a script via init_db.py; no in-process subscribers then
+    changes = None
+
+DB_PATH = Path(__file__).parent / "erp.db"
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_RE = re.compile(r"^(\d+)_([\w\-]+)\.sql$")
+
+class MigrationError(Exception):
+    pass
+
+def discover(migrations_dir: Path = MIGRATIONS_DIR) -> List[Tuple[int, str, Path]]:
+    found = []
+    for p in sorted(migrations_dir.glob("*.sql")):
+        m = MIGRATION_RE.match(p.name)
+        if not m:
+            raise MigrationError(f"bad migration file name: {p.name}")
+        found.append((int(m.group(1)), m.group(2), p))
+    versions = [v for v, _, _ in found]
+    if len(set(versions)) != len(versions):
+        raise MigrationError("duplicate migration version numbers")
+    return sorted(found)
+
+def ensure_table(conn: sqlite3.Connection):
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )""")
+    conn.commit()
+
+def applied_versions(conn: sqlite3.Connection) -> List[int]:
+    ensure_table(conn)
+    return [r[0] for r in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+
+def migrate(db_path: Path = DB_PATH, target: Optional[int] = None,
+            migrations_dir: Path = MIGRATIONS_DIR) -> List[int]:
+    """Applies pending migrations up to `target` (default: all); returns applied versions."""
+    conn = sqlite3.connect(db_path)
+    applied = []
+    try:
+        done = set(applied_versions(conn))
+        for version, name, path in discover(migrations_dir):
+            if version in done or (target is not None and version > target):
+                continue
+            stamp = datetime.utcnow().isoformat() + "Z"
+            script = (
+                "BEGIN;\n" + path.read_text() +
+                f"\n;INSERT INTO schema_migrations (version, name, applied_at) VALUES ({version}, '{name}', '{stamp}');\nCOMMIT;"
+            )
+            try:
+                conn.executescript(script)
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise MigrationError(f"migration {path.name} failed: {e}") from e
+            applied.append(version)
+    finally:
+        conn.close()
+    if applied and changes is not None:
+        changes.notify()  # no refs: any cached document may have changed
+    return applied
+
+def status(db_path: Path = DB_PATH, migrations_dir: Path = MIGRATIONS_DIR):
+    conn = sqlite3.connect(db_path)
+    try:
+        done = set(applied_versions(conn))
+    finally:
+        conn.close()
+    return [(v, n, v in done) for v, n, _ in discover(migrations_dir)]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Apply numbered schema migrations")
+    ap.add_argument("--db", type=Path, default=DB_PATH)
+    ap.add_argument("--target", type=int, default=None)
+    ap.add_argument("--status", action="store_true")
+    args = ap.parse_args(argv)
+    if args.status:
+        for version, name, is_applied in status(args.db):
+            print(f"{version:04d} {name:<40} {'applied' if is_applied else 'pending'}")
+        return
+    applied = migrate(args.db, target=args.target)
+    print(f"Applied migrations: {applied or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+-- Line lookups (WHERE po_id=? ORDER BY line_id) were full scans plus a sort.
+-- The indexes carry every selected column, so the lookup never touches the table.
+CREATE INDEX IF NOT EXISTS idx_po_lines_po_id_line_id
+  ON po_lines (po_id, line_id, item_id, description, quantity, unit_price, currency);
+
+CREATE INDEX IF NOT EXISTS idx_invoice_lines_invoice_id_line_id
+  ON invoice_lines (invoice_id, line_id, item_id, description, quantity, unit_price, currency);
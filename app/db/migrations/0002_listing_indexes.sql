@@ -0,0 +1,6 @@
+-- Keyset listing filtered by vendor: seek on (vendor_id, id) instead of scanning every header.
+CREATE INDEX IF NOT EXISTS idx_purchase_orders_vendor_po
+  ON purchase_orders (vendor_id, po_id);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_vendor_invoice
+  ON invoices (vendor_id, invoice_id);
@@ -0,0 +1,31 @@
+-- Goods receipts move from the hard-coded GRN_DATA dict into the database.
+-- A PO can have many receipts (partial deliveries); each receipt line is keyed
+-- by PO line and item rather than by line number only.
+CREATE TABLE IF NOT EXISTS grn_headers (
+  grn_id TEXT PRIMARY KEY,
+  po_id TEXT NOT NULL,
+  received_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS grn_lines (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  grn_id TEXT NOT NULL,
+  po_id TEXT NOT NULL,
+  line_id INTEGER NOT NULL,
+  item_id TEXT,
+  received_qty REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_grn_headers_po ON grn_headers (po_id);
+-- covering for the per-PO SUM(received_qty) GROUP BY line aggregation
+CREATE INDEX IF NOT EXISTS idx_grn_lines_po_line ON grn_lines (po_id, line_id, item_id, received_qty);
+
+-- carry over the former mock data for the seed POs
+INSERT OR IGNORE INTO grn_headers (grn_id, po_id, received_at)
+  SELECT 'GRN-1001-1', 'PO-1001', '2025-01-15T00:00:00Z' WHERE EXISTS (SELECT 1 FROM purchase_orders WHERE po_id='PO-1001');
+INSERT OR IGNORE INTO grn_headers (grn_id, po_id, received_at)
+  SELECT 'GRN-1002-1', 'PO-1002', '2025-01-15T00:00:00Z' WHERE EXISTS (SELECT 1 FROM purchase_orders WHERE po_id='PO-1002');
+INSERT INTO grn_lines (grn_id, po_id, line_id, item_id, received_qty)
+  SELECT 'GRN-' || substr(po_id, 4) || '-1', po_id, line_id, item_id, CASE line_id WHEN 1 THEN 10 ELSE 5 END
+  FROM po_lines WHERE po_id IN ('PO-1001', 'PO-1002') AND line_id IN (1, 2)
+  GROUP BY po_id, line_id, item_id;
@@ -0,0 +1,40 @@
+-- Row versions for ETag / If-None-Match on the PO and invoice endpoints.
+-- Every change to a header or one of its lines bumps the document's version.
+ALTER TABLE purchase_orders ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE invoices ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+
+-- header edits (the version column itself is excluded, so these never recurse)
+CREATE TRIGGER IF NOT EXISTS trg_po_header_version AFTER UPDATE OF vendor_id, vendor_name, currency, total_amount ON purchase_orders
+BEGIN
+  UPDATE purchase_orders SET version = OLD.version + 1 WHERE po_id = NEW.po_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_invoice_header_version AFTER UPDATE OF vendor_id, vendor_name, currency, total_amount ON invoices
+BEGIN
+  UPDATE invoices SET version = OLD.version + 1 WHERE invoice_id = NEW.invoice_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_po_lines_insert_version AFTER INSERT ON po_lines
+BEGIN
+  UPDATE purchase_orders SET version = version + 1 WHERE po_id = NEW.po_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_po_lines_update_version AFTER UPDATE ON po_lines
+BEGIN
+  UPDATE purchase_orders SET version = version + 1 WHERE po_id IN (OLD.po_id, NEW.po_id);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_po_lines_delete_version AFTER DELETE ON po_lines
+BEGIN
+  UPDATE purchase_orders SET version = version + 1 WHERE po_id = OLD.po_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_invoice_lines_insert_version AFTER INSERT ON invoice_lines
+BEGIN
+  UPDATE invoices SET version = version + 1 WHERE invoice_id = NEW.invoice_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_invoice_lines_update_version AFTER UPDATE ON invoice_lines
+BEGIN
+  UPDATE invoices SET version = version + 1 WHERE invoice_id IN (OLD.invoice_id, NEW.invoice_id);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_invoice_lines_delete_version AFTER DELETE ON invoice_lines
+BEGIN
+  UPDATE invoices SET version = version + 1 WHERE invoice_id = OLD.invoice_id;
+END;
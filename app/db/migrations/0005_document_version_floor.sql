@@ -0,0 +1,35 @@
+-- Row versions keep increasing when a document is deleted and re-inserted under
+-- the same id, so an old ETag "<id>.<version>" never matches the new content.
+-- A delete leaves the last version here; the next insert of that id starts above it.
+CREATE TABLE IF NOT EXISTS document_version_floor (
+  table_name TEXT NOT NULL,
+  doc_id TEXT NOT NULL,
+  version INTEGER NOT NULL,
+  PRIMARY KEY (table_name, doc_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_po_delete_version AFTER DELETE ON purchase_orders
+BEGIN
+  INSERT INTO document_version_floor (table_name, doc_id, version) VALUES ('purchase_orders', OLD.po_id, OLD.version)
+  ON CONFLICT (table_name, doc_id) DO UPDATE SET version = MAX(version, excluded.version);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_po_insert_version AFTER INSERT ON purchase_orders
+WHEN EXISTS (SELECT 1 FROM document_version_floor WHERE table_name = 'purchase_orders' AND doc_id = NEW.po_id)
+BEGIN
+  UPDATE purchase_orders SET version = MAX(NEW.version, (SELECT version FROM document_version_floor
+    WHERE table_name = 'purchase_orders' AND doc_id = NEW.po_id) + 1) WHERE po_id = NEW.po_id;
+  DELETE FROM document_version_floor WHERE table_name = 'purchase_orders' AND doc_id = NEW.po_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_invoice_delete_version AFTER DELETE ON invoices
+BEGIN
+  INSERT INTO document_version_floor (table_name, doc_id, version) VALUES ('invoices', OLD.invoice_id, OLD.version)
+  ON CONFLICT (table_name, doc_id) DO UPDATE SET version = MAX(version, excluded.version);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_invoice_insert_version AFTER INSERT ON invoices
+WHEN EXISTS (SELECT 1 FROM document_version_floor WHERE table_name = 'invoices' AND doc_id = NEW.invoice_id)
+BEGIN
+  UPDATE invoices SET version = MAX(NEW.version, (SELECT version FROM document_version_floor
+    WHERE table_name = 'invoices' AND doc_id = NEW.invoice_id) + 1) WHERE invoice_id = NEW.invoice_id;
+  DELETE FROM document_version_floor WHERE table_name = 'invoices' AND doc_id = NEW.invoice_id;
+END;
@@ -43,24 +43,24 @@ CREATE TABLE IF NOT EXISTS inventory (
 );
 
 -- sample: perfect match PO and invoice
-INSERT OR IGNORE INTO purchase_orders VALUES ('PO-1001','V-001','Acme Corp','USD',1000.0);
+INSERT OR IGNORE INTO purchase_orders (po_id,vendor_id,vendor_name,currency,total_amount) VALUES ('PO-1001','V-001','Acme Corp','USD',1000.0);
 INSERT OR IGNORE INTO po_lines (po_id,line_id,item_id,description,quantity,unit_price,currency) VALUES
 ('PO-1001',1,'ITEM-01','Widget A',10,50.0,'USD'),
 ('PO-1001',2,'ITEM-02','Widget B',5,100.0,'USD');
 
 -- invoice perfect match
-INSERT OR IGNORE INTO invoices VALUES ('INV-5001','V-001','Acme Corp','USD',1000.0);
+INSERT OR IGNORE INTO invoices (invoice_id,vendor_id,vendor_name,currency,total_amount) VALUES ('INV-5001','V-001','Acme Corp','USD',1000.0);
 INSERT OR IGNORE INTO invoice_lines (invoice_id,line_id,item_id,description,quantity,unit_price,currency) VALUES
 ('INV-5001',1,'ITEM-01','Widget A',10,50.0,'USD'),
 ('INV-5001',2,'ITEM-02','Widget B',5,100.0,'USD');
 
 -- mismatch example: prices differ
-INSERT OR IGNORE INTO purchase_orders VALUES ('PO-1002','V-002','Beta LLC','USD',1000.0);
+INSERT OR IGNORE INTO purchase_orders (po_id,vendor_id,vendor_name,currency,total_amount) VALUES ('PO-1002','V-002','Beta LLC','USD',1000.0);
 INSERT OR IGNORE INTO po_lines (po_id,line_id,item_id,description,quantity,unit_price,currency) VALUES
 ('PO-1002',1,'ITEM-03','Widget C',10,50.0,'USD'),
 ('PO-1002',2,'ITEM-04','Widget D',5,100.0,'USD');
 
-INSERT OR IGNORE INTO invoices VALUES ('INV-5002','V-002','Beta LLC','USD',1100.0);
+INSERT OR IGNORE INTO invoices (invoice_id,vendor_id,vendor_name,currency,total_amount) VALUES ('INV-5002','V-002','Beta LLC','USD',1100.0);
 INSERT OR IGNORE INTO invoice_lines (invoice_id,line_id,item_id,description,quantity,unit_price,currency) VALUES
 ('INV-5002',1,'ITEM-03','Widget C',10,55.0,'USD'), -- price mismatch
 ('INV-5002',2,'ITEM-04','Widget D',5,100.0,'USD');
@@ -0,0 +1,154 @@
+"""
+Synthetic ERP dataset generator:
+- Reproducible for a given seed: vendors, items, POs with their invoices and
+  GRNs, plus the invoice/PO pairs to reconcile
+- Per-document mismatch rates (quantity, price, vendor, missing line) and GRN
+  partials (a line received over several GRNs) and short receipts
+- Writes loader-ready extracts (po.csv, invoice.csv, grn.jsonl, inventory.csv,
+  pairs.csv), and optionally builds a fresh database from them with loader.py
+
+CLI:
+    python -m app.db.synthetic out/ --pos 10000 --lines 20 --seed 7 --db out/erp.db
+"""
+import argparse
+import csv
+import json
+import random
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple
+
+from .loader import load_file
+from .migrate import migrate
+
+SEED_SQL = Path(__file__).parent / "seed_data.sql"
+PO_COLS = ["po_id", "vendor_id", "vendor_name", "currency", "total_amount",
+           "line_id", "item_id", "description", "quantity", "unit_price"]
+INVOICE_COLS = ["invoice_id"] + PO_COLS[1:]
+
+class DatasetParams(NamedTuple):
+    seed: int = 42
+    vendors: int = 50
+    items: int = 500
+    pos: int = 1000
+    lines: int = 10  # lines per document
+    qty_mismatch_rate: float = 0.05
+    price_mismatch_rate: float = 0.05
+    vendor_mismatch_rate: float = 0.01
+    missing_line_rate: float = 0.02
+    grn_partial_rate: float = 0.2  # POs whose lines arrive over 2-3 GRNs
+    grn_short_rate: float = 0.05  # POs with one line received short
+
+def iter_documents(params: DatasetParams) -> Iterator[Dict[str,Any]]:
+    """Yields {"po", "invoice", "grns"} per PO; same params, same documents."""
+    rng = random.Random(params.seed)
+    vendors = [(f"V-S{v:04d}", f"Vendor {v}") for v in range(params.vendors)]
+    for n in range(params.pos):
+        vendor_id, vendor_name = rng.choice(vendors)
+        po_lines = []
+        for line_id in range(1, params.lines + 1):
+            item = rng.randrange(params.items)
+            po_lines.append({"line_id": line_id, "item_id": f"ITEM-S{item:05d}",
+                             "description": f"Item {item}", "quantity": float(rng.randint(1, 100)),
+                             "unit_price": round(rng.uniform(1, 500), 2), "currency": "USD"})
+        po = {"po_id": f"PO-S{n:07d}", "vendor_id": vendor_id, "vendor_name": vendor_name,
+              "currency": "USD", "total_amount": doc_total(po_lines), "lines": po_lines}
+
+        inv_lines = [dict(l) for l in po_lines]
+        if rng.random() < params.qty_mismatch_rate:
+            rng.choice(inv_lines)["quantity"] += rng.randint(1, 5)
+        if rng.random() < params.price_mismatch_rate:
+            line = rng.choice(inv_lines)
+            line["unit_price"] = round(line["unit_price"] * 1.1, 2)
+        if len(inv_lines) > 1 and rng.random() < params.missing_line_rate:
+            inv_lines.pop(rng.randrange(len(inv_lines)))
+        inv_vendor = (vendor_id, vendor_name)
+        if rng.random() < params.vendor_mismatch_rate:
+            inv_vendor = rng.choice(vendors)
+        invoice = {"invoice_id": f"INV-S{n:07d}", "vendor_id": inv_vendor[0], "vendor_name": inv_vendor[1],
+                   "currency": "USD", "total_amount": doc_total(inv_lines), "lines": inv_lines}
+
+        received = {l["line_id"]: l["quantity"] for l in po_lines}
+        if rng.random() < params.grn_short_rate:
+            short = rng.choice(po_lines)["line_id"]
+            received[short] = max(0.0, received[short] - rng.randint(1, 3))
+        receipts = rng.randint(2, 3) if rng.random() < params.grn_partial_rate else 1
+        grns = []
+        for r in range(receipts):
+            grn_lines = []
+            for l in po_lines:
+                total = received[l["line_id"]]
+                # earlier receipts take an even share, the last one the remainder
+                qty = total - (receipts - 1) * (total // receipts) if r == receipts - 1 else total // receipts
+                if qty:
+                    grn_lines.append({"line_id": l["line_id"], "item_id": l["item_id"], "received_qty": qty})
+            grns.append({"grn_id": f"GRN-S{n:07d}-{r + 1}", "po_id": po["po_id"],
+                         "received_at": f"2025-01-{r + 1:02d}T00:00:00Z", "lines": grn_lines})
+        yield {"po": po, "invoice": invoice, "grns": grns}
+
+def doc_total(lines) -> float:
+    return round(sum(l["quantity"] * l["unit_price"] for l in lines), 2)
+
+def flat_rows(doc: Dict[str,Any], id_col: str):
+    header = [doc[id_col], doc["vendor_id"], doc["vendor_name"], doc["currency"], doc["total_amount"]]
+    for l in doc["lines"]:
+        yield header + [l["line_id"], l["item_id"], l["description"], l["quantity"], l["unit_price"]]
+
+def write_extracts(out_dir: Path, params: DatasetParams) -> Dict[str,Path]:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {kind: out_dir / name for kind, name in (
+        ("po", "po.csv"), ("invoice", "invoice.csv"), ("grn", "grn.jsonl"),
+        ("inventory", "inventory.csv"), ("pairs", "pairs.csv"))}
+    with open(paths["po"], "w", newline="", encoding="utf-8") as po_f, \
+         open(paths["invoice"], "w", newline="", encoding="utf-8") as inv_f, \
+         open(paths["grn"], "w", encoding="utf-8") as grn_f, \
+         open(paths["pairs"], "w", newline="", encoding="utf-8") as pairs_f:
+        po_w, inv_w, pairs_w = csv.writer(po_f), csv.writer(inv_f), csv.writer(pairs_f)
+        po_w.writerow(PO_COLS)
+        inv_w.writerow(INVOICE_COLS)
+        pairs_w.writerow(["invoice_id", "po_id"])
+        for docs in iter_documents(params):
+            po_w.writerows(flat_rows(docs["po"], "po_id"))
+            inv_w.writerows(flat_rows(docs["invoice"], "invoice_id"))
+            for grn in docs["grns"]:
+                grn_f.write(json.dumps(grn) + "\n")
+            pairs_w.writerow([docs["invoice"]["invoice_id"], docs["po"]["po_id"]])
+    rng = random.Random(params.seed + 1)
+    with open(paths["inventory"], "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["item_id", "on_hand"])
+        for i in range(params.items):
+            w.writerow([f"ITEM-S{i:05d}", rng.randint(0, 1000)])
+    (out_dir / "params.json").write_text(json.dumps(params._asdict(), indent=2))
+    return paths
+
+def build_database(db_path: Path, paths: Dict[str,Path], chunk_size: int = 10000) -> Dict[str,Any]:
+    """Fresh schema + migrations, then every extract through the bulk loader."""
+    db_path = Path(db_path)
+    if db_path.exists():
+        raise FileExistsError(f"{db_path} exists; synthetic data goes into a fresh database")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SEED_SQL.read_text())
+    conn.close()
+    migrate(db_path)
+    return {kind: load_file(kind, paths[kind], db_path=db_path, chunk_size=chunk_size)
+            for kind in ("po", "invoice", "grn", "inventory")}
+
+def main(argv=None):
+    defaults = DatasetParams()
+    ap = argparse.ArgumentParser(description="Generate a reproducible synthetic ERP dataset")
+    ap.add_argument("out_dir", type=Path)
+    ap.add_argument("--db", type=Path, default=None, help="also load the extracts into this new database")
+    for name, value in defaults._asdict().items():
+        ap.add_argument("--" + name.replace("_", "-"), type=type(value), default=value)
+    args = ap.parse_args(argv)
+    params = DatasetParams(**{k: getattr(args, k) for k in defaults._fields})
+    paths = write_extracts(args.out_dir, params)
+    summary = {"extracts": {k: str(p) for k, p in paths.items()}}
+    if args.db:
+        summary["load"] = build_database(args.db, paths)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
 from fastapi import FastAPI
 from .tools import po_service, invoice_service, inventory_service, grn_service
+from .tools.db import DB
 from pathlib import Path
 
 app = FastAPI(title="Mock ERP Tools - OpenAPI", version="1.0.0")
 
-app.include_router(po_service.router)
-app.include_router(invoice_service.router)
-app.include_router(inventory_service.router)
-app.include_router(grn_service.router)
+# also used by the executor's in-process transport (ERP_TRANSPORT=inprocess)
+TOOL_ROUTERS = [po_service.router, invoice_service.router, inventory_service.router, grn_service.router]
+
+for router in TOOL_ROUTERS:
+    app.include_router(router)
+
+# operational endpoint; kept out of openapi.json so it never becomes an executor tool
+@app.get("/health/db", include_in_schema=False)
+def db_health():
+    return DB.stats()
 
 if __name__ == "__main__":
     import uvicorn
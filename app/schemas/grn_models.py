@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class GRNLine(BaseModel):
+    line_id: int
+    item_id: Optional[str] = None
+    received_qty: float
+
+class GRNHeader(BaseModel):
+    grn_id: str
+    po_id: str
+    received_at: Optional[str] = None
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import List
+
+class InventoryBatchRequest(BaseModel):
+    item_ids: List[str]
+
+class InventoryItem(BaseModel):
+    item_id: str
+    on_hand: float
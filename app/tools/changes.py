@@ -0,0 +1,23 @@
+"""
+Row-change notifications from the tool services.
+Writers (app.db.loader, app.db.migrate) call notify(...) after changing rows,
+e.g. notify(po_id="PO-1001") or notify(item_id=["ITEM-01", "ITEM-02"]);
+notify() with no refs means "anything may have changed". Subscribers such as
+the executor's response cache drop the affected entries. Notifications are
+in-process only: a loader run as a separate CLI process cannot reach a server's cache.
+"""
+from typing import Callable, List
+
+_LISTENERS: List[Callable[..., object]] = []
+
+def subscribe(listener: Callable[..., object]):
+    if listener not in _LISTENERS:
+        _LISTENERS.append(listener)
+
+def unsubscribe(listener: Callable[..., object]):
+    if listener in _LISTENERS:
+        _LISTENERS.remove(listener)
+
+def notify(**refs):
+    for listener in list(_LISTENERS):
+        listener(**refs)
@@ -0,0 +1,193 @@
+"""
+Shared SQLite access layer for the tool services:
+- Bounded pools of persistent connections (read-only and read-write), reused
+  across request threads instead of sqlite3.connect() per request
+- WAL journal mode plus tuned pragmas (mmap_size, cache_size, busy_timeout)
+- Read-only connections (mode=ro, query_only) for GET endpoints
+- Prepared statements are reused through each connection's statement cache
+- Health metrics via stats(); pools are re-created after fork (multi-worker uvicorn)
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+# ERP_DB_PATH points the tool services at another database (e.g. a synthetic benchmark dataset)
+DB_PATH = Path(os.getenv("ERP_DB_PATH", str(Path(__file__).parent.parent / "db" / "erp.db")))
+
+POOL_SIZE = int(os.getenv("ERP_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("ERP_DB_POOL_TIMEOUT", "10"))
+MMAP_SIZE = int(os.getenv("ERP_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.getenv("ERP_DB_CACHE_KB", "65536"))
+STATEMENT_CACHE = 256
+
+class PoolTimeout(Exception):
+    pass
+
+class ConnectionPool:
+    def __init__(self, path: Path, readonly: bool, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = Path(path)
+        self.readonly = readonly
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []  # LIFO: the most recently used connection has the warmest cache
+        self._cond = threading.Condition()
+        self._size = 0
+        self.created = 0
+        self.discarded = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_ms = 0.0
+        self.timeouts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.readonly:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE)
+            conn.execute("PRAGMA query_only=ON")
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=STATEMENT_CACHE)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        deadline = None
+        with self._cond:
+            self.checkouts += 1
+            while not self._idle and self._size >= self.max_size:
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                    self.waits += 1
+                    t0 = time.perf_counter()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"no database connection available within {self.timeout}s")
+                self._cond.wait(remaining)
+            if deadline is not None:
+                self.wait_ms += (time.perf_counter() - t0) * 1000.0
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection, broken: bool = False):
+        if broken:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        with self._cond:
+            if broken:
+                self._size -= 1
+                self.discarded += 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+            if not self.readonly:
+                conn.commit()
+        except (sqlite3.InterfaceError, sqlite3.ProgrammingError):
+            broken = True
+            raise
+        except BaseException:
+            if not self.readonly:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str,Any]:
+        with self._cond:
+            return {
+                "readonly": self.readonly,
+                "max_size": self.max_size,
+                "open": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "created": self.created,
+                "discarded": self.discarded,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_ms": round(self.wait_ms, 3),
+                "timeouts": self.timeouts,
+            }
+
+class Database:
+    def __init__(self, path: Path = DB_PATH, max_size: int = POOL_SIZE):
+        self.path = Path(path)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._read: Optional[ConnectionPool] = None
+        self._write: Optional[ConnectionPool] = None
+        self._wal = False
+
+    def _pools(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # connections must not cross a fork; start fresh in each worker
+                    self._write = ConnectionPool(self.path, readonly=False, max_size=self.max_size)
+                    self._read = ConnectionPool(self.path, readonly=True, max_size=self.max_size)
+                    self._pid = os.getpid()
+        if not self._wal and self.path.exists():
+            # WAL is persistent in the file, but must be set by a writer once; the file
+            # may only be created after the pools (e.g. init_db on a fresh checkout)
+            with self._lock:
+                if not self._wal:
+                    with self._write.connection():
+                        pass
+                    self._wal = True
+        return self._read, self._write
+
+    def read(self):
+        """Read-only pooled connection for GET endpoints."""
+        return self._pools()[0].connection()
+
+    def write(self):
+        """Read-write pooled connection; commits on success, rolls back on error."""
+        return self._pools()[1].connection()
+
+    def close(self):
+        with self._lock:
+            for pool in (self._read, self._write):
+                if pool is not None:
+                    pool.close()
+            self._pid = None
+
+    def stats(self) -> Dict[str,Any]:
+        read, write = self._pools()
+        return {"path": str(self.path), "read": read.stats(), "write": write.stats()}
+
+DB = Database()
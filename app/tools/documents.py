@@ -0,0 +1,119 @@
+"""
+Set-based document loading shared by the PO and invoice services:
+- headers and lines for a whole chunk of ids are read with one IN (...) query
+  each and grouped in Python, instead of two queries per document
+- keyset (cursor) paginated header listing: WHERE id > :last ORDER BY id LIMIT n,
+  so deep pages cost the same as the first one
+- ETags from the per-document row version (migrations 0004, 0005: versions keep
+  increasing across a delete and re-insert of the same id), checkable without
+  loading any lines
+"""
+import base64
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+# stay well below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds)
+CHUNK = 500
+LINE_COLS = ("line_id", "item_id", "description", "quantity", "unit_price", "currency")
+HEADER_COLS = ("vendor_id", "vendor_name", "currency", "total_amount")
+
+def iter_documents(conn, header_table: str, line_table: str, id_col: str,
+                   ids: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+    """Yields (id, document) for every id found, in request order, one chunk at a time."""
+    wanted = list(dict.fromkeys(ids))
+    for i in range(0, len(wanted), CHUNK):
+        chunk = wanted[i:i + CHUNK]
+        marks = ",".join("?" * len(chunk))
+        headers = {}
+        for row in conn.execute(
+                f"SELECT {id_col},{','.join(HEADER_COLS)} FROM {header_table} WHERE {id_col} IN ({marks})", chunk):
+            doc = {id_col: row[0]}
+            doc.update(zip(HEADER_COLS, row[1:]))
+            doc["lines"] = []
+            headers[row[0]] = doc
+        if headers:
+            # (id_col, line_id) order comes straight from the covering index
+            for row in conn.execute(
+                    f"SELECT {id_col},{','.join(LINE_COLS)} FROM {line_table} "
+                    f"WHERE {id_col} IN ({','.join('?' * len(headers))}) ORDER BY {id_col}, line_id",
+                    list(headers)):
+                headers[row[0]]["lines"].append(dict(zip(LINE_COLS, row[1:])))
+        for doc_id in chunk:
+            if doc_id in headers:
+                yield doc_id, headers[doc_id]
+
+def document_etag(conn, header_table: str, id_col: str, doc_id: str) -> Optional[str]:
+    row = conn.execute(f"SELECT version FROM {header_table} WHERE {id_col}=?", (doc_id,)).fetchone()
+    return f'"{doc_id}.{row[0]}"' if row else None
+
+def load_documents(conn, header_table: str, line_table: str, id_col: str, ids: List[str]) -> Dict:
+    docs = dict(iter_documents(conn, header_table, line_table, id_col, ids))
+    missing = [i for i in dict.fromkeys(ids) if i not in docs]
+    return {"documents": docs, "missing": missing}
+
+def ndjson_response(db, header_table: str, line_table: str, id_col: str, ids: List[str]) -> StreamingResponse:
+    """One {"id", "document"} line per document, then a final {"missing": [...]} line."""
+    def gen():
+        found = set()
+        with db.read() as conn:
+            for doc_id, doc in iter_documents(conn, header_table, line_table, id_col, ids):
+                found.add(doc_id)
+                yield json.dumps({"id": doc_id, "document": doc}) + "\n"
+        yield json.dumps({"missing": [i for i in dict.fromkeys(ids) if i not in found]}) + "\n"
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def _filter_fingerprint(filters: Dict[str,Any]) -> str:
+    return hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()[:12]
+
+def encode_cursor(last_id: str, filters: Dict[str,Any]) -> str:
+    raw = json.dumps({"after": last_id, "f": _filter_fingerprint(filters)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, filters: Dict[str,Any]) -> str:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        after = data["after"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("f") != _filter_fingerprint(filters):
+        raise HTTPException(status_code=400, detail="Cursor does not match the filters")
+    return after
+
+def list_headers(conn, header_table: str, id_col: str, vendor_id: Optional[str] = None,
+                 currency: Optional[str] = None, min_id: Optional[str] = None,
+                 max_id: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                 cursor: Optional[str] = None) -> Dict[str,Any]:
+    """One page of headers (no lines) ordered by id, plus an opaque next_cursor."""
+    filters = {"vendor_id": vendor_id, "currency": currency, "min_id": min_id, "max_id": max_id}
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    where, params = [], []
+    for col, value in (("vendor_id", vendor_id), ("currency", currency)):
+        if value is not None:
+            where.append(f"{col}=?")
+            params.append(value)
+    if min_id is not None:
+        where.append(f"{id_col}>=?")
+        params.append(min_id)
+    if max_id is not None:
+        where.append(f"{id_col}<=?")
+        params.append(max_id)
+    if cursor:
+        where.append(f"{id_col}>?")
+        params.append(decode_cursor(cursor, filters))
+    sql = f"SELECT {id_col},{','.join(HEADER_COLS)} FROM {header_table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    # one extra row tells us whether another page exists
+    sql += f" ORDER BY {id_col} LIMIT ?"
+    rows = conn.execute(sql, params + [page_size + 1]).fetchall()
+    items = [dict(zip((id_col,) + HEADER_COLS, r)) for r in rows[:page_size]]
+    next_cursor = encode_cursor(items[-1][id_col], filters) if len(rows) > page_size else None
+    return {"items": items, "next_cursor": next_cursor}
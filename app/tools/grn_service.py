@@ -1,14 +1,42 @@
-from fastapi import APIRouter
-from typing import Dict
+from fastapi import APIRouter, Request
+from typing import Dict, List
+from .db import DB
+from ..schemas.document_models import DocumentBatchRequest
+from .responses import render
 router = APIRouter()
+# stay well below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds)
+BATCH_CHUNK = 500
+# aggregates every partial receipt per PO line; served by idx_grn_lines_po_line
+GRN_SUMMARY_SQL = (
+    "SELECT po_id,line_id,item_id,SUM(received_qty),COUNT(*) FROM grn_lines "
+    "WHERE po_id IN ({marks}) GROUP BY po_id,line_id,item_id ORDER BY po_id,line_id"
+)
 
-# Lightweight mock: pretend we have GRN recorded quantities for PO
-GRN_DATA = {
-    "PO-1001": {"received_qty": {1:10, 2:5}},
-    "PO-1002": {"received_qty": {1:10, 2:5}}
-}
+def empty_summary() -> Dict:
+    return {"received_qty": {}, "lines": []}
+
+def query_grn(po_ids: List[str]) -> Dict[str, Dict]:
+    wanted = list(dict.fromkeys(po_ids))
+    out = {po_id: empty_summary() for po_id in wanted}
+    with DB.read() as conn:
+        for i in range(0, len(wanted), BATCH_CHUNK):
+            chunk = wanted[i:i + BATCH_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for po_id, line_id, item_id, received, receipts in conn.execute(GRN_SUMMARY_SQL.format(marks=marks), chunk):
+                summary = out[po_id]
+                # string keys so in-process and JSON responses are identical
+                key = str(line_id)
+                summary["received_qty"][key] = summary["received_qty"].get(key, 0) + received
+                summary["lines"].append({"line_id": line_id, "item_id": item_id,
+                                         "received_qty": received, "receipts": receipts})
+    return out
 
 @router.get("/get_grn_status/{po_id}", tags=["erp"])
-def get_grn_status(po_id: str):
-    data = GRN_DATA.get(po_id, {"received_qty": {}})
-    return {"po_id": po_id, "grn_summary": data}
+def get_grn_status(po_id: str, request: Request):
+    return render(request, {"po_id": po_id, "grn_summary": query_grn([po_id])[po_id]})
+
+@router.post("/get_grn_statuses", tags=["erp"])
+def get_grn_statuses(req: DocumentBatchRequest, request: Request):
+    # POs without receipts get an empty summary, matching get_grn_status
+    docs = {po_id: {"po_id": po_id, "grn_summary": s} for po_id, s in query_grn(req.ids).items()}
+    return render(request, {"documents": docs, "missing": []})
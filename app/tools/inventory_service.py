@@ -1,15 +1,33 @@
-from fastapi import APIRouter, HTTPException
-from pathlib import Path
-import sqlite3
+from fastapi import APIRouter, HTTPException, Request
+from ..schemas.inventory_models import InventoryBatchRequest
+from .db import DB
+from .responses import render
 router = APIRouter()
-DB_PATH = Path(__file__).parent.parent / "db" / "erp.db"
+# stay well below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds)
+BATCH_CHUNK = 500
 
 @router.get("/check_inventory/{item_id}", tags=["erp"])
-def check_inventory(item_id: str):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    r = cur.execute("SELECT on_hand FROM inventory WHERE item_id=?", (item_id,)).fetchone()
-    conn.close()
+def check_inventory(item_id: str, request: Request):
+    with DB.read() as conn:
+        r = conn.execute("SELECT on_hand FROM inventory WHERE item_id=?", (item_id,)).fetchone()
     if r is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return {"item_id": item_id, "on_hand": r[0]}
+    return render(request, {"item_id": item_id, "on_hand": r[0]})
+
+def query_inventory(item_ids):
+    # unique ids, request order preserved
+    wanted = list(dict.fromkeys(item_ids))
+    found = {}
+    with DB.read() as conn:
+        for i in range(0, len(wanted), BATCH_CHUNK):
+            chunk = wanted[i:i + BATCH_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for item_id, on_hand in conn.execute(f"SELECT item_id,on_hand FROM inventory WHERE item_id IN ({marks})", chunk):
+                found[item_id] = on_hand
+    items = [{"item_id": i, "on_hand": found[i]} for i in wanted if i in found]
+    missing = [i for i in wanted if i not in found]
+    return {"items": items, "missing": missing}
+
+@router.post("/check_inventory_batch", tags=["erp"])
+def check_inventory_batch(req: InventoryBatchRequest, request: Request):
+    return render(request, query_inventory(req.item_ids))
@@ -1,29 +1,31 @@
-from fastapi import APIRouter, HTTPException
-from pathlib import Path
-import sqlite3
+from fastapi import APIRouter, HTTPException, Request
+from typing import Optional
 from ..schemas.invoice_models import InvoiceHeader
+from .db import DB
+from .documents import document_etag, load_documents, ndjson_response, list_headers, DEFAULT_PAGE_SIZE
+from ..schemas.document_models import DocumentBatchRequest
+from .responses import render, validated, etag_matches, not_modified, variant_etag
 router = APIRouter()
-DB_PATH = Path(__file__).parent.parent / "db" / "erp.db"
+# served by the covering index from migration 0001 (see tests/test_migrations.py)
+INVOICE_LINES_SQL = "SELECT line_id,item_id,description,quantity,unit_price,currency FROM invoice_lines WHERE invoice_id=? ORDER BY line_id"
 
 def query_invoice(invoice_id: str):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    h = cur.execute("SELECT invoice_id,vendor_id,vendor_name,currency,total_amount FROM invoices WHERE invoice_id=?", (invoice_id,)).fetchone()
-    if not h:
-        return None
-    invoice_id,vendor_id,vendor_name,currency,total_amount = h
-    lines = []
-    for r in cur.execute("SELECT line_id,item_id,description,quantity,unit_price,currency FROM invoice_lines WHERE invoice_id=? ORDER BY line_id",(invoice_id,)):
-        line_id,item_id,description,quantity,unit_price,currency = r
-        lines.append({
-            "line_id": line_id,
-            "item_id": item_id,
-            "description": description,
-            "quantity": quantity,
-            "unit_price": unit_price,
-            "currency": currency
-        })
-    conn.close()
+    with DB.read() as conn:
+        h = conn.execute("SELECT invoice_id,vendor_id,vendor_name,currency,total_amount FROM invoices WHERE invoice_id=?", (invoice_id,)).fetchone()
+        if not h:
+            return None
+        invoice_id,vendor_id,vendor_name,currency,total_amount = h
+        lines = []
+        for r in conn.execute(INVOICE_LINES_SQL,(invoice_id,)):
+            line_id,item_id,description,quantity,unit_price,currency = r
+            lines.append({
+                "line_id": line_id,
+                "item_id": item_id,
+                "description": description,
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "currency": currency
+            })
     return {
         "invoice_id": invoice_id,
         "vendor_id": vendor_id,
@@ -34,8 +36,33 @@ def query_invoice(invoice_id: str):
     }
 
 @router.get("/get_invoice/{invoice_id}", response_model=InvoiceHeader, tags=["erp"])
-def get_invoice(invoice_id: str):
+def get_invoice(invoice_id: str, request: Request):
+    # version before body: a concurrent edit can only leave the ETag stale, never ahead
+    with DB.read() as conn:
+        etag = variant_etag(request, document_etag(conn, "invoices", "invoice_id", invoice_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
     inv = query_invoice(invoice_id)
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    return inv
+    # response_model stays for the OpenAPI schema; trusted callers skip re-validation
+    return render(request, validated(InvoiceHeader, inv, request), headers={"ETag": etag})
+
+@router.post("/get_invoices", tags=["erp"])
+def get_invoices(req: DocumentBatchRequest, request: Request, stream: bool = False):
+    # many invoices at once: {"documents": {id: doc}, "missing": [...]}, or NDJSON when stream=true
+    if stream:
+        return ndjson_response(DB, "invoices", "invoice_lines", "invoice_id", req.ids)
+    with DB.read() as conn:
+        docs = load_documents(conn, "invoices", "invoice_lines", "invoice_id", req.ids)
+    return render(request, docs)
+
+@router.get("/invoices", tags=["erp"])
+def list_invoices(request: Request, vendor_id: Optional[str] = None, currency: Optional[str] = None,
+                min_id: Optional[str] = None, max_id: Optional[str] = None,
+                page_size: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None):
+    # keyset-paginated invoice headers; pass next_cursor back as cursor for the next page
+    with DB.read() as conn:
+        page = list_headers(conn, "invoices", "invoice_id", vendor_id=vendor_id, currency=currency,
+                            min_id=min_id, max_id=max_id, page_size=page_size, cursor=cursor)
+    return render(request, page)
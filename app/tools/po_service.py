@@ -1,33 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-import sqlite3
-from pathlib import Path
 from ..schemas.po_models import POHeader, POLine
-from typing import List
+from typing import List, Optional
+from .db import DB
+from .documents import document_etag, load_documents, ndjson_response, list_headers, DEFAULT_PAGE_SIZE
+from ..schemas.document_models import DocumentBatchRequest
+from .responses import render, validated, etag_matches, not_modified, variant_etag
 
 router = APIRouter()
-
-DB_PATH = Path(__file__).parent.parent / "db" / "erp.db"
+# served by the covering index from migration 0001 (see tests/test_migrations.py)
+PO_LINES_SQL = "SELECT line_id,item_id,description,quantity,unit_price,currency FROM po_lines WHERE po_id=? ORDER BY line_id"
 
 def query_po(po_id: str):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    h = cur.execute("SELECT po_id,vendor_id,vendor_name,currency,total_amount FROM purchase_orders WHERE po_id=?", (po_id,)).fetchone()
-    if not h:
-        return None
-    po_id,vendor_id,vendor_name,currency,total_amount = h
-    lines = []
-    for r in cur.execute("SELECT line_id,item_id,description,quantity,unit_price,currency FROM po_lines WHERE po_id=? ORDER BY line_id",(po_id,)):
-        line_id,item_id,description,quantity,unit_price,currency = r
-        lines.append({
-            "line_id": line_id,
-            "item_id": item_id,
-            "description": description,
-            "quantity": quantity,
-            "unit_price": unit_price,
-            "currency": currency
-        })
-    conn.close()
+    with DB.read() as conn:
+        h = conn.execute("SELECT po_id,vendor_id,vendor_name,currency,total_amount FROM purchase_orders WHERE po_id=?", (po_id,)).fetchone()
+        if not h:
+            return None
+        po_id,vendor_id,vendor_name,currency,total_amount = h
+        lines = []
+        for r in conn.execute(PO_LINES_SQL,(po_id,)):
+            line_id,item_id,description,quantity,unit_price,currency = r
+            lines.append({
+                "line_id": line_id,
+                "item_id": item_id,
+                "description": description,
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "currency": currency
+            })
     return {
         "po_id": po_id,
         "vendor_id": vendor_id,
@@ -38,8 +38,33 @@ def query_po(po_id: str):
     }
 
 @router.get("/get_purchase_order/{po_id}", response_model=POHeader, tags=["erp"])
-def get_purchase_order(po_id: str):
+def get_purchase_order(po_id: str, request: Request):
+    # version before body: a concurrent edit can only leave the ETag stale, never ahead
+    with DB.read() as conn:
+        etag = variant_etag(request, document_etag(conn, "purchase_orders", "po_id", po_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
     po = query_po(po_id)
     if not po:
         raise HTTPException(status_code=404, detail="PO not found")
-    return po
+    # response_model stays for the OpenAPI schema; trusted callers skip re-validation
+    return render(request, validated(POHeader, po, request), headers={"ETag": etag})
+
+@router.post("/get_purchase_orders", tags=["erp"])
+def get_purchase_orders(req: DocumentBatchRequest, request: Request, stream: bool = False):
+    # many POs at once: {"documents": {id: doc}, "missing": [...]}, or NDJSON when stream=true
+    if stream:
+        return ndjson_response(DB, "purchase_orders", "po_lines", "po_id", req.ids)
+    with DB.read() as conn:
+        docs = load_documents(conn, "purchase_orders", "po_lines", "po_id", req.ids)
+    return render(request, docs)
+
+@router.get("/purchase_orders", tags=["erp"])
+def list_purchase_orders(request: Request, vendor_id: Optional[str] = None, currency: Optional[str] = None,
+                min_id: Optional[str] = None, max_id: Optional[str] = None,
+                page_size: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None):
+    # keyset-paginated PO headers; pass next_cursor back as cursor for the next page
+    with DB.read() as conn:
+        page = list_headers(conn, "purchase_orders", "po_id", vendor_id=vendor_id, currency=currency,
+                            min_id=min_id, max_id=max_id, page_size=page_size, cursor=cursor)
+    return render(request, page)
@@ -0,0 +1,115 @@
+"""
+Fast response rendering for the tool routers:
+- orjson-encoded JSON when orjson is installed (stdlib json otherwise)
+- application/msgpack when the client asks for it in Accept and msgpack is installed
+- Trusted internal callers skip the redundant response-model validation:
+  in-process calls always, HTTP callers only with X-ERP-Trusted: 1 when the
+  server runs with ERP_TRUST_INTERNAL_CALLERS=1
+- Conditional GET: an ETag header on the response, 304 Not Modified when the
+  request's If-None-Match already names it; the ETag names the encoding too
+  and responses carry Vary: Accept, so a cache never answers with the other one
+"""
+import json
+import os
+from typing import Any, Dict, Optional, Type
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+MSGPACK = "application/msgpack"
+TRUST_INTERNAL_CALLERS = os.getenv("ERP_TRUST_INTERNAL_CALLERS", "0") == "1"
+TRUSTED_HEADER = "x-erp-trusted"
+# set by the executor's in-process transport on the request scope
+INPROCESS_SCOPE_KEY = "erp.inprocess"
+# response headers of in-process calls are handed back through the scope
+INPROCESS_HEADERS_KEY = "erp.response_headers"
+INPROCESS_RENDERED_KEY = "erp.rendered"
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return super().render(content)
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+def is_inprocess(request: Optional[Request]) -> bool:
+    return request is not None and bool(request.scope.get(INPROCESS_SCOPE_KEY))
+
+def is_trusted(request: Optional[Request]) -> bool:
+    if is_inprocess(request):
+        return True
+    return (TRUST_INTERNAL_CALLERS and request is not None
+            and request.headers.get(TRUSTED_HEADER) == "1")
+
+def validated(model: Type, content: Dict[str,Any], request: Optional[Request]) -> Any:
+    """Runs content through the response model unless the caller is trusted."""
+    if is_trusted(request):
+        return content
+    obj = model(**content)
+    return obj.model_dump() if hasattr(obj, "model_dump") else obj.dict()
+
+def wants_msgpack(request: Optional[Request]) -> bool:
+    return msgpack is not None and request is not None and MSGPACK in request.headers.get("accept", "")
+
+def variant_etag(request: Optional[Request], etag: Optional[str]) -> Optional[str]:
+    """The document's ETag for the encoding this request will get ("<id>.<version>" is JSON)."""
+    if etag is None or not wants_msgpack(request):
+        return etag
+    return etag[:-1] + '.msgpack"'
+
+def render(request: Optional[Request], content: Any, status_code: int = 200,
+           headers: Optional[Dict[str,str]] = None):
+    # in-process callers get the Python object itself: no encode/decode at all
+    if is_inprocess(request):
+        # the in-process transport then skips response_model, as HTTP does for a Response
+        request.scope[INPROCESS_RENDERED_KEY] = True
+        if headers:
+            request.scope[INPROCESS_HEADERS_KEY] = {k.lower(): v for k, v in headers.items()}
+        return content
+    if headers and "ETag" in headers:
+        headers = dict(headers, Vary="Accept")
+    if wants_msgpack(request):
+        return MsgpackResponse(content, status_code=status_code, headers=headers)
+    if orjson is None:
+        content = jsonable_encoder(content)
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+def etag_matches(request: Optional[Request], etag: Optional[str]) -> bool:
+    if request is None or etag is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison, as RFC 9110 asks for If-None-Match
+    tags = [t.strip() for t in header.split(",")]
+    return etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+
+def decode_body(content_type: str, body: bytes) -> Any:
+    """Client-side decoding matching render(); used by the executor."""
+    if content_type.startswith(MSGPACK):
+        if msgpack is None:
+            raise ValueError("msgpack response but msgpack is not installed")
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
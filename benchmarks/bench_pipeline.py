@@ -0,0 +1,202 @@
+"""
+End-to-end pipeline benchmark over synthetic datasets (app/db/synthetic.py):
+- For every size (POs x lines per document) a fresh database is generated and
+  bulk-loaded, then deterministic_plan -> execute_plan -> audit_decision runs
+  for every invoice/PO pair through the batch runner (in-process transport)
+- Reports per-stage latency (mean/p50/p95), throughput, tool-service latency,
+  loader rows/sec and peak memory (tracemalloc peak and max RSS); latencies and
+  RSS come from a timed pass without tracemalloc, the traced peak from a second
+  pass over the same pairs with cold caches
+- Each size runs in its own subprocess, so memory figures do not leak between sizes
+- Results are written as JSON tagged with the git commit; --compare flags
+  regressions against an earlier results file (exit status 1)
+
+    python -m benchmarks.bench_pipeline --sizes 100x10,1000x10,1000x50
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/pipeline-<old>.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+# metric -> True when higher is better
+TRACKED = {
+    "load_rows_per_sec": True,
+    "pairs_per_sec": True,
+    "plan_p50_ms": False, "execute_p50_ms": False, "audit_p50_ms": False,
+    "plan_p95_ms": False, "execute_p95_ms": False, "audit_p95_ms": False,
+    "get_purchase_order_p50_ms": False, "get_invoice_p50_ms": False,
+    "peak_traced_mb": False,
+}
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def latency_stats(prefix, samples_ms):
+    return {f"{prefix}_mean_ms": round(statistics.fmean(samples_ms), 3) if samples_ms else None,
+            f"{prefix}_p50_ms": round(percentile(samples_ms, 50), 3) if samples_ms else None,
+            f"{prefix}_p95_ms": round(percentile(samples_ms, 95), 3) if samples_ms else None}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_one(db_path: Path, pairs_path: Path, workers: int, service_samples: int):
+    """Runs inside the per-size subprocess (ERP_DB_PATH / ERP_TRANSPORT set by the parent)."""
+    from app.agents import auditor, batch_auditor
+    from app.agents.batch import read_pairs, run_batch
+    from app.agents.cache import DecisionCache
+    from app.agents.executor import RESPONSE_CACHE, VALIDATORS
+    from app.audit.log_manager import AuditLogManager
+    from app.tools.po_service import query_po
+    from app.tools.invoice_service import query_invoice
+
+    def fresh_state(name):
+        # keep benchmark decisions out of the real audit log; every pass starts cold
+        auditor.LOG_MANAGER = batch_auditor.LOG_MANAGER = AuditLogManager(db_path.parent / name)
+        RESPONSE_CACHE.clear()
+        VALIDATORS.clear()
+        # a new in-memory memo rather than clear(), which would empty a persistent one
+        auditor.DECISIONS = DecisionCache(auditor.DECISIONS.max_entries, auditor.DECISIONS.enabled)
+
+    pairs = read_pairs(pairs_path)
+    fresh_state("audit_log.jsonl")
+    out = {"pairs": len(pairs)}
+    for name, fn, ids in (("get_purchase_order", query_po, [p for _, p in pairs]),
+                          ("get_invoice", query_invoice, [i for i, _ in pairs])):
+        samples = []
+        for doc_id in ids[:service_samples]:
+            t0 = time.perf_counter()
+            fn(doc_id)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+        out.update(latency_stats(name, samples))
+
+    summary = run_batch(pairs, workers=workers)
+    stages = {s: [] for s in ("plan", "execute", "audit")}
+    for row in summary["results"]:
+        for stage, secs in row["timings"].items():
+            stages[stage].append(secs * 1000.0)
+    for stage, samples in stages.items():
+        out.update(latency_stats(stage, samples))
+    # ru_maxrss is KiB on Linux; read before the traced pass adds tracemalloc's own overhead
+    max_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    fresh_state("audit_log.traced.jsonl")
+    tracemalloc.start()
+    run_batch(pairs, workers=workers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    out.update({
+        "pairs_per_sec": summary["pairs_per_sec"],
+        "elapsed_sec": summary["elapsed_sec"],
+        "approved": summary["approved"],
+        "escalated": summary["escalated"],
+        "errors": summary["errors"],
+        "peak_traced_mb": round(peak / 2**20, 2),
+        "max_rss_mb": max_rss_mb,
+    })
+    return out
+
+def bench_size(pos: int, lines: int, args, work_dir: Path):
+    from app.db.synthetic import DatasetParams, write_extracts, build_database
+    params = DatasetParams(seed=args.seed, pos=pos, lines=lines)
+    size_dir = work_dir / f"{pos}x{lines}"
+    t0 = time.perf_counter()
+    paths = write_extracts(size_dir, params)
+    generate_sec = time.perf_counter() - t0
+    load = build_database(size_dir / "erp.db", paths)
+    rows = sum(s["rows"] for s in load.values())
+    load_sec = sum(s["elapsed_sec"] for s in load.values())
+    env = dict(os.environ, ERP_DB_PATH=str(size_dir / "erp.db"), ERP_TRANSPORT="inprocess")
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_pipeline", "--run-one", str(size_dir / "erp.db"),
+         str(paths["pairs"]), "--workers", str(args.workers), "--service-samples", str(args.service_samples)],
+        env=env, capture_output=True, text=True, cwd=Path(__file__).parent.parent)
+    if proc.returncode != 0:
+        raise RuntimeError(f"size {pos}x{lines} failed:\n{proc.stderr}")
+    result = {"size": f"{pos}x{lines}", "pos": pos, "lines_per_doc": lines,
+              "generate_sec": round(generate_sec, 3), "load_rows": rows,
+              "load_rows_per_sec": round(rows / load_sec, 1) if load_sec else None}
+    result.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return result
+
+def compare(current, baseline, threshold):
+    """Metrics that got worse than the baseline by more than `threshold` (fraction)."""
+    old = {r["size"]: r for r in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        base = old.get(row["size"])
+        if base is None:
+            continue
+        for metric, higher_better in TRACKED.items():
+            a, b = base.get(metric), row.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            if (-change if higher_better else change) > threshold:
+                regressions.append({"size": row["size"], "metric": metric, "baseline": a,
+                                    "current": b, "change_pct": round(change * 100, 1)})
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="End-to-end pipeline benchmark on synthetic data")
+    ap.add_argument("--sizes", default="100x10,1000x10,1000x50", help="comma-separated POS x LINES")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--service-samples", type=int, default=200)
+    ap.add_argument("--out", type=Path, default=None, help="default: benchmarks/results/pipeline-<commit>.json")
+    ap.add_argument("--work-dir", type=Path, default=None, help="keep generated datasets here")
+    ap.add_argument("--compare", type=Path, default=None, help="earlier results file to check against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before flagging")
+    ap.add_argument("--run-one", nargs=2, type=Path, metavar=("DB", "PAIRS"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one[0], args.run_one[1], args.workers, args.service_samples)))
+        return
+
+    sizes = [tuple(int(x) for x in s.lower().split("x")) for s in args.sizes.split(",") if s.strip()]
+    commit = git_commit()
+    with tempfile.TemporaryDirectory(prefix="erp-bench-") as tmp:
+        work_dir = args.work_dir or Path(tmp)
+        results = [bench_size(pos, lines, args, work_dir) for pos, lines in sizes]
+    report = {
+        "benchmark": "pipeline",
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "workers": args.workers,
+        "results": results,
+    }
+    out = args.out or RESULTS_DIR / f"pipeline-{commit or 'local'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print(f"results written to {out}")
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        print(json.dumps({"regressions": regressions}, indent=2))
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Serialization benchmark for one 1,000-line PO: bytes on the wire and CPU per
+request (server encode + executor decode) for
+- stdlib:  response_model validation + jsonable_encoder + json.dumps / json.loads
+           (what FastAPI did for the PO endpoint before)
+- orjson:  validated, orjson-encoded (default for untrusted HTTP callers)
+- orjson-trusted / msgpack-trusted: validation skipped (X-ERP-Trusted)
+
+Runs without a server, through the same render()/decode_body() the routers and
+executor use:
+    python -m benchmarks.bench_serialization --lines 1000 --iterations 200
+"""
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+
+from app.schemas.po_models import POHeader
+from app.tools import responses
+
+def make_po(lines: int):
+    return {
+        "po_id": "PO-BENCH", "vendor_id": "V-001", "vendor_name": "Bench Vendor",
+        "currency": "USD", "total_amount": round(lines * 12.5, 2),
+        "lines": [{"line_id": i, "item_id": f"ITEM-{i:05d}", "description": f"Bench item {i}",
+                   "quantity": float(i % 17 + 1), "unit_price": 12.5 + i % 7, "currency": "USD"}
+                  for i in range(1, lines + 1)],
+    }
+
+def make_request(accept: str, trusted: bool):
+    headers = [(b"accept", accept.encode())]
+    if trusted:
+        headers.append((b"x-erp-trusted", b"1"))
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": headers})
+
+def stdlib_round_trip(po):
+    obj = POHeader(**po)
+    body = json.dumps(jsonable_encoder(obj), separators=(",", ":")).encode()
+    return body, json.loads(body)
+
+def fast_round_trip(po, accept, trusted):
+    request = make_request(accept, trusted)
+    r = responses.render(request, responses.validated(POHeader, po, request))
+    return r.body, responses.decode_body(r.media_type, r.body)
+
+def measure(label, fn, iterations):
+    body, decoded = fn()
+    c0, t0 = time.process_time(), time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    cpu, wall = time.process_time() - c0, time.perf_counter() - t0
+    return {"mode": label, "bytes": len(body),
+            "cpu_ms_per_request": round(cpu * 1000.0 / iterations, 3),
+            "wall_ms_per_request": round(wall * 1000.0 / iterations, 3)}, decoded
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--lines", type=int, default=1000)
+    ap.add_argument("--iterations", type=int, default=200)
+    args = ap.parse_args(argv)
+    # trusted mode is a server setting; the benchmark plays both sides
+    responses.TRUST_INTERNAL_CALLERS = True
+    po = make_po(args.lines)
+    modes = [("stdlib", lambda: stdlib_round_trip(po))]
+    if responses.orjson is not None:
+        modes.append(("orjson", lambda: fast_round_trip(po, "application/json", False)))
+        modes.append(("orjson-trusted", lambda: fast_round_trip(po, "application/json", True)))
+    if responses.msgpack is not None:
+        modes.append(("msgpack-trusted", lambda: fast_round_trip(po, responses.MSGPACK, True)))
+    results = []
+    for label, fn in modes:
+        row, decoded = measure(label, fn, args.iterations)
+        assert decoded["lines"][-1]["line_id"] == args.lines
+        results.append(row)
+    base = results[0]["cpu_ms_per_request"]
+    for row in results:
+        row["cpu_speedup"] = round(base / row["cpu_ms_per_request"], 2) if row["cpu_ms_per_request"] else None
+    print(json.dumps({"lines": args.lines, "iterations": args.iterations, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Transport benchmark: per-call requests.get (one TCP connection per call) vs the
+pooled keep-alive HttpTransport used by the executor.
+
+Requires the ERP server to be running:
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.bench_transport --calls 500 --threads 8
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3.connection
+
+from app.agents.transport import HttpTransport
+
+ERP_BASE = os.getenv("ERP_BASE_URL", "http://localhost:8000")
+PATHS = ["/get_purchase_order/PO-1001", "/get_invoice/INV-5001", "/check_inventory/ITEM-01"]
+
+_connects = 0
+_connects_lock = threading.Lock()
+_orig_connect = urllib3.connection.HTTPConnection.connect
+
+def _counting_connect(self):
+    global _connects
+    with _connects_lock:
+        _connects += 1
+    return _orig_connect(self)
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def run(label, fetch, calls, threads):
+    global _connects
+    _connects = 0
+    latencies = []
+    def one(i):
+        t0 = time.perf_counter()
+        r = fetch(PATHS[i % len(PATHS)])
+        r.raise_for_status()
+        return (time.perf_counter() - t0) * 1000.0
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(one, range(calls)))
+    wall = time.perf_counter() - t0
+    return {
+        "mode": label,
+        "calls": calls,
+        "connections_opened": _connects,
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "calls_per_sec": round(calls / wall, 1),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=500)
+    ap.add_argument("--threads", type=int, default=8)
+    args = ap.parse_args()
+
+    urllib3.connection.HTTPConnection.connect = _counting_connect
+    try:
+        before = run("requests.get", lambda p: requests.get(f"{ERP_BASE}{p}", timeout=10),
+                     args.calls, args.threads)
+        transport = HttpTransport(ERP_BASE, pool_size=args.threads)
+        after = run("pooled", transport.get, args.calls, args.threads)
+        transport.close()
+    finally:
+        urllib3.connection.HTTPConnection.connect = _orig_connect
+    print(json.dumps([before, after], indent=2))
+
+if __name__ == "__main__":
+    main()
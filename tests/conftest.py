@@ -0,0 +1,26 @@
+import os
+
+# Run the suite against the tool routers in-process unless told otherwise
+# (ERP_TRANSPORT=http exercises a live server at ERP_BASE_URL instead).
+os.environ.setdefault("ERP_TRANSPORT", "inprocess")
+
+from app.db.init_db import init_db, DB_PATH
+from app.db.migrate import migrate
+
+# seed_data.sql is not idempotent for line rows, so only seed a fresh database
+if not DB_PATH.exists():
+    init_db()
+migrate(DB_PATH)
+
+import pytest
+
+@pytest.fixture(autouse=True)
+def audit_log(tmp_path, monkeypatch):
+    """Audit decisions made by a test go to a log under tmp_path, not the tracked app/audit log."""
+    from app.agents import auditor, batch_auditor
+    from app.audit.log_manager import AuditLogManager
+    log = AuditLogManager(tmp_path / "audit_log.jsonl")
+    monkeypatch.setattr(auditor, "LOG_MANAGER", log)
+    monkeypatch.setattr(batch_auditor, "LOG_MANAGER", log)
+    yield log
+    log.close()
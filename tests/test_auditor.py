@@ -14,3 +14,25 @@ def test_end_to_end_mismatch():
     decision = audit_decision(result)
     assert decision["decision"] == "ESCALATE"
     assert "price_mismatch" in decision["reasons"]
+
+def test_decision_memo_hits_unchanged_inputs_only(tmp_path, monkeypatch, audit_log):
+    import copy
+    from app.agents import auditor
+    from app.agents.cache import DecisionCache
+    monkeypatch.setattr(auditor, "DECISIONS", DecisionCache(path=str(tmp_path / "decisions.db")))
+    result = execute_plan(deterministic_plan("INV-5002", "PO-1002"))
+    first = audit_decision(result)
+    assert audit_decision(copy.deepcopy(result)) == first
+    changed = copy.deepcopy(result)
+    changed["invoice"]["lines"][0]["unit_price"] = 50.0
+    audit_decision(changed)
+    logs = [e["record"]["extra"] for e in audit_log.read_logs()]
+    assert [e.get("cache_hit", False) for e in logs] == [False, True, False]
+    # a new process with the same cache file still hits
+    auditor.DECISIONS = DecisionCache(path=str(tmp_path / "decisions.db"))
+    audit_decision(result)
+    assert auditor.DECISIONS.stats()["hits"] == 1
+    # another rule set is another key
+    rules = auditor.ENGINE.current()
+    assert auditor.decision_key(result, rules) != auditor.decision_key(
+        result, type(rules)({"rules": {}}, {"version": rules.policy_version}, "other"))
@@ -0,0 +1,63 @@
+import json
+import pytest
+from app.agents.batch import SharedToolCalls, run_batch, load_checkpoint
+
+PAIRS = [("INV-5001","PO-1001"), ("INV-5002","PO-1002"), ("INV-5001","PO-1001")]
+
+def test_batch_streams_and_resumes(tmp_path):
+    out = tmp_path / "results.jsonl"
+    summary = run_batch(PAIRS, out_path=out, workers=2)
+    assert summary["processed"] == 2
+    assert summary["approved"] == 1 and summary["escalated"] == 1
+    rows = [json.loads(l) for l in out.read_text().splitlines()]
+    assert {(r["invoice_id"], r["po_id"]) for r in rows} == set(PAIRS)
+
+    # simulate a crash mid-write: the torn line is dropped and nothing is redone
+    with open(out, "a") as f:
+        f.write('{"invoice_id": "INV-50')
+    summary = run_batch(PAIRS, out_path=out, workers=2)
+    assert summary["resumed"] == 2 and summary["processed"] == 0
+    assert len(load_checkpoint(out)) == 2
+
+def test_shared_calls_retry_failures_and_evict_finished_pos():
+    calls = []
+    def flaky(tool_name, args):
+        calls.append(tool_name)
+        if len(calls) == 1:
+            raise ConnectionError("transient")
+        return {"response": args}
+    shared = SharedToolCalls(tools=["get_purchase_order"], call=flaky)
+    chunk = [("INV-1", "PO-1")]
+    shared.acquire(chunk)
+    call = shared.for_po("PO-1")
+    with pytest.raises(ConnectionError):
+        call("get_purchase_order", {"po_id": "PO-1"})
+    assert call("get_purchase_order", {"po_id": "PO-1"}) == {"response": {"po_id": "PO-1"}}
+    assert call("get_purchase_order", {"po_id": "PO-1"})["response"] == {"po_id": "PO-1"} and len(calls) == 2
+    shared.release(chunk)
+    assert not shared._futures and not shared._keys
+
+def test_resume_rewrites_error_rows(tmp_path):
+    out = tmp_path / "results.jsonl"
+    out.write_text(json.dumps({"invoice_id": "INV-5001", "po_id": "PO-1001", "error": "ConnectionError: x"}) + "\n")
+    summary = run_batch(PAIRS, out_path=out, workers=2)
+    assert summary["processed"] == 2
+    rows = [json.loads(l) for l in out.read_text().splitlines()]
+    assert len(rows) == 2 and not any("error" in r for r in rows)
+
+def test_process_pool_batch_writes_every_audit_entry(audit_log):
+    summary = run_batch(PAIRS, workers=2, use_processes=True, chunk_size=1)
+    assert summary["processed"] == 2
+    assert len(audit_log.log_file.read_text().splitlines()) == 2
+
+def test_prefetched_entries_match_the_single_document_call():
+    from app.agents.executor import call_tool
+    shared = SharedToolCalls()
+    shared.prefetch([("INV-5001", "PO-1001")])
+    assert shared.stats()["prefetched"] == 3
+    for tool, args in (("get_purchase_order", {"po_id": "PO-1001"}), ("get_invoice", {"invoice_id": "INV-5001"}),
+                       ("get_grn_status", {"po_id": "PO-1001"})):
+        seeded = shared(tool, args)
+        direct = call_tool(tool, args)
+        assert seeded.pop("prefetched") is True
+        assert seeded == dict(direct, cached=False)
@@ -0,0 +1,33 @@
+from app.agents.cache import ResponseCache
+from app.tools import changes
+
+def entry(value):
+    return {"tool": "t", "response": value}
+
+def test_hit_miss_and_ttl():
+    cache = ResponseCache(ttls={"get_purchase_order": 60, "check_inventory": 0})
+    cache.put("get_purchase_order", {"po_id": "PO-1"}, entry({"po_id": "PO-1"}))
+    cache.put("check_inventory", {"item_id": "A"}, entry({"on_hand": 1}))
+    assert cache.get("get_purchase_order", {"po_id": "PO-1"})["response"] == {"po_id": "PO-1"}
+    assert cache.get("check_inventory", {"item_id": "A"}) is None  # ttl 0 -> never cached
+    assert cache.stats()["hits"] == 1
+
+def test_lru_bound():
+    cache = ResponseCache(ttls={"get_invoice": 60}, max_entries=2)
+    for i in range(3):
+        cache.put("get_invoice", {"invoice_id": i}, entry(i))
+    assert cache.get("get_invoice", {"invoice_id": 0}) is None
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidate_by_ref_covers_batch_entries():
+    cache = ResponseCache(ttls={"check_inventory": 60, "check_inventory_batch": 60})
+    cache.put("check_inventory", {"item_id": "A"}, entry(1))
+    cache.put("check_inventory_batch", {"item_ids": ["A", "B"]}, entry(2))
+    cache.put("check_inventory_batch", {"item_ids": ["B"]}, entry(3))
+    changes.subscribe(cache.invalidate)
+    try:
+        changes.notify(item_id="A")
+    finally:
+        changes.unsubscribe(cache.invalidate)
+    assert cache.stats()["entries"] == 1
+    assert cache.get("check_inventory_batch", {"item_ids": ["B"]}) is not None
@@ -0,0 +1,46 @@
+import sqlite3
+import pytest
+from app.tools.db import ConnectionPool, Database, PoolTimeout
+
+def make_db(tmp_path):
+    path = tmp_path / "t.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.close()
+    return Database(path, max_size=2)
+
+def test_wal_and_readonly(tmp_path):
+    db = make_db(tmp_path)
+    with db.write() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with db.read() as conn:
+        assert conn.execute("SELECT x FROM t").fetchall() == [(1,)]
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO t VALUES (2)")
+    db.close()
+
+def test_pool_is_bounded_and_reused(tmp_path):
+    db = make_db(tmp_path)
+    pool = ConnectionPool(db.path, readonly=True, max_size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+    for _ in range(5):
+        with pool.connection():
+            pass
+    stats = pool.stats()
+    assert stats["created"] == 1 and stats["timeouts"] == 1 and stats["idle"] == 1
+    pool.close()
+
+def test_wal_is_set_on_a_database_created_after_the_pools(tmp_path):
+    db = Database(tmp_path / "late.db", max_size=2)
+    db.stats()  # pools exist before the file does
+    conn = sqlite3.connect(db.path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.close()
+    with db.read() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    db.close()
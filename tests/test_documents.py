@@ -0,0 +1,52 @@
+from app.agents.executor import call_tool, stream_tool
+from app.tools.po_service import query_po
+
+def test_multi_document_fetch_matches_single():
+    entry = call_tool("get_purchase_orders", {"ids": ["PO-1002", "PO-404", "PO-1001"]})
+    docs = entry["response"]["documents"]
+    assert list(docs) == ["PO-1002", "PO-1001"]
+    assert docs["PO-1001"] == query_po("PO-1001")
+    assert entry["response"]["missing"] == ["PO-404"]
+
+def test_multi_document_ndjson_stream():
+    rows = list(stream_tool("get_invoices", {"ids": ["INV-5001", "INV-404"], "stream": True}))
+    assert rows[0]["id"] == "INV-5001" and len(rows[0]["document"]["lines"]) == 2
+    assert rows[-1] == {"missing": ["INV-404"]}
+
+def test_keyset_listing_sweeps_all_pages():
+    from app.agents.executor import iter_pages
+    ids = [h["po_id"] for h in iter_pages("purchase_orders", {"page_size": 1})]
+    assert ids == ["PO-1001", "PO-1002"]
+    vendor = [h["invoice_id"] for h in iter_pages("invoices", {"vendor_id": "V-002"})]
+    assert vendor == ["INV-5002"]
+
+def test_cursor_is_bound_to_filters():
+    import pytest
+    from app.agents.executor import ExecutorError
+    page = call_tool("purchase_orders", {"page_size": 1})["response"]
+    assert page["next_cursor"]
+    with pytest.raises(ExecutorError):
+        call_tool("purchase_orders", {"page_size": 1, "vendor_id": "V-001", "cursor": page["next_cursor"]})
+
+def test_conditional_get_revalidates_last_copy():
+    from app.agents.executor import RESPONSE_CACHE, VALIDATORS
+    from app.tools.db import DB
+    RESPONSE_CACHE.clear()
+    VALIDATORS.clear()
+    first = call_tool("get_invoice", {"invoice_id": "INV-5001"})
+    RESPONSE_CACHE.clear()
+    again = call_tool("get_invoice", {"invoice_id": "INV-5001"})
+    assert again["status_code"] == 304 and again["response"] == first["response"]
+    # a line change bumps the invoice version through the migration 0004 triggers
+    old = first["response"]["lines"][0]["description"]
+    with DB.write() as conn:
+        conn.execute("UPDATE invoice_lines SET description=? WHERE invoice_id='INV-5001' AND line_id=1", ("changed",))
+    try:
+        RESPONSE_CACHE.clear()
+        changed = call_tool("get_invoice", {"invoice_id": "INV-5001"})
+        assert changed["status_code"] == 200
+        assert changed["response"]["lines"][0]["description"] == "changed"
+    finally:
+        with DB.write() as conn:
+            conn.execute("UPDATE invoice_lines SET description=? WHERE invoice_id='INV-5001' AND line_id=1", (old,))
+        RESPONSE_CACHE.clear()
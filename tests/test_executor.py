@@ -2,7 +2,7 @@ import os
 from app.agents.executor import fetch_openapi, is_tool_allowed
 
 def test_openapi_available():
-    # ensure ERP_BASE_URL points to running FastAPI in test environment; this unit test expects server running
+    # in-process by default (see conftest.py); ERP_TRANSPORT=http needs a server at ERP_BASE_URL
     openapi = fetch_openapi()
     assert "paths" in openapi
 
@@ -11,3 +11,56 @@ def test_tool_allowed():
     assert is_tool_allowed(openapi, "get_purchase_order")
     assert is_tool_allowed(openapi, "get_invoice")
     assert is_tool_allowed(openapi, "check_inventory")
+
+def test_async_plan_matches_sync():
+    import asyncio
+    from app.agents.planner import deterministic_plan
+    from app.agents.executor import execute_plan, execute_plan_async, RESPONSE_CACHE, VALIDATORS
+    for inv_id, po_id in [("INV-5001","PO-1001"), ("INV-5002","PO-1002")]:
+        plan = deterministic_plan(inv_id, po_id)
+        RESPONSE_CACHE.clear()
+        VALIDATORS.clear()
+        async_result = asyncio.run(execute_plan_async(plan))
+        RESPONSE_CACHE.clear()
+        VALIDATORS.clear()
+        sync_result = execute_plan(plan)
+        for r in (async_result, sync_result):
+            for entry in r["trace"]:
+                for k in ("started_at", "ended_at", "duration_ms"):
+                    entry.pop(k)
+        assert async_result == sync_result
+
+def test_inventory_batch_reports_missing():
+    from app.agents.executor import call_tool, RESPONSE_CACHE
+    RESPONSE_CACHE.clear()
+    entry = call_tool("check_inventory_batch", {"item_ids": ["ITEM-01", "ITEM-99", "ITEM-01"]})
+    assert entry["response"]["items"] == [{"item_id": "ITEM-01", "on_hand": 100}]
+    assert entry["response"]["missing"] == ["ITEM-99"]
+
+def test_trace_format_matches_http():
+    from app.agents.executor import call_tool, ERP_BASE, RESPONSE_CACHE, VALIDATORS
+    RESPONSE_CACHE.clear()
+    VALIDATORS.clear()
+    entry = call_tool("get_purchase_order", {"po_id": "PO-1001"})
+    assert entry["request"] == {"url": f"{ERP_BASE}/get_purchase_order/PO-1001", "method": "GET"}
+    assert entry["status_code"] == 200
+    assert [l["line_id"] for l in entry["response"]["lines"]] == [1, 2]
+
+def test_inprocess_errors_match_http():
+    import asyncio
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.agents.transport import InProcessTransport
+    inproc, http = InProcessTransport("http://erp"), TestClient(app)
+    for method, path, kwargs in [("POST", "/check_inventory_batch", {"json": {"item_ids": "ITEM-01"}}),
+                                 ("POST", "/get_purchase_orders", {"json": None}),
+                                 ("GET", "/purchase_orders", {"params": {"page_size": "two"}})]:
+        a, b = inproc.request(method, path, **kwargs), http.request(method, path, **kwargs)
+        assert (a.status_code, a.json()) == (b.status_code, b.json()) and a.status_code == 422
+    # query values are coerced from their string form, as over HTTP
+    page = inproc.get("/purchase_orders", params={"page_size": "1"}).json()
+    assert page == http.get("/purchase_orders", params={"page_size": "1"}).json() and len(page["items"]) == 1
+
+    async def inside_loop():
+        return inproc.get("/get_grn_status/PO-1001").status_code
+    assert asyncio.run(inside_loop()) == 200
@@ -0,0 +1,169 @@
+import json
+import pytest
+from app.audit.log_manager import AuditLogManager, GroupCommitWriter
+
+def test_buffered_writer_is_byte_compatible(tmp_path):
+    log = AuditLogManager(tmp_path / "log.jsonl", buffered=True, flush_interval=0.01, batch_size=4)
+    entries = [log.append_log({"decision": "APPROVE", "n": i}, extra={"execution_seed": i}) for i in range(10)]
+    log.flush()
+    lines = (tmp_path / "log.jsonl").read_text(encoding="utf-8").splitlines()
+    # record and hmac are written exactly as before; the chain link follows them
+    assert [l[:len(json.dumps(e)) - 1] for l, e in zip(lines, entries)] == [json.dumps(e)[:-1] for e in entries]
+    assert log.writer.stats()["entries"] == 10 and log.writer.groups >= 3
+    # the writer thread indexed every group; no query was needed
+    assert log.index.indexed_offset() == ((tmp_path / "log.jsonl").stat().st_size, 10)
+    for e in log.read_logs():
+        assert log.sign(json.dumps(e["record"], sort_keys=True).encode()) == e["hmac"]
+    log.append_log({"decision": "ESCALATE"})
+    log.close()
+    assert len((tmp_path / "log.jsonl").read_text().splitlines()) == 11
+    assert log.verify(None)["ok"]
+
+def test_writer_errors_reach_flush_without_deadlock():
+    def write(group):
+        writer.flush()  # called from the writer thread itself: returns instead of waiting on itself
+        raise ValueError("bad group")
+    writer = GroupCommitWriter(write, flush_interval=0.01)
+    writer.put("a")
+    with pytest.raises(ValueError):
+        writer.flush()
+    with pytest.raises(ValueError):
+        writer.put("b")
+    writer.close()
+
+def test_chain_checkpoints_and_inclusion_proofs(tmp_path):
+    # unbuffered managers stand in for separate processes appending in turn
+    path = tmp_path / "log.jsonl"
+    log = AuditLogManager(path, buffered=False, checkpoint_every=8)
+    for i in range(21):
+        log.append_log({"decision": "APPROVE", "n": i})
+    assert [cp["size"] for cp in log.checkpoints()] == [8, 16]
+    # another process appending to the same file continues the same chain
+    AuditLogManager(path, buffered=False, checkpoint_every=8).append_log({"decision": "ESCALATE"})
+    log.append_log({"decision": "APPROVE", "n": 22})
+    report = log.verify()
+    assert report["ok"] and report["checked"] == 7 and report["size"] == 23
+    assert log.verify(None)["checked"] == 23
+
+    lines = path.read_bytes().splitlines()
+    proof = log.prove(5)
+    assert len(proof["path"]) == 4 and AuditLogManager.verify_proof(lines[5], proof)
+    assert not AuditLogManager.verify_proof(lines[6], proof)
+
+    path.write_bytes(b"\n".join(lines[:18] + lines[19:]) + b"\n")  # delete an entry after the checkpoint
+    assert not log.verify()["ok"]
+    path.write_bytes(b"\n".join(lines[:3] + lines[4:]) + b"\n")  # ... or before it
+    assert log.verify()["ok"] is False and not log.verify(None)["ok"]
+
+def test_append_after_a_torn_last_line(tmp_path):
+    path = tmp_path / "log.jsonl"
+    for i in range(3):
+        AuditLogManager(path, buffered=False).append_log({"decision": "APPROVE", "n": i})
+    with open(path, "ab") as f:
+        f.write(b'{"record": {"timestamp": "2026')  # a writer that crashed mid-line
+    log = AuditLogManager(path, buffered=False)
+    log.append_log({"decision": "APPROVE", "n": 3})
+    log.append_log({"decision": "ESCALATE", "n": 4})
+    assert [json.loads(l)["record"]["payload"]["n"] for l in path.read_text().splitlines()] == [0, 1, 2, 3, 4]
+    report = log.verify(None)
+    assert report["ok"] and report["size"] == 5
+
+def test_append_after_a_corrupt_line(tmp_path):
+    path = tmp_path / "log.jsonl"
+    for i in range(3):
+        AuditLogManager(path, buffered=False).append_log({"decision": "APPROVE", "n": i})
+    lines = path.read_bytes().splitlines()
+    path.write_bytes(b"\n".join([lines[0], b'{"record": garbage', lines[2]]) + b"\n")
+    AuditLogManager(path, buffered=False).append_log({"decision": "APPROVE", "n": 3})
+    log = AuditLogManager(path, buffered=True)
+    log.append_log({"decision": "ESCALATE", "n": 4})
+    log.flush()
+    assert len(path.read_bytes().splitlines()) == 5
+    # the damaged entry (and the link that depended on it) is reported; the appends after it chain correctly
+    report = log.verify(None)
+    assert report["size"] == 5 and report["errors"][0] == "entry 1: unreadable"
+    assert not [e for e in report["errors"] if e.startswith(("entry 3", "entry 4"))]
+    assert [e["record"]["payload"]["n"] for e in log.query(decision="APPROVE")] == [0, 2, 3]
+    log.close()
+
+def test_indexed_queries_and_rebuild(tmp_path):
+    path = tmp_path / "log.jsonl"
+    log = AuditLogManager(path, buffered=False)
+    for i in range(30):
+        reasons = ["price_mismatch"] if i % 3 == 0 else []
+        log.append_log({"decision": "ESCALATE" if reasons else "APPROVE", "reasons": reasons,
+                        "po_id": f"PO-{i % 5}", "invoice_id": f"INV-{i}"})
+    # entries written without the index are picked up by the next query
+    AuditLogManager(path, buffered=False, index=False).append_log({"decision": "APPROVE", "reasons": [], "po_id": "PO-1"})
+    hits = log.query(po_id="PO-1")
+    assert next(hits)["record"]["payload"]["invoice_id"] == "INV-1"
+    assert len(list(hits)) == 6
+    assert [e["record"]["payload"]["invoice_id"] for e in log.query(reason="price_mismatch", po_id="PO-3")] == ["INV-3", "INV-18"]
+    first = log.read_logs()[10]["record"]["timestamp"]
+    assert len(list(log.query(since=first))) == 21
+    assert len(list(log.query(decision="APPROVE", until=first))) == 6
+    log.index.path.unlink()
+    log.index = type(log.index)(log.index.path)
+    log.rebuild_index()
+    assert len(list(log.query(decision="ESCALATE"))) == 10
+
+def test_segment_rotation_keeps_chain_index_and_time_skips(tmp_path):
+    path = tmp_path / "log.jsonl"
+    log = AuditLogManager(path, buffered=False, checkpoint_every=16, segment_bytes=4000, block_bytes=1000)
+    for i in range(60):
+        log.append_log({"decision": "APPROVE" if i % 4 else "REJECT", "reasons": [], "po_id": f"PO-{i % 3}",
+                        "invoice_id": f"INV-{i}"})
+    segs = log.segments.load()
+    assert len(segs) >= 2 and all(len(json.loads((log.segments.directory / (s["file"] + ".idx")).read_text())) > 1
+                                  for s in segs)
+    assert sum(s["entries"] for s in segs) + len(path.read_text().splitlines()) == 60
+    assert [e["record"]["payload"]["invoice_id"] for e in log.read_logs()] == [f"INV-{i}" for i in range(60)]
+    assert [e["record"]["payload"]["invoice_id"] for e in log.query(po_id="PO-1", decision="REJECT")] == \
+        [f"INV-{i}" for i in range(60) if i % 3 == 1 and i % 4 == 0]
+    report = log.verify(None)
+    assert report["ok"] and report["checked"] == 60 and log.verify()["ok"]
+    # another process continues the chain after the rotation
+    AuditLogManager(path, buffered=False, segment_bytes=4000).append_log({"decision": "APPROVE"})
+    assert log.verify(None)["size"] == 61
+
+    entries = log.read_logs()
+    cut = entries[40]["record"]["timestamp"]
+    assert len(list(log.iter_entries(since=cut))) == 21
+    # segments wholly outside the range are not read at all
+    old = segs[0]
+    (log.segments.directory / old["file"]).rename(tmp_path / "moved.gz")
+    assert len(list(log.iter_entries(since=segs[1]["min_ts"]))) == 61 - segs[0]["entries"]
+    assert not log.verify(None)["ok"]
+
+def test_streaming_and_columnar_exports(tmp_path):
+    path = tmp_path / "log.jsonl"
+    log = AuditLogManager(path, segment_bytes=3000, block_bytes=800)
+    for i in range(40):
+        log.append_log({"decision": "REJECT" if i % 5 == 0 else "APPROVE", "reasons": ["qty_mismatch"] if i % 5 == 0 else [],
+                        "po_id": f"PO-{i % 2}", "invoice_id": f"INV-{i}", "policy_version": "v1"})
+    entries = log.read_logs()
+    assert json.loads(log.export_json(tmp_path / "all.json").read_text()) == entries
+    assert (tmp_path / "all.json").read_text() == json.dumps(entries, indent=2)
+    assert log.export_json(tmp_path / "none.json", decision="NOPE").read_text() == "[]"
+    cut = entries[25]["record"]["timestamp"]
+    rows = log.export_csv(tmp_path / "tail.csv", since=cut, decision="REJECT").read_text().splitlines()
+    assert rows[0].startswith("timestamp,decision") and [r.split(",")[4] for r in rows[1:]] == ["INV-25", "INV-30", "INV-35"]
+    unindexed = AuditLogManager(path, index=False)
+    assert [e["record"]["payload"]["invoice_id"] for e in unindexed.select(reason="qty_mismatch", po_id="PO-1")] == \
+        ["INV-5", "INV-15", "INV-25", "INV-35"]
+
+    import pyarrow.parquet as pq
+    table = pq.read_table(log.export_parquet(tmp_path / "tail.parquet", until=cut))
+    assert table.num_rows == 25 and table.schema.field("reasons").type.value_type == "string"
+    assert table.column("reasons").to_pylist()[:2] == [["qty_mismatch"], []]
+    assert str(table.schema.field("timestamp").type) == "timestamp[us, tz=UTC]"
+
+def test_columnar_export_without_pyarrow_says_what_to_install(tmp_path, monkeypatch):
+    from app.audit import exports
+    log = AuditLogManager(tmp_path / "log.jsonl")
+    log.append_log({"decision": "APPROVE"})
+    monkeypatch.setattr(exports, "pa", None)
+    with pytest.raises(RuntimeError, match="pip install pyarrow"):
+        log.export_parquet(tmp_path / "out.parquet")
+    assert not (tmp_path / "out.parquet").exists()
+    log.close()
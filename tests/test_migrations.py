@@ -0,0 +1,34 @@
+import sqlite3
+from app.db.init_db import SEED_SQL
+from app.db.migrate import migrate, discover
+from app.tools.po_service import PO_LINES_SQL
+from app.tools.invoice_service import INVOICE_LINES_SQL
+
+def fresh_db(tmp_path):
+    path = tmp_path / "erp.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(SEED_SQL.read_text())
+    conn.close()
+    return path
+
+def query_plan(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return " | ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, ("X",)))
+    finally:
+        conn.close()
+
+def test_migrations_apply_once(tmp_path):
+    path = fresh_db(tmp_path)
+    assert migrate(path) == [v for v, _, _ in discover()]
+    assert migrate(path) == []
+
+def test_line_lookups_use_covering_indexes(tmp_path):
+    path = fresh_db(tmp_path)
+    migrate(path)
+    po_plan = query_plan(path, PO_LINES_SQL)
+    inv_plan = query_plan(path, INVOICE_LINES_SQL)
+    assert "USING COVERING INDEX idx_po_lines_po_id_line_id" in po_plan
+    assert "USING COVERING INDEX idx_invoice_lines_invoice_id_line_id" in inv_plan
+    # ORDER BY line_id is satisfied by the index, no temp sort
+    assert "TEMP B-TREE" not in po_plan and "TEMP B-TREE" not in inv_plan
@@ -0,0 +1,46 @@
+import pytest
+from starlette.requests import Request
+from app.schemas.po_models import POHeader
+from app.tools import responses
+from app.tools.po_service import query_po
+
+def make_request(headers=None, inprocess=False):
+    scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"",
+             "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]}
+    if inprocess:
+        scope[responses.INPROCESS_SCOPE_KEY] = True
+    return Request(scope)
+
+def test_content_negotiation_round_trips():
+    pytest.importorskip("msgpack")
+    po = query_po("PO-1001")
+    as_json = responses.render(make_request(), po)
+    assert as_json.media_type == "application/json"
+    assert responses.decode_body(as_json.media_type, as_json.body) == po
+    as_msgpack = responses.render(make_request({"Accept": responses.MSGPACK}), po)
+    assert as_msgpack.media_type == responses.MSGPACK
+    assert responses.decode_body(as_msgpack.media_type, as_msgpack.body) == po
+    # in-process callers get the object itself
+    assert responses.render(make_request(inprocess=True), po) is po
+
+def test_trusted_callers_skip_validation(monkeypatch):
+    bad = dict(query_po("PO-1001"), total_amount="not a number")
+    header = {"X-ERP-Trusted": "1"}
+    monkeypatch.setattr(responses, "TRUST_INTERNAL_CALLERS", False)
+    with pytest.raises(ValueError):
+        responses.validated(POHeader, bad, make_request(header))
+    monkeypatch.setattr(responses, "TRUST_INTERNAL_CALLERS", True)
+    assert responses.validated(POHeader, bad, make_request(header)) is bad
+    assert responses.validated(POHeader, bad, make_request(inprocess=True)) is bad
+
+def test_etag_names_the_encoding():
+    pytest.importorskip("msgpack")
+    from app.tools.po_service import get_purchase_order
+    as_json = get_purchase_order("PO-1001", make_request())
+    as_msgpack = get_purchase_order("PO-1001", make_request({"Accept": responses.MSGPACK}))
+    etag = as_json.headers["etag"]
+    assert as_msgpack.headers["etag"] == etag[:-1] + '.msgpack"'
+    assert as_json.headers["vary"] == as_msgpack.headers["vary"] == "Accept"
+    # a JSON validator does not revalidate the msgpack body
+    assert get_purchase_order("PO-1001", make_request({"Accept": responses.MSGPACK, "If-None-Match": etag})).status_code == 200
+    assert get_purchase_order("PO-1001", make_request({"If-None-Match": etag})).status_code == 304
@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+import pytest
+from app.agents.rule_engine import RuleEngine, RuleError, RULES_PATH
+
+LINE = {"line_id": 1, "item_id": "A", "quantity": 10, "unit_price": 5.0}
+PO = {"po_id": "PO-X", "vendor_id": "V", "currency": "USD", "total_amount": 50.0, "lines": [LINE]}
+
+def result(inv_line, **inv_header):
+    inv = dict(PO, invoice_id="INV-X", lines=[inv_line], **inv_header)
+    return {"po": PO, "invoice": inv, "comparisons": [{"po_line": LINE, "invoice_line": inv_line}]}
+
+def rules_copy(tmp_path):
+    for name in ("matching_rules.json", "audit_policies.json"):
+        shutil.copy(RULES_PATH / name, tmp_path / name)
+    return tmp_path
+
+def edit(path, fn):
+    data = json.loads(path.read_text())
+    fn(data)
+    path.write_text(json.dumps(data))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+def test_reloads_on_change_and_keeps_last_good_rules(tmp_path):
+    engine = RuleEngine(rules_copy(tmp_path), check_interval=0)
+    pricey = result(dict(LINE, unit_price=5.2))
+    assert engine.current().evaluate(pricey) == ("ESCALATE", ["price_mismatch"])
+    in_flight = engine.current()
+    edit(tmp_path / "matching_rules.json", lambda d: d["rules"]["price_mismatch"].update(tolerance_pct=5.0))
+    assert engine.current().evaluate(pricey) == ("APPROVE", [])
+    # a decision that already holds the old rule set is unaffected
+    assert in_flight.evaluate(pricey)[0] == "ESCALATE"
+    (tmp_path / "audit_policies.json").write_text("{ broken")
+    assert engine.current().evaluate(pricey) == ("APPROVE", [])
+    assert engine.last_error and engine.reloads == 2
+
+def test_rules_declared_in_json_are_evaluated(tmp_path):
+    engine = RuleEngine(rules_copy(tmp_path), check_interval=0)
+    engine.current()
+    edit(tmp_path / "matching_rules.json", lambda d: d["rules"].update(
+        currency_mismatch={"scope": "header", "field": "currency", "type": "equals"}))
+    # approving without checking the new rule is refused; the old rules stay active
+    engine.current()
+    assert "currency_mismatch" in engine.last_error
+    edit(tmp_path / "audit_policies.json", lambda d: d["policies"]["approve_if_all_match"]["conditions"].append("currency_match"))
+    assert engine.current().evaluate(result(LINE, currency="EUR")) == ("ESCALATE", ["currency_mismatch"])
+
+def test_no_matching_policy_escalates(tmp_path):
+    engine = RuleEngine(rules_copy(tmp_path), check_interval=0)
+    edit(tmp_path / "audit_policies.json", lambda d: d["policies"].pop("escalate_on_any_mismatch"))
+    rules = engine.current()
+    assert rules.decide(["price_mismatch"]) == ("ESCALATE", None)
+    with pytest.raises(RuleError):
+        type(rules)({"rules": {"x": {"scope": "line", "field": "quantity", "type": "fuzzy"}}}, {})
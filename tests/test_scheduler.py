@@ -0,0 +1,36 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.agents.scheduler import run_graph, run_graph_async, assemble_trace, SchedulerError
+
+STEPS = [
+    {"id": 1, "name": "a", "tool": "t", "depends_on": []},
+    {"id": 2, "name": "b", "tool": "t", "depends_on": []},
+    {"id": 3, "name": "c", "tool": "t", "depends_on": [1, 2]},
+    {"id": 4, "name": "d", "tool": "t", "depends_on": [3]},
+]
+
+def run_step(step):
+    if step["name"] == "b":
+        raise RuntimeError("boom")
+    return [{"tool": "t", "response": step["name"]}]
+
+def test_failed_inputs_skip_dependents():
+    with ThreadPoolExecutor(4) as pool:
+        results = run_graph(STEPS, run_step, pool)
+    assert [results[i].status for i in (1, 2, 3, 4)] == ["ok", "failed", "skipped", "skipped"]
+    trace = assemble_trace(results)
+    assert [e["step"] for e in trace] == [1, 2, 3, 4]
+    assert trace[0]["started_at"] and trace[0]["ended_at"]
+
+def test_async_matches_sync_statuses():
+    async def run_step_async(step):
+        return run_step(step)
+    results = asyncio.run(run_graph_async(STEPS, run_step_async))
+    assert [results[i].status for i in (1, 2, 3, 4)] == ["ok", "failed", "skipped", "skipped"]
+
+def test_cycle_rejected():
+    steps = [{"id": 1, "name": "a", "depends_on": [2]}, {"id": 2, "name": "b", "depends_on": [1]}]
+    with pytest.raises(SchedulerError):
+        with ThreadPoolExecutor(1) as pool:
+            run_graph(steps, run_step, pool)
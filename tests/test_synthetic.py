@@ -0,0 +1,27 @@
+import sqlite3
+from app.db.synthetic import DatasetParams, iter_documents, write_extracts, build_database
+
+def test_generator_is_reproducible():
+    params = DatasetParams(seed=7, pos=20, lines=5)
+    assert list(iter_documents(params)) == list(iter_documents(params))
+    assert list(iter_documents(params)) != list(iter_documents(params._replace(seed=8)))
+
+def test_mismatch_and_partial_rates():
+    docs = list(iter_documents(DatasetParams(pos=10, lines=3, qty_mismatch_rate=1.0, price_mismatch_rate=0.0,
+                                             missing_line_rate=0.0, grn_partial_rate=1.0, grn_short_rate=0.0)))
+    for d in docs:
+        assert d["po"]["total_amount"] != d["invoice"]["total_amount"]
+        assert len(d["grns"]) >= 2
+        received = {}
+        for grn in d["grns"]:
+            for l in grn["lines"]:
+                received[l["line_id"]] = received.get(l["line_id"], 0) + l["received_qty"]
+        assert received == {l["line_id"]: l["quantity"] for l in d["po"]["lines"]}
+
+def test_extracts_load_without_rejects(tmp_path):
+    params = DatasetParams(pos=30, lines=4, items=20)
+    load = build_database(tmp_path / "erp.db", write_extracts(tmp_path, params))
+    assert all(s["rejected"] == 0 for s in load.values())
+    conn = sqlite3.connect(tmp_path / "erp.db")
+    assert conn.execute("SELECT COUNT(*) FROM po_lines WHERE po_id LIKE 'PO-S%'").fetchone()[0] == 120
+    conn.close()
@@ -0,0 +1,30 @@
+from app.agents.three_way import three_way_match
+from app.agents.auditor import audit_decision
+from app.tools.grn_service import query_grn
+
+LINES = [{"line_id": 1, "item_id": "A", "quantity": 10, "unit_price": 5.0},
+         {"line_id": 2, "item_id": "B", "quantity": 4, "unit_price": 2.0}]
+PO = {"po_id": "PO-X", "vendor_id": "V", "total_amount": 58.0, "lines": LINES}
+INV = {"invoice_id": "INV-X", "vendor_id": "V", "total_amount": 58.0, "lines": LINES}
+# two partial receipts for line 1 add up to 10; line 2 only got 3 of 4
+GRN = {"grn_summary": {"lines": [{"line_id": 1, "item_id": "A", "received_qty": 6},
+                                 {"line_id": 1, "item_id": "A", "received_qty": 4},
+                                 {"line_id": 2, "item_id": "B", "received_qty": 3}]}}
+
+def test_three_way_flags_over_billed_lines():
+    rows = {r["key"]: r for r in three_way_match(PO, INV, GRN)}
+    assert rows[(1, "A")]["received_qty"] == 10 and rows[(1, "A")]["over_billed_qty"] == 0
+    assert rows[(2, "B")]["over_billed_qty"] == 1
+
+def test_auditor_escalates_over_billed():
+    comparisons = [{"po_line": l, "invoice_line": l} for l in LINES]
+    result = {"po": PO, "invoice": INV, "comparisons": comparisons,
+              "three_way": three_way_match(PO, INV, GRN), "plan_seed": 0}
+    decision = audit_decision(result)
+    assert decision["decision"] == "ESCALATE"
+    assert decision["reasons"] == ["over_billed"]
+
+def test_grn_status_from_database():
+    summaries = query_grn(["PO-1001", "PO-404"])
+    assert summaries["PO-1001"]["received_qty"] == {"1": 10, "2": 5}
+    assert summaries["PO-404"]["lines"] == []
@@ -0,0 +1,44 @@
+from app.agents.tool_registry import ToolRegistry, compile_openapi
+
+SCHEMA = {
+    "info": {"version": "1.0.0"},
+    "paths": {
+        "/get_purchase_order/{po_id}": {"get": {"operationId": "get_purchase_order_get_purchase_order__po_id__get"}},
+        "/check_inventory/{item_id}": {"get": {"operationId": "check_inventory_check_inventory__item_id__get"}},
+    },
+}
+
+def make_loader(schema, etag="v1"):
+    calls = []
+    def loader(prev_etag):
+        calls.append(prev_etag)
+        if prev_etag == etag:
+            return None, etag
+        return schema, etag
+    return loader, calls
+
+def test_compile_index():
+    index = compile_openapi(SCHEMA)
+    spec = index["get_purchase_order"]
+    assert spec.method == "GET"
+    assert spec.path == "/get_purchase_order/{po_id}"
+    assert spec.path_params == ("po_id",)
+
+def test_registry_fetches_once_and_counts():
+    loader, calls = make_loader(SCHEMA)
+    reg = ToolRegistry(loader, ttl=300)
+    for _ in range(50):
+        assert reg.lookup("check_inventory") is not None
+    assert reg.lookup("drop_tables") is None
+    assert len(calls) == 1
+    stats = reg.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 50
+
+def test_registry_revalidates_with_etag():
+    loader, calls = make_loader(SCHEMA)
+    reg = ToolRegistry(loader, ttl=300)
+    reg.lookup("get_purchase_order")
+    reg.invalidate()
+    reg.lookup("get_purchase_order")
+    assert calls == [None, "v1"]
+    assert reg.stats()["rebuilds"] == 1